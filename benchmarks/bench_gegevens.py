@@ -0,0 +1,150 @@
+""" Meting van de snelheid van Gegevens per soort opslag
+
+Gebruik: python benchmarks/bench_gegevens.py [--opslag json sqlite log]
+             [--sleutels 10 100 1000 10000] [--herhalingen 200] [--duur 2]
+             [--uitvoer resultaten.json]
+De resultaten worden als json geschreven zodat metingen van verschillende
+commits vergeleken kunnen worden.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+from time import perf_counter_ns
+
+MAP = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(MAP))
+sys.path.insert(0, MAP)
+
+# pylint: disable=wrong-import-position
+from gegevens import Gegevens
+from meting import meet, metomgeving, resultaat, schrijf
+
+LEZERS = 8
+
+
+def maakgegevens(map_: str, opslag: str, sleutels: int) -> Gegevens:
+  """
+    Maak een opslag gevuld met sleutels
+    Args: map_ (str): De map voor de bestanden
+          opslag (str): De soort opslag
+          sleutels (int): Het aantal sleutels
+    Returns: Gegevens: De gevulde gegevens
+  """
+  gegevens = Gegevens(os.path.join(map_, f'bench-{opslag}-{sleutels}.json'), opslag)
+  with gegevens.transactie():
+    for nummer in range(sleutels):
+      gegevens.wijzig(f'sleutel{nummer}', {'nummer': nummer, 'naam': f'waarde {nummer}'})
+  return gegevens
+
+
+def meetenkel(gegevens: Gegevens, opslag: str, sleutels: int, herhalingen: int) -> list[dict]:
+  """
+    Meet de bewerkingen na elkaar in een thread
+    Args: gegevens (Gegevens): De gevulde gegevens
+          opslag (str): De soort opslag
+          sleutels (int): Het aantal sleutels
+          herhalingen (int): Het aantal aanroepen per bewerking
+    Returns: list met een resultaat per bewerking
+  """
+  kenmerken = {'opslag': opslag, 'sleutels': sleutels, 'scenario': 'enkel'}
+  kies = random.Random(sleutels)
+  namen = [f'sleutel{kies.randrange(sleutels)}' for _ in range(herhalingen)]
+  resultaten = []
+  duren, totaal = meet(gegevens.lees, [(naam,) for naam in namen])
+  resultaten.append(resultaat(kenmerken, 'lees', duren, totaal))
+  duren, totaal = meet(gegevens.leesint, [('onbekend', 0) for _ in namen])
+  resultaten.append(resultaat(kenmerken, 'leesint', duren, totaal))
+  duren, totaal = meet(gegevens.wijzig, [(naam, teller) for teller, naam in enumerate(namen)])
+  resultaten.append(resultaat(kenmerken, 'wijzig', duren, totaal))
+  duren, totaal = [], 0
+  for teller in range(herhalingen):
+    gegevens.wijzig('verwijderd', teller)
+    verwijderduren, verwijdertotaal = meet(gegevens.verwijder, [('verwijderd',)])
+    duren += verwijderduren
+    totaal += verwijdertotaal
+  resultaten.append(resultaat(kenmerken, 'verwijder', duren, totaal))
+  return resultaten
+
+
+def meetgelijktijdig(gegevens: Gegevens, opslag: str, sleutels: int, duur: float) -> list[dict]:
+  """
+    Meet lezen in meerdere threads terwijl een andere thread wijzigt
+    Args: gegevens (Gegevens): De gevulde gegevens
+          opslag (str): De soort opslag
+          sleutels (int): Het aantal sleutels
+          duur (float): De duur van de meting in seconden
+    Returns: list met een resultaat voor lezen en een voor wijzigen
+  """
+  stop = threading.Event()
+  leesduren: list[list[int]] = [[] for _ in range(LEZERS)]
+  wijzigduren: list[int] = []
+
+  def lezer(duren: list[int], kies: random.Random) -> None:
+    while not stop.is_set():
+      start = perf_counter_ns()
+      gegevens.lees(f'sleutel{kies.randrange(sleutels)}')
+      duren.append(perf_counter_ns() - start)
+
+  def schrijver() -> None:
+    teller = 0
+    while not stop.is_set():
+      start = perf_counter_ns()
+      gegevens.wijzig(f'sleutel{teller % sleutels}', teller)
+      wijzigduren.append(perf_counter_ns() - start)
+      teller += 1
+
+  threads = [threading.Thread(target=lezer, args=(leesduren[nummer], random.Random(nummer)))
+             for nummer in range(LEZERS)]
+  threads.append(threading.Thread(target=schrijver))
+  begin = perf_counter_ns()
+  for thread in threads:
+    thread.start()
+  stop.wait(duur)
+  stop.set()
+  for thread in threads:
+    thread.join()
+  totaal = perf_counter_ns() - begin
+  kenmerken = {'opslag': opslag, 'sleutels': sleutels, 'scenario': 'gelijktijdig'}
+  return [resultaat(kenmerken, 'lees', [duur for duren in leesduren for duur in duren], totaal),
+          resultaat(kenmerken, 'wijzig', wijzigduren, totaal)]
+
+
+def voeruit(opslagen: list[str], aantallen: list[int], herhalingen: int, duur: float) -> dict:
+  """
+    Voer alle metingen uit
+    Args: opslagen (list): De soorten opslag
+          aantallen (list): De aantallen sleutels
+          herhalingen (int): Het aantal aanroepen per bewerking na elkaar
+          duur (float): De duur van de gelijktijdige meting in seconden
+    Returns: dict met de omgeving en de resultaten
+  """
+  resultaten = []
+  with tempfile.TemporaryDirectory() as map_:
+    for opslag in opslagen:
+      for sleutels in aantallen:
+        gegevens = maakgegevens(map_, opslag, sleutels)
+        resultaten += meetenkel(gegevens, opslag, sleutels, herhalingen)
+        resultaten += meetgelijktijdig(gegevens, opslag, sleutels, duur)
+  return metomgeving(resultaten)
+
+
+def main(argumenten: list[str] | None = None) -> None:
+  """
+    Lees de argumenten, voer de metingen uit en schrijf de resultaten
+    Args: argumenten (list): De argumenten, standaard van de commandoregel
+  """
+  parser = argparse.ArgumentParser(description='Meet de snelheid van Gegevens per soort opslag')
+  parser.add_argument('--opslag', nargs='+', default=['json', 'sqlite', 'log'])
+  parser.add_argument('--sleutels', nargs='+', type=int, default=[10, 100, 1000, 10000])
+  parser.add_argument('--herhalingen', type=int, default=200)
+  parser.add_argument('--duur', type=float, default=2.0)
+  parser.add_argument('--uitvoer', help='bestand voor de resultaten, standaard stdout')
+  opties = parser.parse_args(argumenten)
+  schrijf(voeruit(opties.opslag, opties.sleutels, opties.herhalingen, opties.duur), opties.uitvoer)
+
+
+if __name__ == '__main__':
+  main()
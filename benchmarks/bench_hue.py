@@ -0,0 +1,112 @@
+""" Meting van de hue-aansturing tegen de nagebootste bridge
+
+Gebruik: python benchmarks/bench_hue.py [--lampen 10 200] [--vertraging 0.0]
+             [--foutkans 0.0] [--herhalingen 50] [--uitvoer resultaten.json]
+Meet haallampen van thuis en opdrachten met Hue.stuuractie over echte HTTPS-
+verbindingen. De resultaten hebben dezelfde vorm als die van bench_gegevens, via meting.
+"""
+import argparse
+import importlib
+import os
+import sys
+import tempfile
+
+MAP = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(MAP))
+sys.path.insert(0, MAP)
+
+# pylint: disable=wrong-import-position
+import requests
+
+from hue import LampActie
+from meting import meet, metomgeving, resultaat, schrijf
+from nepbridge import NepBridge
+
+
+def laadthuis():
+  """
+    Importeer thuis, dat bij de eerste keer zijn gegevens in de huidige map maakt
+    Returns: module: thuis, geïmporteerd in een tijdelijke map
+  """
+  if 'thuis' in sys.modules:
+    return sys.modules['thuis']
+  huidig = os.getcwd()
+  os.chdir(tempfile.mkdtemp(prefix='bench_hue'))
+  try:
+    return importlib.import_module('thuis')
+  finally:
+    os.chdir(huidig)
+
+
+def meetbridge(bridge: NepBridge, kenmerken: dict, herhalingen: int) -> list[dict]:
+  """
+    Meet het ophalen van de lampen en het sturen van opdrachten
+    Args: bridge (NepBridge): De draaiende bridge
+          kenmerken (dict): Het aantal lampen, de vertraging en de foutkans
+          herhalingen (int): Het aantal aanroepen per bewerking
+    Returns: list met een resultaat per bewerking, met het aantal mislukte aanroepen
+  """
+  thuis = laadthuis()
+  lampids = list(bridge.lampen)
+  instellingen = {'hueip': bridge.adres, 'hueuser': 'bench',
+                  'lampen': [{'id': lampid, 'volgorde': 11} for lampid in lampids]}
+  hue = thuis.gethue(instellingen)
+  fouten = []
+
+  def haallampen() -> None:
+    thuis.lampverwachting.wis()
+    if not thuis.haallampen(instellingen):
+      fouten.append('haallampen')
+
+  def stuuractie(lampid: str) -> None:
+    try:
+      hue.stuuractie(lampid, LampActie().aan().dim(50))
+    except requests.HTTPError:
+      fouten.append('stuuractie')
+
+  resultaten = []
+  duren, totaal = meet(haallampen, [() for _ in range(herhalingen)])
+  resultaten.append({**resultaat(kenmerken, 'haallampen', duren, totaal),
+                     'fouten': fouten.count('haallampen')})
+  duren, totaal = meet(stuuractie, [(lampids[nummer % len(lampids)],)
+                                    for nummer in range(herhalingen)])
+  resultaten.append({**resultaat(kenmerken, 'stuuractie', duren, totaal),
+                     'fouten': fouten.count('stuuractie')})
+  return resultaten
+
+
+def voeruit(aantallen: list[int], vertraging: float, foutkans: float, herhalingen: int) -> dict:
+  """
+    Voer alle metingen uit
+    Args: aantallen (list): De aantallen lampen
+          vertraging (float): Seconden vertraging van de bridge per verzoek
+          foutkans (float): Kans dat de bridge een verzoek weigert
+          herhalingen (int): Het aantal aanroepen per bewerking
+    Returns: dict met de omgeving en de resultaten
+  """
+  resultaten = []
+  for lampen in aantallen:
+    with NepBridge(lampen, vertraging, foutkans) as bridge:
+      kenmerken = {'lampen': lampen, 'vertraging': vertraging, 'foutkans': foutkans}
+      resultaten += meetbridge(bridge, kenmerken, herhalingen)
+  return metomgeving(resultaten)
+
+
+def main(argumenten: list[str] | None = None) -> None:
+  """
+    Lees de argumenten, voer de metingen uit en schrijf de resultaten
+    Args: argumenten (list): De argumenten, standaard van de commandoregel
+  """
+  parser = argparse.ArgumentParser(description='Meet de hue-aansturing tegen de nagebootste bridge')
+  parser.add_argument('--lampen', nargs='+', type=int, default=[10, 200])
+  parser.add_argument('--vertraging', type=float, default=0.0)
+  parser.add_argument('--foutkans', type=float, default=0.0)
+  parser.add_argument('--herhalingen', type=int, default=50)
+  parser.add_argument('--uitvoer', help='bestand voor de resultaten, standaard stdout')
+  opties = parser.parse_args(argumenten)
+  schrijf(voeruit(opties.lampen, opties.vertraging, opties.foutkans, opties.herhalingen),
+          opties.uitvoer)
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,100 @@
+""" Gedeelde hulpmiddelen voor de metingen in deze map
+
+Tijden meten, samenvatten en met de omgeving als json wegschrijven, zodat de
+resultaten van alle metingen dezelfde vorm hebben.
+"""
+import json
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime
+from time import perf_counter_ns
+
+
+def percentiel(duren: list[int], fractie: float) -> float:
+  """
+    Bepaal een percentiel van gemeten duren
+    Args: duren (list): Gesorteerde duren in nanoseconden
+          fractie (float): Het percentiel als fractie, 0.99 voor p99
+    Returns: float: Het percentiel in microseconden
+  """
+  if not duren:
+    return 0.0
+  index = min(len(duren) - 1, int(fractie * len(duren)))
+  return round(duren[index] / 1000, 1)
+
+
+def resultaat(kenmerken: dict, bewerking: str, duren: list[int], totaal: int) -> dict:
+  """
+    Vat de metingen van een bewerking samen
+    Args: kenmerken (dict): Wat er gemeten is, zoals de soort opslag of het aantal lampen
+          bewerking (str): De gemeten bewerking
+          duren (list): Duur per aanroep in nanoseconden
+          totaal (int): Totale duur van de meting in nanoseconden
+    Returns: dict: Aantal, aanroepen per seconde, p50 en p99 in microseconden
+  """
+  duren = sorted(duren)
+  return {**kenmerken,
+          'bewerking': bewerking,
+          'aantal': len(duren),
+          'per_seconde': round(len(duren) / (totaal / 1e9), 1) if totaal else 0.0,
+          'p50_us': percentiel(duren, 0.50),
+          'p99_us': percentiel(duren, 0.99),
+          }
+
+
+def meet(functie, argumenten: list) -> tuple[list[int], int]:
+  """
+    Meet de duur van elke aanroep van een functie
+    Args: functie (Callable): De te meten functie
+          argumenten (list): Per aanroep een tuple met argumenten
+    Returns: tuple met de duur per aanroep en de totale duur in nanoseconden
+  """
+  duren = []
+  begin = perf_counter_ns()
+  for argument in argumenten:
+    start = perf_counter_ns()
+    functie(*argument)
+    duren.append(perf_counter_ns() - start)
+  return duren, perf_counter_ns() - begin
+
+
+def commit() -> str | None:
+  """
+    Bepaal de huidige commit van de repository
+    Returns: str: De hash van de commit of None buiten een git-repository
+  """
+  try:
+    return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, check=True, text=True,
+                          cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+  except (OSError, subprocess.CalledProcessError):
+    return None
+
+
+def metomgeving(resultaten: list[dict]) -> dict:
+  """
+    Voeg de omgeving van de meting toe aan de resultaten
+    Args: resultaten (list): De resultaten per bewerking
+    Returns: dict met de commit, het tijdstip, python, het platform en de resultaten
+  """
+  return {'commit': commit(),
+          'tijdstip': datetime.now().isoformat(timespec='seconds'),
+          'python': platform.python_version(),
+          'platform': platform.platform(),
+          'resultaten': resultaten,
+          }
+
+
+def schrijf(uitkomst: dict, uitvoer: str | None) -> None:
+  """
+    Schrijf de uitkomst als json
+    Args: uitkomst (dict): De omgeving en de resultaten
+          uitvoer (str): Het bestand voor de uitkomst, None voor stdout
+  """
+  if uitvoer:
+    with open(uitvoer, 'w', encoding='utf-8') as bestand:
+      json.dump(uitkomst, bestand, indent=2)
+  else:
+    json.dump(uitkomst, sys.stdout, indent=2)
+    print()
@@ -0,0 +1,338 @@
+""" Nagebootste hue bridge met CLIP v2 over HTTPS voor tests en metingen
+
+Gebruik: python benchmarks/nepbridge.py [--lampen 200] [--vertraging 0.05]
+             [--foutkans 0.01] [--poort 8443] [--gebruiker sleutel]
+De bridge geeft de lampen op /clip/v2/resource/light, verwerkt PUT-opdrachten
+op lampen en groepen en stuurt elke wijziging als event op /eventstream/clip/v2.
+Het certificaat wordt bij de eerste bridge met openssl in een tijdelijke map
+gemaakt en is zelf ondertekend; de Hue-client controleert het niet.
+"""
+import argparse
+import atexit
+import copy
+import json
+import os
+import queue
+import random
+import shutil
+import ssl
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# pylint: disable=wrong-import-position
+from cachetools import cached
+
+from lampstatus import voegsamen
+
+ARCHETYPES = ('sultan_bulb', 'candle_bulb', 'spot_bulb', 'hue_lightstrip', 'pendant_round')
+
+
+@cached(cache={}, lock=threading.Lock())
+def maakcertificaat() -> tuple[str, str]:
+  """
+    Maak eenmalig per proces een zelf ondertekend certificaat voor 127.0.0.1 en localhost
+    De map met het certificaat en de sleutel wordt bij het afsluiten verwijderd.
+    Returns: tuple met de bestanden van het certificaat en de sleutel
+  """
+  map_ = tempfile.mkdtemp(prefix='nepbridge')
+  atexit.register(shutil.rmtree, map_, True)
+  certificaat, sleutel = os.path.join(map_, 'nepbridge.crt'), os.path.join(map_, 'nepbridge.key')
+  subprocess.run(['openssl', 'req', '-x509', '-nodes', '-days', '1',
+                  '-newkey', 'ec', '-pkeyopt', 'ec_paramgen_curve:prime256v1',
+                  '-subj', '/CN=nepbridge',
+                  '-addext', 'subjectAltName=IP:127.0.0.1,DNS:localhost',
+                  '-keyout', sleutel, '-out', certificaat],
+                 check=True, capture_output=True)
+  return certificaat, sleutel
+
+
+def maaklampen(aantal: int) -> dict[str, dict]:
+  """
+    Maak lampen zoals een bridge ze op 'light' geeft
+    Args: aantal (int): Het aantal lampen
+    Returns: dict: Per ID de lamp, elke derde lamp zonder kleur
+  """
+  lampen = {}
+  for nummer in range(aantal):
+    lampid = str(uuid.uuid5(uuid.NAMESPACE_URL, f'nepbridge/light/{nummer}'))
+    lamp = {'id': lampid,
+            'type': 'light',
+            'metadata': {'name': f'Lamp {nummer + 1:03d}',
+                         'archetype': ARCHETYPES[nummer % len(ARCHETYPES)]},
+            'on': {'on': nummer % 2 == 0},
+            'dimming': {'brightness': float(10 + nummer % 90)}}
+    if nummer % 3:
+      lamp['color'] = {'xy': {'x': 0.4573, 'y': 0.41},
+                       'gamut': {'red': {'x': 0.6915, 'y': 0.3083},
+                                 'green': {'x': 0.17, 'y': 0.7},
+                                 'blue': {'x': 0.1532, 'y': 0.0475}},
+                       'gamut_type': 'C'}
+    lampen[lampid] = lamp
+  return lampen
+
+
+class NepBridge(ThreadingHTTPServer):  # pylint: disable=too-many-instance-attributes
+  """
+    Hue bridge op 127.0.0.1 met instelbare vertraging, foutkans en aantal lampen
+    Gebruik als 'with NepBridge(...) as bridge' en geef bridge.adres als hueip aan Hue.
+  """
+  daemon_threads = True
+
+  def __init__(self, lampen: int = 200, vertraging: float = 0.0, foutkans: float = 0.0,
+               poort: int = 0, gebruiker: str | None = None):
+    """
+      Maken van de bridge, die luistert met start()
+      Args: lampen (int): Het aantal lampen
+            vertraging (float): Seconden vertraging voor elk antwoord
+            foutkans (float): Kans van 0 tot 1 dat een verzoek 503 geeft
+            poort (int): De poort, 0 voor een vrije poort
+            gebruiker (str): De verplichte hue-application-key, None voor elke sleutel
+    """
+    super().__init__(('127.0.0.1', poort), NepBridgeHandler)
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(*maakcertificaat())
+    self.socket = context.wrap_socket(self.socket, server_side=True)
+    self.vertraging = vertraging
+    self.foutkans = foutkans
+    self.gebruiker = gebruiker
+    self.lampen = maaklampen(lampen)
+    self.verzoeken = {'GET': 0, 'PUT': 0}
+    self._streams: list[queue.Queue] = []
+    self._kans = random.Random(lampen)
+    self._slot = threading.Lock()
+
+  @property
+  def adres(self) -> str:
+    """ Het adres met poort om als hueip te gebruiken """
+    return f'127.0.0.1:{self.server_port}'
+
+  @property
+  def certificaat(self) -> str:
+    """ Het bestand met het certificaat, voor clients die het wel controleren """
+    return maakcertificaat()[0]
+
+  def __enter__(self) -> 'NepBridge':
+    return self.start()
+
+  def __exit__(self, *args) -> None:
+    self.stop()
+
+  def start(self) -> 'NepBridge':
+    """
+      Start de bridge in een achtergrondthread
+      Returns: NepBridge: De bridge zelf
+    """
+    threading.Thread(target=self.serve_forever, name='nepbridge', daemon=True).start()
+    return self
+
+  def stop(self) -> None:
+    """
+      Stop de bridge en sluit de open eventstreams
+    """
+    with self._slot:
+      for stream in self._streams:
+        stream.put(None)
+    self.shutdown()
+    self.server_close()
+
+  def tel(self, methode: str) -> bool:
+    """
+      Tel een verzoek en bepaal of het mislukt volgens de foutkans
+      Args: methode (str): GET of PUT
+      Returns: bool: True als het verzoek een fout moet geven
+    """
+    with self._slot:
+      self.verzoeken[methode] = self.verzoeken.get(methode, 0) + 1
+      return self._kans.random() < self.foutkans
+
+  def lampdata(self, lampid: str | None = None) -> list[dict] | None:
+    """
+      Een kopie van de lampen
+      Args: lampid (str): Alleen deze lamp, None voor alle lampen
+      Returns: list: De lampen, of None als de lamp niet bestaat
+    """
+    with self._slot:
+      if lampid is None:
+        return copy.deepcopy(list(self.lampen.values()))
+      if lampid not in self.lampen:
+        return None
+      return [copy.deepcopy(self.lampen[lampid])]
+
+  def wijzig(self, soort: str, resourceid: str, gegevens: dict) -> bool:
+    """
+      Verwerk een opdracht en stuur de wijziging naar de eventstreams
+      Een groep zet de opdracht door naar alle lampen.
+      Args: soort (str): 'light' of 'grouped_light'
+            resourceid (str): Het ID van de lamp of groep
+            gegevens (dict): De opdracht
+      Returns: bool: False als de lamp niet bestaat
+    """
+    with self._slot:
+      if soort == 'light' and resourceid not in self.lampen:
+        return False
+      lampids = [resourceid] if soort == 'light' else list(self.lampen)
+      gewijzigd = {key: value for key, value in gegevens.items() if key != 'dynamics'}
+      for lampid in lampids:
+        voegsamen(self.lampen[lampid], gewijzigd)
+      event = {'creationtime': datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+               'id': str(uuid.uuid4()),
+               'type': 'update',
+               'data': [{'id': lampid, 'type': 'light', **copy.deepcopy(gewijzigd)}
+                        for lampid in lampids]}
+      for stream in self._streams:
+        stream.put(event)
+    return True
+
+  def volg(self) -> queue.Queue:
+    """
+      Meld een nieuwe eventstream aan
+      Returns: Queue: De events voor de stream, None als de bridge stopt
+    """
+    stream: queue.Queue = queue.Queue()
+    with self._slot:
+      self._streams.append(stream)
+    return stream
+
+  @property
+  def volgers(self) -> int:
+    """ Het aantal open eventstreams """
+    with self._slot:
+      return len(self._streams)
+
+  def ontvolg(self, stream: queue.Queue) -> None:
+    """
+      Meld een gesloten eventstream af
+      Args: stream (Queue): De events van de stream
+    """
+    with self._slot:
+      self._streams.remove(stream)
+
+
+class NepBridgeHandler(BaseHTTPRequestHandler):
+  """ Afhandelen van de verzoeken aan de NepBridge """
+  server: NepBridge
+  protocol_version = 'HTTP/1.1'
+  # Kop en inhoud gaan apart over de lijn; zonder TCP_NODELAY wacht elk antwoord op een ACK
+  disable_nagle_algorithm = True
+
+  def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+    pass
+
+  def stuur(self, status: int, gegevens: dict) -> None:
+    """
+      Stuur een JSON-antwoord
+      Args: status (int): De HTTP-status
+            gegevens (dict): Het antwoord
+    """
+    inhoud = json.dumps(gegevens).encode()
+    self.send_response(status)
+    self.send_header('Content-Type', 'application/json')
+    self.send_header('Content-Length', str(len(inhoud)))
+    self.end_headers()
+    self.wfile.write(inhoud)
+
+  def fout(self, status: int, beschrijving: str) -> None:
+    """
+      Stuur een fout zoals de bridge die geeft
+      Args: status (int): De HTTP-status
+            beschrijving (str): De beschrijving van de fout
+    """
+    self.stuur(status, {'errors': [{'description': beschrijving}], 'data': []})
+
+  def controleer(self, methode: str) -> bool:
+    """
+      Wacht de vertraging af en controleer de sleutel en de foutkans
+      Args: methode (str): GET of PUT
+      Returns: bool: True als het verzoek verwerkt mag worden
+    """
+    time.sleep(self.server.vertraging)
+    if self.server.tel(methode):
+      self.fout(503, 'service unavailable')
+      return False
+    if self.server.gebruiker is not None and \
+        self.headers.get('hue-application-key') != self.server.gebruiker:
+      self.fout(403, 'unauthorized user')
+      return False
+    return True
+
+  def do_GET(self):  # pylint: disable=invalid-name
+    """ Geef de lampen of start de eventstream """
+    if self.path == '/eventstream/clip/v2':
+      self.volgevents()
+      return
+    if not self.controleer('GET'):
+      return
+    delen = self.path.split('/')
+    if self.path.startswith('/clip/v2/resource/light'):
+      lampen = self.server.lampdata(delen[5] if len(delen) > 5 else None)
+      if lampen is None:
+        self.fout(404, 'resource not found')
+      else:
+        self.stuur(200, {'errors': [], 'data': lampen})
+    elif self.path.startswith('/clip/v2/resource/'):
+      self.stuur(200, {'errors': [], 'data': []})
+    else:
+      self.fout(404, 'resource not found')
+
+  def do_PUT(self):  # pylint: disable=invalid-name
+    """ Verwerk een opdracht voor een lamp of groep """
+    gegevens = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+    if not self.controleer('PUT'):
+      return
+    delen = self.path.split('/')
+    if len(delen) != 6 or delen[4] not in ('light', 'grouped_light') or \
+        not self.server.wijzig(delen[4], delen[5], gegevens):
+      self.fout(404, 'resource not found')
+      return
+    self.stuur(200, {'errors': [], 'data': [{'rid': delen[5], 'rtype': delen[4]}]})
+
+  def volgevents(self) -> None:
+    """ Stuur de events tot de client of de bridge stopt """
+    stream = self.server.volg()
+    try:
+      self.send_response(200)
+      self.send_header('Content-Type', 'text/event-stream')
+      self.send_header('Connection', 'close')
+      self.end_headers()
+      self.wfile.write(b': hi\n\n')
+      self.wfile.flush()
+      while (event := stream.get()) is not None:
+        self.wfile.write(f'id: {event["id"]}:0\ndata: {json.dumps([event])}\n\n'.encode())
+        self.wfile.flush()
+    except OSError:
+      pass
+    finally:
+      self.server.ontvolg(stream)
+
+
+def main(argumenten: list[str] | None = None) -> None:
+  """
+    Lees de argumenten en laat de bridge draaien tot Ctrl-C
+    Args: argumenten (list): De argumenten, standaard van de commandoregel
+  """
+  parser = argparse.ArgumentParser(description='Nagebootste hue bridge met CLIP v2 over HTTPS')
+  parser.add_argument('--lampen', type=int, default=200)
+  parser.add_argument('--vertraging', type=float, default=0.0, help='seconden per verzoek')
+  parser.add_argument('--foutkans', type=float, default=0.0, help='kans op 503 per verzoek')
+  parser.add_argument('--poort', type=int, default=8443)
+  parser.add_argument('--gebruiker', help='verplichte hue-application-key')
+  opties = parser.parse_args(argumenten)
+  with NepBridge(opties.lampen, opties.vertraging, opties.foutkans,
+                 opties.poort, opties.gebruiker) as bridge:
+    print(f'Nagebootste bridge op https://{bridge.adres} met {opties.lampen} lampen')
+    try:
+      threading.Event().wait()
+    except KeyboardInterrupt:
+      pass
+
+
+if __name__ == '__main__':
+  main()
@@ -1,20 +1,212 @@
 """ Beheer van gegevens in een bestand """
-from typing import Any
+import atexit
+import copy
+import threading
+from contextlib import contextmanager
+from time import sleep
+from types import MappingProxyType
+from typing import Any, Hashable, Iterable, Iterator, Mapping
 
-from pysondb import db
+from opslag import VERWIJDERD, maakopslag
+from sloten import LeesSchrijfSlot, ProcesSlot
+
+
+class Uitstel:
+  """
+    Sleutels waarvan wijzigingen uitgesteld bewaard worden
+    Verlies van de laatste wijzigingen bij een crash is voor deze sleutels geen probleem.
+  """
+
+  def __init__(self, sleutels: Iterable[str] = (), interval: float = 30.0):
+    """
+      Maken van het uitstel
+      Args: sleutels (Iterable): De uitgesteld te bewaren sleutels
+            interval (float): Aantal seconden waarin wijzigingen worden verzameld
+    """
+    self.sleutels = frozenset(sleutels)
+    self.interval = interval
+    self.wijzigingen: dict[str, Any] = {}
+    self.wekker = threading.Event()
+
+  def voegtoe(self, wijzigingen: dict[str, Any]) -> None:
+    """
+      Voeg wijzigingen toe en wek de thread die ze bewaart
+      De wijzigingen worden vervangen zodat eerder gelezen wijzigingen niet veranderen.
+      Args: wijzigingen (dict): Per sleutel de nieuwe waarde of VERWIJDERD
+    """
+    self.wijzigingen = {**self.wijzigingen, **wijzigingen}
+    self.wekker.set()
+
+  def vergeet(self, sleutels: Iterable[str]) -> None:
+    """
+      Vergeet de wijzigingen van sleutels die inmiddels bewaard zijn
+      Args: sleutels (Iterable): De bewaarde sleutels
+    """
+    if not self.wijzigingen.keys().isdisjoint(sleutels):
+      self.wijzigingen = {sleutel: waarde for sleutel, waarde in self.wijzigingen.items()
+                          if sleutel not in sleutels}
 
 
 class Gegevens:
   """
     Beheer van gegevens
+    De gegevens worden in het geheugen bijgehouden en alleen opnieuw
+    ingelezen wanneer de opslag buiten deze instantie is gewijzigd.
+    Meerdere wijzigingen kunnen met transactie() worden samengevoegd.
+    Lezers in verschillende threads wachten niet op elkaar, alleen op een schrijver.
+    Gelezen waarden zijn kopieën, wijzigen ervan heeft pas effect na wijzig().
+    Wijzigingen van uitgestelde sleutels zijn direct te lezen, maar worden
+    door een achtergrondthread hoogstens eens per interval samen bewaard.
   """
 
-  def __init__(self, bestand: str):
+  def __init__(self, bestand: str, opslag: str = 'json', processlot: bool = False,
+               uitgesteld: Iterable[str] = (), interval: float = 30.0):
     """
     Maken of openen van een bestand
       Args: bestand(str): naam van het bestand
+            opslag(str): soort opslag, 'json', 'sqlite' of 'log'
+            processlot(bool): wijzigingen van meerdere processen na elkaar uitvoeren
+                              met een fcntl-slot op <bestand>.proces.lock
+            uitgesteld(Iterable): sleutels waarvan wijzigingen uitgesteld bewaard worden
+            interval(float): aantal seconden tussen het bewaren van uitgestelde wijzigingen
+    """
+    self.bestand = bestand
+    self.opslag = maakopslag(bestand, opslag)
+    self._cache: dict[str, Any] = {}
+    self._versie: Hashable | None = None
+    self._lokaal = threading.local()
+    self._slot = LeesSchrijfSlot(ProcesSlot(f'{bestand}.proces.lock') if processlot else None)
+    self._uitstel = Uitstel(uitgesteld, interval)
+    if self._uitstel.sleutels:
+      threading.Thread(target=self._schrijfwegperiodiek, daemon=True).start()
+      atexit.register(self.schrijfweg)
+
+  def _actueel(self) -> bool:
+    """
+      Bepaal of de gegevens in het geheugen overeenkomen met de opslag
+      Returns: bool: True als opnieuw inlezen niet nodig is
+    """
+    versie = self.opslag.versie()
+    return versie is not None and versie == self._versie
+
+  def _ververs(self) -> None:
+    """
+      Lees de opslag opnieuw in wanneer deze buiten dit object is gewijzigd
+    """
+    versie = self.opslag.versie()
+    if versie is not None and versie == self._versie:
+      return
+    self._cache = self.opslag.laad()
+    self._versie = versie
+
+  def _gelezen(self) -> tuple[dict[str, Any], dict[str, Any]]:
+    """
+      Geef de actuele gegevens in het geheugen met de nog niet bewaarde uitgestelde wijzigingen
+      Alleen wanneer opnieuw inlezen nodig is wordt het slot voor schrijven gebruikt.
+      Returns: tuple met de gegevens en de uitgestelde wijzigingen, deze mogen niet
+               gewijzigd worden
     """
-    self.gegevens = db.getDb(bestand)
+    with self._slot.lezen():
+      if self._actueel():
+        return self._cache, self._uitstel.wijzigingen
+    with self._slot.schrijven():
+      self._ververs()
+      return self._cache, self._uitstel.wijzigingen
+
+  def _openstaand(self) -> dict[str, Any] | None:
+    """
+      Geef de nog niet bewaarde wijzigingen van de transactie in deze thread
+      Returns: dict met wijzigingen of None als er geen transactie loopt
+    """
+    return getattr(self._lokaal, 'wijzigingen', None)
+
+  def _pasaan(self, wijzigingen: dict[str, Any]) -> None:
+    """
+      Voer wijzigingen door in de opslag met een enkele schrijfactie
+      Pas na een geslaagde schrijfactie worden de gegevens in het geheugen vervangen
+      Args: wijzigingen (dict): Per sleutel de nieuwe waarde of VERWIJDERD
+    """
+    with self._slot.schrijven(), self.opslag.slot():
+      self._ververs()
+      cache = dict(self._cache)
+      gewijzigd = {}
+      for sleutel, waarde in wijzigingen.items():
+        if waarde is VERWIJDERD:
+          if sleutel in cache:
+            del cache[sleutel]
+            gewijzigd[sleutel] = waarde
+          continue
+        if sleutel in cache and cache[sleutel] == waarde:
+          continue
+        cache[sleutel] = waarde
+        gewijzigd[sleutel] = waarde
+      if gewijzigd:
+        self.opslag.bewaar(cache, gewijzigd)
+        self._cache = cache
+        self._versie = self.opslag.versie()
+      self._uitstel.vergeet(wijzigingen)
+
+  def schrijfweg(self) -> None:
+    """
+      Bewaar de uitgestelde wijzigingen met een enkele schrijfactie
+    """
+    with self._slot.schrijven():
+      if self._uitstel.wijzigingen:
+        self._pasaan(self._uitstel.wijzigingen)
+
+  def _schrijfwegperiodiek(self) -> None:
+    """
+      Bewaar uitgestelde wijzigingen zodra er een interval lang zijn verzameld
+    """
+    while True:
+      self._uitstel.wekker.wait()
+      sleep(self._uitstel.interval)
+      self._uitstel.wekker.clear()
+      try:
+        self.schrijfweg()
+      except OSError as e:
+        print(f'Bewaren van {self.bestand} mislukt: {e}')
+        self._uitstel.wekker.set()
+
+  @contextmanager
+  def transactie(self) -> Iterator['Gegevens']:
+    """
+      Bundel wijzigingen tot een enkele schrijfactie aan het einde van het blok
+      Andere threads zien alle wijzigingen tegelijk of geen enkele,
+      bij een exceptie in het blok wordt niets bewaard.
+      Returns: Iterator met dit object
+    """
+    if self._openstaand() is not None:
+      yield self
+      return
+    self._lokaal.wijzigingen = {}
+    try:
+      yield self
+      wijzigingen = self._lokaal.wijzigingen
+    finally:
+      self._lokaal.wijzigingen = None
+    self._pasaan(wijzigingen)
+
+  def _verwerk(self, wijzigingen: dict[str, Any]) -> None:
+    """
+      Bewaar wijzigingen direct of verzamel ze in de lopende transactie
+      Args: wijzigingen (dict): Per sleutel de nieuwe waarde of VERWIJDERD
+    """
+    wijzigingen = {sleutel: waarde if waarde is VERWIJDERD else copy.deepcopy(waarde)
+                   for sleutel, waarde in wijzigingen.items()}
+    openstaand = self._openstaand()
+    if openstaand is not None:
+      openstaand.update(wijzigingen)
+      return
+    uitgesteld = {sleutel: waarde for sleutel, waarde in wijzigingen.items()
+                  if sleutel in self._uitstel.sleutels}
+    if uitgesteld:
+      with self._slot.schrijven():
+        self._uitstel.voegtoe(uitgesteld)
+    direct = {sleutel: waarde for sleutel, waarde in wijzigingen.items()
+              if sleutel not in uitgesteld}
+    if direct:
+      self._pasaan(direct)
 
   def schrijf(self, sleutel: str, waarde: Any):
     """
@@ -22,7 +214,7 @@ class Gegevens:
       Args: sleutel (str): De naam van het gegeven
             waarde (Any): De waarde
     """
-    self.gegevens.add({'env': sleutel, 'value': waarde})
+    self.wijzig(sleutel, waarde)
 
   def lees(self, sleutel: str):
     """
@@ -30,10 +222,30 @@ class Gegevens:
       Args: sleutel (str): De naam van het op te halen gegeven
       Returns: De waarde van het gegeven of None als het niet bestaat
     """
-    rijen = self.gegevens.getByQuery({'env': sleutel})
-    if len(rijen) != 1:
-      return None
-    return rijen[0].get('value')
+    wijzigingen = self._openstaand()
+    if wijzigingen is not None and sleutel in wijzigingen:
+      waarde = wijzigingen[sleutel]
+    else:
+      cache, uitgesteld = self._gelezen()
+      waarde = uitgesteld[sleutel] if sleutel in uitgesteld else cache.get(sleutel)
+    return None if waarde is VERWIJDERD else copy.deepcopy(waarde)
+
+  def snapshot(self) -> Mapping[str, Any]:
+    """
+      Lees alle gegevens in een keer
+      Alle waarden komen uit dezelfde versie van de opslag, aangevuld met de
+      uitgestelde wijzigingen en de wijzigingen van een lopende transactie in deze thread.
+      Returns: Mapping: Niet te wijzigen overzicht met per sleutel de waarde
+    """
+    cache, uitgesteld = self._gelezen()
+    gegevens = dict(cache)
+    for wijzigingen in (uitgesteld, self._openstaand() or {}):
+      for sleutel, waarde in wijzigingen.items():
+        if waarde is VERWIJDERD:
+          gegevens.pop(sleutel, None)
+        else:
+          gegevens[sleutel] = waarde
+    return MappingProxyType(copy.deepcopy(gegevens))
 
   def leesint(self, sleutel: str, waarde: int):
     """
@@ -49,18 +261,15 @@ class Gegevens:
 
   def wijzig(self, sleutel: str, waarde: Any):
     """
-      Wijzig gegevens in het bestand
+      Wijzig of voeg gegevens toe in het bestand met een enkele schrijfactie
       Args: sleutel (str): De naam van het gegeven
             waarde (Any): De waarde
     """
-    self.verwijder(sleutel)
-    self.schrijf(sleutel, waarde)
+    self._verwerk({sleutel: waarde})
 
   def verwijder(self, sleutel: str):
     """
       Verwijder gegevens uit het bestand
       Args: sleutel (str): De naam van het te verwijderen gegeven
     """
-    rows = self.gegevens.getByQuery({'env': sleutel})
-    for row in rows:
-      self.gegevens.deleteById(row.get('id'))
+    self._verwerk({sleutel: VERWIJDERD})
@@ -0,0 +1,31 @@
+""" Gelijktijdig ophalen met een gezamenlijke wachttijd """
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Callable, Mapping
+
+
+def haalbinnentijd(opdrachten: Mapping[str, Callable[[], Any]], wachttijd: float) -> dict[str, Any]:
+  """
+    Voer opdrachten gelijktijdig uit en wacht hoogstens wachttijd seconden op allemaal
+    Een te late opdracht loopt op de achtergrond af, maar het resultaat wordt niet gebruikt.
+    Fouten worden gemeld maar houden de andere opdrachten niet tegen.
+    Args: opdrachten (Mapping): Per naam een opdracht zonder argumenten
+          wachttijd (float): De gezamenlijke wachttijd in seconden
+    Returns: dict: Per naam het resultaat, of None als de opdracht te laat of mislukt is
+  """
+  if not opdrachten:
+    return {}
+  uitvoerder = ThreadPoolExecutor(max_workers=len(opdrachten), thread_name_prefix='haalbinnentijd')
+  taken = {naam: uitvoerder.submit(opdracht) for naam, opdracht in opdrachten.items()}
+  wait(taken.values(), timeout=wachttijd)
+  # Niet wachten op te late opdrachten, die houden de threads zelf nog even bezig
+  uitvoerder.shutdown(wait=False)
+  resultaten = {}
+  for naam, taak in taken.items():
+    resultaten[naam] = None
+    if not taak.done():
+      print(f'{naam} niet binnen {wachttijd} seconden opgehaald')
+    elif taak.exception() is not None:
+      print(f'Ophalen van {naam} mislukt: {taak.exception()}')
+    else:
+      resultaten[naam] = taak.result()
+  return resultaten
@@ -0,0 +1,156 @@
+""" Historie van metingen in een ringbuffer in een bestand """
+import bisect
+import mmap
+import os
+import struct
+import threading
+from typing import Iterator
+
+KOP = struct.Struct('<4sIII')
+MERK = b'TRB1'
+
+
+class _Tijden:
+  """
+    Tijdstippen van de tijdreeks in volgorde, voor het zoeken met bisect
+  """
+
+  def __init__(self, tijden: memoryview, begin: int, aantal: int):
+    self.tijden = tijden
+    self.begin = begin
+    self.aantal = aantal
+    self.capaciteit = len(tijden)
+
+  def __len__(self) -> int:
+    return self.aantal
+
+  def __getitem__(self, index: int) -> int:
+    return self.tijden[(self.begin + index) % self.capaciteit]
+
+
+class Tijdreeks:
+  """
+    Tijdreeks van (tijdstip, waarde) in een ringbuffer met een vaste grootte
+    De tijdstippen (seconden sinds epoch) en waarden staan als 32-bits getallen
+    in een bestand dat in het geheugen is afgebeeld. Wanneer de buffer vol is
+    wordt de oudste meting overschreven.
+  """
+
+  def __init__(self, bestand: str, capaciteit: int = 32768):
+    """
+      Maken of openen van een tijdreeks
+      Args: bestand (str): naam van het bestand
+            capaciteit (int): aantal metingen bij het aanmaken van het bestand,
+                              een bestaand bestand houdt zijn eigen capaciteit
+    """
+    self.bestand = bestand
+    self._slot = threading.Lock()
+    if not os.path.exists(bestand) or os.path.getsize(bestand) < KOP.size:
+      with open(bestand, 'wb') as nieuw:
+        nieuw.write(KOP.pack(MERK, capaciteit, 0, 0))
+        nieuw.truncate(KOP.size + capaciteit * 8)
+    with open(bestand, 'r+b') as bestaand:
+      merk, capaciteit, _, _ = KOP.unpack(bestaand.read(KOP.size))
+      if merk != MERK:
+        raise ValueError(f'{bestand} is geen tijdreeks')
+      self._buffer = mmap.mmap(bestaand.fileno(), KOP.size + capaciteit * 8)
+    self._geheugen = memoryview(self._buffer)
+    self._kop = self._geheugen[:KOP.size]
+    self.tijden = self._geheugen[KOP.size:KOP.size + capaciteit * 4].cast('I')
+    self.waarden = self._geheugen[KOP.size + capaciteit * 4:].cast('i')
+
+  @property
+  def capaciteit(self) -> int:
+    """ Het maximale aantal metingen in de tijdreeks """
+    return len(self.tijden)
+
+  @property
+  def aantal(self) -> int:
+    """ Het aantal metingen in de tijdreeks """
+    return KOP.unpack(self._kop)[2]
+
+  @property
+  def begin(self) -> int:
+    """ De plek van de oudste meting in de buffer """
+    return KOP.unpack(self._kop)[3]
+
+  def voegtoe(self, tijdstip: int, waarde: int) -> None:
+    """
+      Voeg een meting toe en overschrijf de oudste meting als de buffer vol is
+      Een tijdstip voor de laatste meting wordt gelijk gemaakt aan de laatste meting.
+      Args: tijdstip (int): seconden sinds epoch
+            waarde (int): De gemeten waarde
+    """
+    with self._slot:
+      aantal, begin = self.aantal, self.begin
+      if aantal:
+        tijdstip = max(tijdstip, self.tijden[(begin + aantal - 1) % self.capaciteit])
+      plek = (begin + aantal) % self.capaciteit
+      self.tijden[plek] = tijdstip
+      self.waarden[plek] = waarde
+      if aantal < self.capaciteit:
+        aantal += 1
+      else:
+        begin = (begin + 1) % self.capaciteit
+      KOP.pack_into(self._kop, 0, MERK, self.capaciteit, aantal, begin)
+
+  def _reeks(self, van: int, tot: int) -> Iterator[tuple[int, int]]:
+    """
+      Loop door de metingen in een periode
+      Args: van (int): tijdstip vanaf, inclusief
+            tot (int): tijdstip tot, exclusief
+      Returns: Iterator met (tijdstip, waarde)
+    """
+    tijden = _Tijden(self.tijden, self.begin, self.aantal)
+    for index in range(bisect.bisect_left(tijden, van), bisect.bisect_left(tijden, tot)):
+      plek = (tijden.begin + index) % tijden.capaciteit
+      yield self.tijden[plek], self.waarden[plek]
+
+  def zoek(self, van: int, tot: int) -> list[tuple[int, int]]:
+    """
+      Zoek de metingen in een periode
+      Args: van (int): tijdstip vanaf, inclusief
+            tot (int): tijdstip tot, exclusief
+      Returns: list met (tijdstip, waarde)
+    """
+    with self._slot:
+      return list(self._reeks(van, tot))
+
+  def samenvatting(self, van: int, tot: int, interval: int) -> list[dict]:
+    """
+      Vat de metingen in een periode samen per interval
+      Args: van (int): tijdstip vanaf, inclusief
+            tot (int): tijdstip tot, exclusief
+            interval (int): lengte van een interval in seconden
+      Returns: list met per interval met metingen het begin, gemiddelde, minimum en maximum
+    """
+    punten = []
+    with self._slot:
+      start, totaal, aantal, laagste, hoogste = None, 0, 0, 0, 0
+      for tijdstip, waarde in self._reeks(van, tot):
+        vak = van + (tijdstip - van) // interval * interval
+        if vak != start:
+          if aantal:
+            punten.append({'tijd': start, 'gemiddeld': round(totaal / aantal),
+                           'min': laagste, 'max': hoogste})
+          start, totaal, aantal, laagste, hoogste = vak, 0, 0, waarde, waarde
+        totaal += waarde
+        aantal += 1
+        laagste = min(laagste, waarde)
+        hoogste = max(hoogste, waarde)
+      if aantal:
+        punten.append({'tijd': start, 'gemiddeld': round(totaal / aantal),
+                       'min': laagste, 'max': hoogste})
+    return punten
+
+  def sluit(self) -> None:
+    """
+      Schrijf de buffer naar het bestand en sluit het
+    """
+    with self._slot:
+      self.tijden.release()
+      self.waarden.release()
+      self._kop.release()
+      self._geheugen.release()
+      self._buffer.flush()
+      self._buffer.close()
@@ -1,55 +1,156 @@
 """ Aansturing van hue """
 import json
+from concurrent.futures import Future
+from typing import Iterator
 
 import requests
 import urllib3
+from requests.adapters import HTTPAdapter
+
+from wachtrij import Emmer, OpdrachtWachtrij
+
+# De bridge heeft een eigen certificaat, de waarschuwing daarover wordt eenmalig uitgezet
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+# Het aantal verbindingen dat per bridge open blijft
+POOLGROOTTE = 10
+# De bridge verwerkt ongeveer 10 opdrachten voor lampen per seconde
+OPDRACHTENPERSECONDE = 10
+
+
+class LampActie:
+  """ Opbouw van een opdracht voor een lamp
+  Aan, helderheid, kleur en overgang worden in een keer verstuurd zodat
+  de lamp in een stap naar de nieuwe toestand gaat.
+  """
+
+  def __init__(self):
+    """ Maken van een lege opdracht """
+    self.data: dict = {}
+
+  def aan(self, status: bool = True) -> 'LampActie':
+    """ Zet de lamp aan of uit
+    Args: status (bool): True voor aan, False voor uit
+    Returns: LampActie: De opdracht zelf
+    """
+    self.data['on'] = {'on': status}
+    return self
+
+  def dim(self, helderheid: float) -> 'LampActie':
+    """ Zet de helderheid van de lamp
+    Args: helderheid (float): De gewenste helderheid als percentage
+    Returns: LampActie: De opdracht zelf
+    """
+    self.data['dimming'] = {'brightness': helderheid}
+    return self
+
+  def kleur(self, xwaarde: float, ywaarde: float) -> 'LampActie':
+    """ Zet de kleur van de lamp
+    Args: xwaarde (float): De x-coordinaat van de kleur in CIE xy
+          ywaarde (float): De y-coordinaat van de kleur in CIE xy
+    Returns: LampActie: De opdracht zelf
+    """
+    self.data['color'] = {'xy': {'x': xwaarde, 'y': ywaarde}}
+    return self
+
+  def overgang(self, duur: int) -> 'LampActie':
+    """ Zet de duur van de overgang naar de nieuwe toestand
+    Args: duur (int): De duur in milliseconden
+    Returns: LampActie: De opdracht zelf
+    """
+    self.data['dynamics'] = {'duration': duur}
+    return self
 
 
 class Hue:
   """ Aansturing van hue """
 
-  def __init__(self, hueip: str, hueuser: str):
+  def __init__(self, hueip: str, hueuser: str, gelijktijdig: int = 4):
     """ Verbinding met de hue bridge
+    De verbindingen blijven open zodat volgende opdrachten geen nieuwe
+    TCP- en TLS-verbinding nodig hebben.
     Args: hueip (str): Het IP-adres van de Hue bridge
           hueuser (str): De geautoriseerde gebruiker
+          gelijktijdig (int): Het aantal opdrachten uit de wachtrij dat tegelijk onderweg mag zijn
     """
     self.hueip = hueip
     self.hueuser = hueuser
+    self.basisurl = f'https://{hueip}'
+    self.sessie = requests.Session()
+    # Ook per verzoek verify=False: REQUESTS_CA_BUNDLE gaat voor de instelling van de sessie
+    self.sessie.verify = False
+    self.sessie.headers.update({'Content-type': 'application/json',
+                                'hue-application-key': hueuser})
+    self.sessie.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=POOLGROOTTE))
+    self.wachtrij = OpdrachtWachtrij(self.stuurgegevens,
+                                     Emmer(OPDRACHTENPERSECONDE, OPDRACHTENPERSECONDE),
+                                     gelijktijdig=gelijktijdig)
 
   def haalgegevens(self, path: str) -> dict:
     """
     Ophalen van gegevens van de hue bridge
-    Args: hueip (str): Het IP-adres van de Hue bridge
-          hueuser (str): De geautoriseerde gebruiker
-          path (str): Het pad naar de op te vragen gegevens
+    Args: path (str): Het pad naar de op te vragen gegevens
     Returns: dict: De opgehaalde gegevens in JSON -formaat
     """
-    urllib3.disable_warnings()
-    url = f'https://{self.hueip}/clip/v2/resource/{path}'
-    headers = {'Content-type': 'application/json',
-               'hue-application-key': self.hueuser}
-    with requests.get(url=url,
-                      headers=headers,
-                      timeout=5,
-                      verify=False) as response:
+    url = f'{self.basisurl}/clip/v2/resource/{path}'
+    with self.sessie.get(url=url, timeout=5, verify=False) as response:
       return response.json()
 
   def stuurgegevens(self, path: str, data: dict) -> dict:
     """
     Sturen van gegevens naar de hue bridge
-    Args: hueip (str): Het IP-adres van de Hue bridge
-          hueuser (str): De geautoriseerde gebruiker
-          path (str): Het pad voor de te versturen gegevens
+    Args: path (str): Het pad voor de te versturen gegevens
           data (dict): De te versturen gegevens
     Returns: dict: Het antwoord van de bridge in JSON-formaat
     """
-    urllib3.disable_warnings()
-    url = f'https://{self.hueip}/clip/v2/resource/{path}'
-    headers = {'Content-type': 'application/json',
-               'hue-application-key': self.hueuser}
-    with requests.put(url=url,
-                      headers=headers,
-                      timeout=5,
-                      verify=False,
-                      data=json.dumps(data)) as response:
+    url = f'{self.basisurl}/clip/v2/resource/{path}'
+    with self.sessie.put(url=url, timeout=5, verify=False, data=json.dumps(data)) as response:
+      response.raise_for_status()
       return response.json()
+
+  def stuuractie(self, resourceid: str, actie: LampActie, soort: str = 'light') -> dict:
+    """
+    Sturen van een opdracht naar een lamp of groep lampen in een verzoek
+    Args: resourceid (str): Het ID van de lamp of groep
+          actie (LampActie): De opdracht
+          soort (str): 'light' voor een lamp, 'grouped_light' voor een groep
+    Returns: dict: Het antwoord van de bridge in JSON-formaat
+    """
+    return self.stuurgegevens(f'{soort}/{resourceid}', actie.data)
+
+  def plaatsactie(self, resourceid: str, actie: LampActie, soort: str = 'light') -> Future:
+    """
+    Plaats een opdracht voor een lamp of groep in de wachtrij van de bridge
+    De opdracht wordt op de achtergrond verstuurd, samengevoegd met een nog
+    wachtende opdracht voor dezelfde lamp of groep.
+    Args: resourceid (str): Het ID van de lamp of groep
+          actie (LampActie): De opdracht
+          soort (str): 'light' voor een lamp, 'grouped_light' voor een groep
+    Returns: Future: Klaar wanneer de opdracht verstuurd is
+    """
+    return self.wachtrij.plaats(f'{soort}/{resourceid}', actie.data)
+
+  def volggebeurtenissen(self, leestijd: float = 300) -> Iterator[list]:
+    """
+    Volgen van de eventstream van de hue bridge
+    De bridge stuurt server-sent events waarvan de data een lijst gebeurtenissen is.
+    Args: leestijd (float): Het maximale aantal seconden zonder gegevens van de bridge
+    Returns: Iterator: Per ontvangen event de lijst met gebeurtenissen
+    """
+    url = f'{self.basisurl}/eventstream/clip/v2'
+    with self.sessie.get(url=url, headers={'Accept': 'text/event-stream'},
+                         stream=True, timeout=(5, leestijd), verify=False) as response:
+      response.raise_for_status()
+      regels = []
+      # Per byte lezen zodat een event direct verwerkt wordt en niet wacht op een volle buffer
+      for regel in response.iter_lines(chunk_size=1, decode_unicode=True):
+        if regel.startswith('data:'):
+          regels.append(regel[5:].strip())
+        elif not regel and regels:
+          yield json.loads(''.join(regels))
+          regels = []
+
+  def sluit(self) -> None:
+    """
+    Sluit de open verbindingen met de bridge
+    """
+    self.sessie.close()
@@ -0,0 +1,137 @@
+""" Omrekenen van kleuren tussen sRGB en CIE xy zoals de hue lampen die gebruiken """
+import threading
+from typing import Iterable
+
+from cachetools import cached, LRUCache
+
+Punt = tuple[float, float]
+Gamut = tuple[Punt, Punt, Punt]
+
+# Hoekpunten rood, groen en blauw van de kleurbereiken van de hue lampen
+GAMUTS: dict[str, Gamut] = {'A': ((0.704, 0.296), (0.2151, 0.7106), (0.138, 0.08)),
+                            'B': ((0.675, 0.322), (0.409, 0.518), (0.167, 0.04)),
+                            'C': ((0.6915, 0.3083), (0.17, 0.7), (0.1532, 0.0475))}
+# Het witpunt D65 van sRGB, ook gebruikt voor zwart
+WITPUNT: Punt = (0.3127, 0.329)
+
+
+def _lineair(waarde: float) -> float:
+  """ sRGB-waarde van 0 tot 1 naar lineair licht """
+  if waarde <= 0.04045:
+    return waarde / 12.92
+  return ((waarde + 0.055) / 1.055) ** 2.4
+
+
+def _gamma(waarde: float) -> float:
+  """ Lineair licht van 0 tot 1 naar sRGB-waarde """
+  if waarde <= 0.0031308:
+    return waarde * 12.92
+  return 1.055 * waarde ** (1 / 2.4) - 0.055
+
+
+# Lineair licht van alle 8-bits sRGB-waarden, zodat omrekenen naar xy alleen optellen is
+LINEAIR = tuple(_lineair(waarde / 255) for waarde in range(256))
+
+
+def leesgamut(color: dict) -> Gamut | None:
+  """ Het kleurbereik dat een lamp bij de kleur opgeeft
+  Args: color (dict): Het color-deel van de lamp zoals de bridge dat geeft
+  Returns: Gamut: De hoekpunten rood, groen en blauw, of None als het onbekend is
+  """
+  gamut = color.get('gamut')
+  if gamut:
+    return tuple((gamut[hoek]['x'], gamut[hoek]['y']) for hoek in ('red', 'green', 'blue'))
+  return GAMUTS.get(color.get('gamut_type'))
+
+
+def _kruis(punt: Punt, begin: Punt, eind: Punt) -> float:
+  """ Aan welke kant van de lijn van begin naar eind het punt ligt """
+  return (eind[0] - begin[0]) * (punt[1] - begin[1]) - (eind[1] - begin[1]) * (punt[0] - begin[0])
+
+
+def _dichtstbij(punt: Punt, begin: Punt, eind: Punt) -> Punt:
+  """ Het punt op het lijnstuk van begin naar eind dat het dichtst bij punt ligt """
+  dx, dy = eind[0] - begin[0], eind[1] - begin[1]
+  deel = ((punt[0] - begin[0]) * dx + (punt[1] - begin[1]) * dy) / (dx * dx + dy * dy)
+  deel = min(1.0, max(0.0, deel))
+  return begin[0] + deel * dx, begin[1] + deel * dy
+
+
+def binnengamut(xwaarde: float, ywaarde: float, gamut: Gamut) -> Punt:
+  """ Breng een kleur binnen het kleurbereik van een lamp
+  Args: xwaarde (float): De x-coördinaat van de kleur
+        ywaarde (float): De y-coördinaat van de kleur
+        gamut (Gamut): Het kleurbereik van de lamp
+  Returns: Punt: De kleur zelf, of het dichtstbijzijnde punt op de rand van het kleurbereik
+  """
+  punt = (xwaarde, ywaarde)
+  rood, groen, blauw = gamut
+  kanten = (_kruis(punt, rood, groen), _kruis(punt, groen, blauw), _kruis(punt, blauw, rood))
+  if all(kant >= 0 for kant in kanten) or all(kant <= 0 for kant in kanten):
+    return punt
+  kandidaten = (_dichtstbij(punt, rood, groen),
+                _dichtstbij(punt, groen, blauw),
+                _dichtstbij(punt, blauw, rood))
+  return min(kandidaten, key=lambda k: (k[0] - xwaarde) ** 2 + (k[1] - ywaarde) ** 2)
+
+
+def bepaalxyvanrgb(kleurwaarde: str, gamut: Gamut | None = None) -> tuple[float, float, float]:
+  """ Bepaal de xy waarde vanuit rgb
+  Args: kleurwaarde (str): De kleur in RGB hexadecimaal formaat
+        gamut (Gamut): Het kleurbereik van de lamp, zonder kleurbereik wordt niets aangepast
+  Returns: tuple: x-waarde, y-waarde en brightness als decimale getallen
+  """
+  rood, groen, blauw = (int(kleurwaarde[positie:positie + 2], 16) for positie in (1, 3, 5))
+  brightness = round(max(rood, groen, blauw) / 255 * 100, 2)
+  rood, groen, blauw = LINEAIR[rood], LINEAIR[groen], LINEAIR[blauw]
+  xwaarde = 0.4124 * rood + 0.3576 * groen + 0.1805 * blauw
+  ywaarde = 0.2126 * rood + 0.7152 * groen + 0.0722 * blauw
+  som = xwaarde + ywaarde + 0.0193 * rood + 0.1192 * groen + 0.9505 * blauw
+  punt = (xwaarde / som, ywaarde / som) if som > 0 else WITPUNT
+  if gamut is not None:
+    punt = binnengamut(punt[0], punt[1], gamut)
+  return round(punt[0], 4), round(punt[1], 4), brightness
+
+
+@cached(cache=LRUCache(maxsize=1024), lock=threading.Lock())
+def _hexvanxy(xwaarde: float, ywaarde: float, dimwaarde: float) -> str:
+  """ Omrekenen van afgeronde waarden, bewaard omdat de lampen steeds dezelfde kleur hebben """
+  if ywaarde <= 0:
+    xwaarde, ywaarde = WITPUNT
+  grootx = xwaarde / ywaarde
+  grootz = (1 - xwaarde - ywaarde) / ywaarde
+  lineair = (max(0.0, 3.2406 * grootx - 1.5372 - 0.4986 * grootz),
+             max(0.0, -0.9689 * grootx + 1.8758 + 0.0415 * grootz),
+             max(0.0, 0.0557 * grootx - 0.204 + 1.057 * grootz))
+  grootste = max(lineair)
+  if grootste == 0:
+    return '#000000'
+  # De felste component krijgt de helderheid, zodat de kleur zelf niet verschuift
+  schaal = _lineair(dimwaarde / 100) / grootste
+  rwaarde, gwaarde, bwaarde = (round(_gamma(min(1.0, waarde * schaal)) * 255) for waarde in lineair)
+  return f'#{rwaarde:02x}{gwaarde:02x}{bwaarde:02x}'
+
+
+def bepaalhexrgbvanxy(xwaarde: float, ywaarde: float, dimwaarde: float) -> str:
+  """ Bepaal de rgb waarde vanuit de x/y/dim
+      Kleuren buiten sRGB worden afgekapt op de rand van sRGB
+  Args: xwaarde (float): De x-coördinaat van de kleur
+        ywaarde (float): De y-coördinaat van de kleur
+        dimwaarde (float): De helderheid als percentage
+  Returns: str: De kleur in RGB hexadecimaal formaat
+  """
+  return _hexvanxy(round(xwaarde, 4), round(ywaarde, 4), round(min(100.0, max(0.0, dimwaarde)), 1))
+
+
+def bepaalhexrgbvanxylijst(kleuren: Iterable[tuple[float, float, float]]) -> list[str]:
+  """ Bepaal de rgb waarden van een reeks kleuren in een keer
+  Args: kleuren (Iterable): Per kleur de x-coördinaat, y-coördinaat en helderheid
+  Returns: list: De kleuren in RGB hexadecimaal formaat, in dezelfde volgorde
+  """
+  hexwaarden: dict[tuple[float, float, float], str] = {}
+  lijst = []
+  for kleur in kleuren:
+    if kleur not in hexwaarden:
+      hexwaarden[kleur] = bepaalhexrgbvanxy(*kleur)
+    lijst.append(hexwaarden[kleur])
+  return lijst
@@ -0,0 +1,141 @@
+""" Actuele status van de lampen uit de eventstream van de hue bridge """
+import copy
+import threading
+from typing import Callable
+
+import requests
+import urllib3
+
+from hue import Hue
+
+
+def voegsamen(doel: dict, bron: dict) -> None:
+  """
+    Verwerk een gedeeltelijke resource in een volledige resource
+    Args: doel (dict): De volledige resource, wordt aangepast
+          bron (dict): De gewijzigde velden
+  """
+  for sleutel, waarde in bron.items():
+    if isinstance(waarde, dict) and isinstance(doel.get(sleutel), dict):
+      voegsamen(doel[sleutel], waarde)
+    else:
+      doel[sleutel] = copy.deepcopy(waarde)
+
+
+class LampStatus:
+  """
+    Tabel met de status van alle lampen die een achtergrondthread actueel houdt
+    De thread haalt eenmalig alle lampen op en verwerkt daarna de wijzigingen uit
+    de eventstream van de bridge. Valt de stream weg, dan worden alle lampen
+    elke wachttijd opnieuw opgehaald tot de stream weer verbonden is.
+  """
+
+  def __init__(self, haalbridge: Callable[[], Hue | None],
+               wachttijd: float = 30, leestijd: float = 300):
+    """
+      Maken van de tabel, de thread start met start()
+      Args: haalbridge (Callable): Geeft de bridge of None als die niet is ingesteld
+            wachttijd (float): Seconden tussen pogingen om opnieuw te verbinden
+            leestijd (float): Seconden zonder events waarna opnieuw verbonden wordt
+    """
+    self.haalbridge = haalbridge
+    self.wachttijd = wachttijd
+    self.leestijd = leestijd
+    self._lampen: dict[str, dict] = {}
+    self._actueel = False
+    self._slot = threading.Lock()
+    self._stop = threading.Event()
+
+  def start(self) -> None:
+    """
+      Start de achtergrondthread
+    """
+    self._stop.clear()
+    threading.Thread(target=self._volg, name='lampstatus', daemon=True).start()
+
+  def stop(self) -> None:
+    """
+      Stop de achtergrondthread, een open stream stopt bij het volgende event
+    """
+    self._stop.set()
+    with self._slot:
+      self._actueel = False
+
+  def lampdata(self) -> dict | None:
+    """
+      De status van de lampen zoals de bridge die op 'light' geeft
+      Returns: dict: 'errors' en 'data' met een kopie van de lampen,
+                     of None wanneer de tabel niet actueel is
+    """
+    with self._slot:
+      if not self._actueel:
+        return None
+      return {'errors': [], 'data': copy.deepcopy(list(self._lampen.values()))}
+
+  def ververs(self, bridge: Hue) -> None:
+    """
+      Haal alle lampen opnieuw op van de bridge
+      Args: bridge (Hue): De bridge
+    """
+    lampdata = bridge.haalgegevens('light')
+    if lampdata.get('errors'):
+      raise ValueError(f'Ophalen van de lampen mislukt: {lampdata.get("errors")}')
+    with self._slot:
+      self._lampen = {lamp.get('id'): lamp for lamp in lampdata.get('data', [])}
+      self._actueel = True
+
+  def verwerk(self, gebeurtenissen: list) -> None:
+    """
+      Verwerk gebeurtenissen uit de eventstream
+      Args: gebeurtenissen (list): De gebeurtenissen met hun soort en gewijzigde resources
+    """
+    with self._slot:
+      for gebeurtenis in gebeurtenissen:
+        soort = gebeurtenis.get('type')
+        for resource in gebeurtenis.get('data', []):
+          if resource.get('type') != 'light':
+            continue
+          lampid = resource.get('id')
+          if soort == 'add':
+            self._lampen[lampid] = copy.deepcopy(resource)
+          elif soort == 'delete':
+            self._lampen.pop(lampid, None)
+          elif soort == 'update' and lampid in self._lampen:
+            voegsamen(self._lampen[lampid], resource)
+
+  def _volg(self) -> None:
+    """
+      Haal de lampen op en volg de eventstream tot de thread gestopt wordt
+    """
+    while not self._stop.is_set():
+      bridge = self.haalbridge()
+      if bridge is not None and self._verbind(bridge):
+        continue
+      self._stop.wait(self.wachttijd)
+
+  def _verbind(self, bridge: Hue) -> bool:
+    """
+      Haal alle lampen op en verwerk de eventstream tot die wegvalt
+      Args: bridge (Hue): De bridge
+      Returns: bool: True als direct opnieuw verbonden kan worden
+    """
+    try:
+      self.ververs(bridge)
+    except (requests.RequestException, ValueError) as e:
+      print(f'Ophalen van de lampen mislukt: {e}')
+      with self._slot:
+        self._actueel = False
+      return False
+    try:
+      for gebeurtenissen in bridge.volggebeurtenissen(self.leestijd):
+        if self._stop.is_set():
+          return False
+        self.verwerk(gebeurtenissen)
+    except requests.ConnectionError as e:
+      # Een verlopen leestijd betekent alleen dat het stil was op de stream
+      if e.args and isinstance(e.args[0], urllib3.exceptions.ReadTimeoutError):
+        return True
+      print(f'Eventstream van de bridge onderbroken: {e}')
+    except (requests.RequestException, ValueError) as e:
+      print(f'Eventstream van de bridge onderbroken: {e}')
+    return False
@@ -0,0 +1,376 @@
+""" Opslag van gegevens in een bestand of database """
+import errno
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import uuid
+from abc import ABC, abstractmethod
+from typing import Any, ContextManager, Hashable
+
+from pysondb import db
+
+VERWIJDERD = object()
+
+
+def vervangbestand(bestand: str, inhoud: bytes) -> None:
+  """
+    Vervang de inhoud van een bestand via een tijdelijk bestand in dezelfde map
+    Args: bestand (str): Het te vervangen bestand
+          inhoud (bytes): De nieuwe inhoud
+  """
+  doelmap = os.path.dirname(os.path.abspath(bestand))
+  handle, tijdelijk = tempfile.mkstemp(prefix=f'.{os.path.basename(bestand)}.',
+                                       suffix='.tmp',
+                                       dir=doelmap)
+  try:
+    with os.fdopen(handle, 'wb') as nieuw:
+      nieuw.write(inhoud)
+      nieuw.flush()
+      os.fsync(nieuw.fileno())
+    if os.path.exists(bestand):
+      shutil.copymode(bestand, tijdelijk)
+    try:
+      os.replace(tijdelijk, bestand)
+    except OSError as e:
+      # Een los als volume gekoppeld bestand kan niet vervangen worden, kopieer dan de inhoud
+      if e.errno not in (errno.EBUSY, errno.EXDEV):
+        raise
+      shutil.copyfile(tijdelijk, bestand)
+  finally:
+    if os.path.exists(tijdelijk):
+      os.unlink(tijdelijk)
+
+
+class Opslag(ABC):
+  """
+    Basis voor de opslag achter Gegevens
+    Een opslag levert alle gegevens in een keer en bewaart wijzigingen,
+    Gegevens houdt de gegevens in het geheugen bij.
+  """
+
+  @abstractmethod
+  def versie(self) -> Hashable | None:
+    """
+      Bepaal een kenmerk dat verandert wanneer de opslag buiten dit object wordt gewijzigd
+      Returns: Het kenmerk of None als de opslag (nog) niet bestaat
+    """
+
+  @abstractmethod
+  def laad(self) -> dict[str, Any]:
+    """
+      Lees alle gegevens uit de opslag
+      Returns: dict met per sleutel de waarde
+    """
+
+  @abstractmethod
+  def bewaar(self, gegevens: dict[str, Any], wijzigingen: dict[str, Any]) -> None:
+    """
+      Bewaar de gegevens in de opslag
+      Args: gegevens (dict): Alle gegevens na de wijzigingen
+            wijzigingen (dict): Per gewijzigde sleutel de nieuwe waarde of VERWIJDERD
+    """
+
+  @abstractmethod
+  def slot(self) -> ContextManager:
+    """
+      Slot om wijzigingen na elkaar uit te voeren
+      Returns: Het slot als context manager
+    """
+
+
+class JsonOpslag(Opslag):
+  """
+    Opslag in een json-bestand van pysondb
+    Elke wijziging herschrijft het bestand eenmalig via een tijdelijk bestand.
+  """
+
+  def __init__(self, bestand: str):
+    """
+    Maken of openen van een bestand
+      Args: bestand(str): naam van het bestand
+    """
+    self.bestand = bestand
+    self.gegevens = db.getDb(bestand)
+    self._ids: dict[str, int] = {}
+
+  def versie(self) -> tuple[int, int] | None:
+    """
+      Bepaal de wijzigingstijd en grootte van het bestand
+      Returns: tuple met mtime en grootte of None als het bestand niet bestaat
+    """
+    try:
+      status = os.stat(self.bestand)
+    except FileNotFoundError:
+      return None
+    return status.st_mtime_ns, status.st_size
+
+  def laad(self) -> dict[str, Any]:
+    """
+      Lees alle gegevens uit het bestand
+      Returns: dict met per sleutel de waarde
+    """
+    gegevens: dict[str, Any] = {}
+    ids: dict[str, int] = {}
+    dubbel = set()
+    if os.path.exists(self.bestand):
+      for rij in self.gegevens.getAll():
+        sleutel = rij.get('env')
+        if sleutel in gegevens:
+          dubbel.add(sleutel)
+        gegevens[sleutel] = rij.get('value')
+        ids[sleutel] = rij.get('id')
+    # Net als voorheen levert een sleutel die meerdere keren voorkomt geen waarde op
+    for sleutel in dubbel:
+      gegevens[sleutel] = None
+    self._ids = ids
+    return gegevens
+
+  def bewaar(self, gegevens: dict[str, Any], wijzigingen: dict[str, Any]) -> None:
+    """
+      Schrijf alle gegevens in een tijdelijk bestand en vervang daarmee het bestand
+      Args: gegevens (dict): Alle gegevens na de wijzigingen
+            wijzigingen (dict): Per gewijzigde sleutel de nieuwe waarde of VERWIJDERD
+    """
+    ids = {sleutel: self._ids.get(sleutel) or int(str(uuid.uuid4().int)[:18])
+           for sleutel in gegevens}
+    rijen = [{'env': sleutel, 'value': waarde, 'id': ids[sleutel]}
+             for sleutel, waarde in gegevens.items()]
+    inhoud = json.dumps({'data': rijen}, indent=3, ensure_ascii=False)
+    vervangbestand(self.bestand, inhoud.encode('utf-8'))
+    self._ids = ids
+
+  def slot(self) -> ContextManager:
+    """
+      Het bestandsslot van pysondb
+      Returns: Het slot als context manager
+    """
+    return self.gegevens.lock
+
+
+class SqliteOpslag(Opslag):
+  """
+    Opslag in een sqlite-database met een tabel van sleutels en waarden
+    Wijzigingen worden per sleutel geschreven, de database staat in WAL-modus
+    zodat lezers in andere processen niet op schrijvers wachten.
+  """
+
+  def __init__(self, bestand: str, migreer: str | None = None):
+    """
+    Maken of openen van een database
+      Args: bestand (str): naam van de database
+            migreer (str): json-bestand van pysondb waarvan de gegevens bij het
+                           aanmaken van de database eenmalig worden overgenomen
+    """
+    self.bestand = bestand
+    self._slot = threading.RLock()
+    self._verbinding = sqlite3.connect(bestand,
+                                       timeout=5,
+                                       isolation_level=None,
+                                       check_same_thread=False)
+    self._verbinding.execute('PRAGMA journal_mode=WAL')
+    self._verbinding.execute('PRAGMA synchronous=NORMAL')
+    with self._slot:
+      self._verbinding.execute('BEGIN IMMEDIATE')
+      try:
+        if self._verbinding.execute('PRAGMA user_version').fetchone()[0] == 0:
+          self._maaktabel(migreer)
+        self._verbinding.execute('COMMIT')
+      except BaseException:
+        self._verbinding.execute('ROLLBACK')
+        raise
+
+  def _maaktabel(self, migreer: str | None) -> None:
+    """
+      Maak de tabel aan en neem de gegevens van het json-bestand over
+      Args: migreer (str): json-bestand van pysondb of None
+    """
+    self._verbinding.execute('CREATE TABLE IF NOT EXISTS gegevens ('
+                             'sleutel TEXT PRIMARY KEY, '
+                             'waarde TEXT NOT NULL'
+                             ') WITHOUT ROWID')
+    if migreer and os.path.exists(migreer):
+      gegevens = JsonOpslag(migreer).laad()
+      self._verbinding.executemany('INSERT OR REPLACE INTO gegevens (sleutel, waarde) '
+                                   'VALUES (?, ?)',
+                                   [(sleutel, json.dumps(waarde))
+                                    for sleutel, waarde in gegevens.items()])
+    self._verbinding.execute('PRAGMA user_version = 1')
+
+  def versie(self) -> int:
+    """
+      Het versienummer van sqlite dat verandert na een wijziging door een andere verbinding
+      Returns: int: De data_version van de database
+    """
+    with self._slot:
+      return self._verbinding.execute('PRAGMA data_version').fetchone()[0]
+
+  def laad(self) -> dict[str, Any]:
+    """
+      Lees alle gegevens uit de database
+      Returns: dict met per sleutel de waarde
+    """
+    with self._slot:
+      rijen = self._verbinding.execute('SELECT sleutel, waarde FROM gegevens').fetchall()
+    return {sleutel: json.loads(waarde) for sleutel, waarde in rijen}
+
+  def bewaar(self, gegevens: dict[str, Any], wijzigingen: dict[str, Any]) -> None:
+    """
+      Schrijf alleen de gewijzigde sleutels in een enkele transactie
+      Args: gegevens (dict): Alle gegevens na de wijzigingen
+            wijzigingen (dict): Per gewijzigde sleutel de nieuwe waarde of VERWIJDERD
+    """
+    verwijderd = [(sleutel,) for sleutel, waarde in wijzigingen.items() if waarde is VERWIJDERD]
+    gewijzigd = [(sleutel, json.dumps(waarde)) for sleutel, waarde in wijzigingen.items()
+                 if waarde is not VERWIJDERD]
+    with self._slot:
+      self._verbinding.execute('BEGIN IMMEDIATE')
+      try:
+        self._verbinding.executemany('DELETE FROM gegevens WHERE sleutel = ?', verwijderd)
+        self._verbinding.executemany('INSERT INTO gegevens (sleutel, waarde) VALUES (?, ?) '
+                                     'ON CONFLICT (sleutel) DO UPDATE SET waarde = excluded.waarde',
+                                     gewijzigd)
+        self._verbinding.execute('COMMIT')
+      except BaseException:
+        self._verbinding.execute('ROLLBACK')
+        raise
+
+  def slot(self) -> ContextManager:
+    """
+      Het slot op de verbinding met de database
+      Returns: Het slot als context manager
+    """
+    return self._slot
+
+
+class LogOpslag(Opslag):
+  """
+    Opslag als logboek waarin elke wijziging als een regel wordt toegevoegd
+    Bij het openen wordt het logboek opnieuw afgespeeld. Wanneer het logboek
+    te veel regels krijgt herschrijft bewaar het tot een regel met alle gegevens.
+    Dat gebeurt onder het slot van Gegevens, na het opnieuw inlezen, zodat ook
+    met een ProcesSlot geen regel van een ander proces verloren gaat.
+  """
+
+  def __init__(self, bestand: str, migreer: str | None = None, drempel: int = 1000):
+    """
+    Maken of openen van een logboek
+      Args: bestand (str): naam van het logboek
+            migreer (str): json-bestand van pysondb waarvan de gegevens bij het
+                           aanmaken van het logboek eenmalig worden overgenomen
+            drempel (int): aantal regels waarboven het logboek wordt herschreven
+    """
+    self.bestand = bestand
+    self.drempel = drempel
+    self._slot = threading.RLock()
+    self._gegevens: dict[str, Any] = {}
+    self._regels = 0
+    if not os.path.exists(bestand):
+      if migreer and os.path.exists(migreer):
+        self._gegevens = JsonOpslag(migreer).laad()
+      self.comprimeer()
+
+  @staticmethod
+  def _regel(wijzigingen: dict[str, Any]) -> bytes:
+    """
+      Maak een regel voor het logboek
+      Args: wijzigingen (dict): Per sleutel de nieuwe waarde of VERWIJDERD
+      Returns: bytes: De regel in json-formaat inclusief regeleinde
+    """
+    record = {'w': {sleutel: waarde for sleutel, waarde in wijzigingen.items()
+                    if waarde is not VERWIJDERD},
+              'd': [sleutel for sleutel, waarde in wijzigingen.items() if waarde is VERWIJDERD]}
+    return (json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8')
+
+  def versie(self) -> tuple[int, int, int] | None:
+    """
+      Bepaal het inode-nummer, de grootte en de wijzigingstijd van het logboek
+      Returns: tuple met de kenmerken of None als het logboek niet bestaat
+    """
+    try:
+      status = os.stat(self.bestand)
+    except FileNotFoundError:
+      return None
+    return status.st_ino, status.st_size, status.st_mtime_ns
+
+  def laad(self) -> dict[str, Any]:
+    """
+      Speel het logboek af
+      Een onvolledige laatste regel van een onderbroken schrijfactie wordt verwijderd.
+      Returns: dict met per sleutel de waarde
+    """
+    gegevens: dict[str, Any] = {}
+    regels = 0
+    with self._slot:
+      with open(self.bestand, 'rb') as logboek:
+        inhoud = logboek.read()
+      einde = inhoud.rfind(b'\n') + 1
+      for regel in inhoud[:einde].splitlines():
+        record = json.loads(regel)
+        gegevens.update(record.get('w', {}))
+        for sleutel in record.get('d', []):
+          gegevens.pop(sleutel, None)
+        regels += 1
+      if einde < len(inhoud):
+        os.truncate(self.bestand, einde)
+      self._gegevens = gegevens
+      self._regels = regels
+    return dict(gegevens)
+
+  def bewaar(self, gegevens: dict[str, Any], wijzigingen: dict[str, Any]) -> None:
+    """
+      Voeg de wijzigingen als een regel toe aan het logboek
+      Gegevens moet het logboek net ingelezen hebben, anders gaan bij het
+      herschrijven de regels van andere processen verloren.
+      Args: gegevens (dict): Alle gegevens na de wijzigingen
+            wijzigingen (dict): Per gewijzigde sleutel de nieuwe waarde of VERWIJDERD
+    """
+    regel = self._regel(wijzigingen)
+    with self._slot:
+      handle = os.open(self.bestand, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+      try:
+        os.write(handle, regel)
+        os.fsync(handle)
+      finally:
+        os.close(handle)
+      self._gegevens = dict(gegevens)
+      self._regels += 1
+      if self._regels > max(self.drempel, 2 * len(gegevens)):
+        self.comprimeer()
+
+  def comprimeer(self) -> None:
+    """
+      Herschrijf het logboek tot een enkele regel met alle gegevens
+      Alleen aan te roepen met de laatst ingelezen of bewaarde gegevens.
+    """
+    with self._slot:
+      vervangbestand(self.bestand, self._regel(self._gegevens))
+      self._regels = 1
+
+  def slot(self) -> ContextManager:
+    """
+      Het slot op het logboek
+      Returns: Het slot als context manager
+    """
+    return self._slot
+
+
+def maakopslag(bestand: str, soort: str = 'json') -> Opslag:
+  """
+    Maak de opslag voor een bestand
+    Args: bestand (str): Het json-bestand van de gegevens
+          soort (str): 'json', 'sqlite' of 'log', bij sqlite en log wordt een
+                       bestand naast het json-bestand gebruikt waarin dit eenmalig
+                       wordt overgenomen
+    Returns: Opslag: De opslag
+  """
+  basis = os.path.splitext(bestand)[0]
+  if soort == 'json':
+    return JsonOpslag(bestand)
+  if soort == 'sqlite':
+    return SqliteOpslag(f'{basis}.sqlite', migreer=bestand)
+  if soort == 'log':
+    return LogOpslag(f'{basis}.log', migreer=bestand)
+  raise ValueError(f'Onbekende opslag: {soort}')
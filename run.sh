@@ -5,8 +5,8 @@ docker run \
         --add-host 0828-4808-8456.local:192.168.1.14 \
         --restart unless-stopped \
         --publish 8088:8088 \
-        --volume /opt/thuis/envdb.json:/usr/src/app/envdb.json \
-        --volume /opt/thuis/zonnesterkte.json:/usr/src/app/zonnesterkte.json \
+        --volume /opt/thuis:/usr/src/app/data \
+        --env THUIS_DATA=/usr/src/app/data \
         --name thuis \
         --env-file env.list \
         thuis
@@ -0,0 +1,134 @@
+""" Sloten voor gelijktijdig gebruik van gegevens door threads en processen """
+import os
+import threading
+from contextlib import contextmanager, nullcontext
+from typing import ContextManager, Iterator
+
+try:
+  import fcntl
+except ImportError:  # pragma: no cover
+  fcntl = None
+
+
+class LeesSchrijfSlot:  # pylint: disable=too-many-instance-attributes
+  """
+    Slot waarmee meerdere lezers tegelijk toegang hebben en een schrijver alleen
+    Wachtende schrijvers gaan voor nieuwe lezers zodat een schrijver niet blijft wachten.
+    Lezers die op een schrijver wachten zijn daarna eerst aan de beurt, zodat
+    een schrijver die steeds opnieuw schrijft de lezers niet blijft tegenhouden.
+    Een thread die al leest of schrijft mag opnieuw lezen, een schrijver mag opnieuw schrijven.
+  """
+
+  def __init__(self, processlot: ContextManager | None = None):
+    """
+      Maken van het slot
+      Args: processlot (ContextManager): slot dat een schrijver daarnaast gebruikt,
+                                         zoals een ProcesSlot
+    """
+    self.processlot = processlot or nullcontext()
+    self._conditie = threading.Condition(threading.Lock())
+    self._lezers = 0
+    self._wachtend = 0
+    self._wachtendelezers = 0
+    self._lezersbeurt = 0
+    self._schrijver: int | None = None
+    self._diepte = 0
+    self._lokaal = threading.local()
+
+  @contextmanager
+  def lezen(self) -> Iterator[None]:
+    """
+      Gedeelde toegang voor het lezen
+      Returns: Iterator zonder waarde
+    """
+    if self._schrijver == threading.get_ident() or getattr(self._lokaal, 'lezen', 0):
+      self._lokaal.lezen = getattr(self._lokaal, 'lezen', 0) + 1
+      try:
+        yield
+      finally:
+        self._lokaal.lezen -= 1
+      return
+    with self._conditie:
+      if self._schrijver is not None or self._wachtend:
+        self._wachtendelezers += 1
+        try:
+          while self._schrijver is not None or (self._wachtend and not self._lezersbeurt):
+            self._conditie.wait()
+        finally:
+          self._wachtendelezers -= 1
+          self._lezersbeurt = max(0, min(self._lezersbeurt - 1, self._wachtendelezers))
+          if not self._lezersbeurt:
+            self._conditie.notify_all()
+      self._lezers += 1
+    self._lokaal.lezen = 1
+    try:
+      yield
+    finally:
+      self._lokaal.lezen = 0
+      with self._conditie:
+        self._lezers -= 1
+        if not self._lezers:
+          self._conditie.notify_all()
+
+  @contextmanager
+  def schrijven(self) -> Iterator[None]:
+    """
+      Alleenrecht voor het schrijven
+      Een thread die leest kan niet overstappen naar schrijven.
+      Returns: Iterator zonder waarde
+    """
+    ident = threading.get_ident()
+    with self._conditie:
+      if self._schrijver == ident:
+        self._diepte += 1
+      else:
+        if getattr(self._lokaal, 'lezen', 0):
+          raise RuntimeError('schrijven is niet mogelijk tijdens het lezen')
+        self._wachtend += 1
+        try:
+          while self._schrijver is not None or self._lezers or self._lezersbeurt:
+            self._conditie.wait()
+        finally:
+          self._wachtend -= 1
+        self._schrijver = ident
+        self._diepte = 1
+    try:
+      if self._diepte == 1:
+        with self.processlot:
+          yield
+      else:
+        yield
+    finally:
+      with self._conditie:
+        self._diepte -= 1
+        if not self._diepte:
+          self._schrijver = None
+          self._lezersbeurt = self._wachtendelezers
+          self._conditie.notify_all()
+
+
+class ProcesSlot:
+  """
+    Slot met fcntl.flock op een bestand
+    Hiermee worden wijzigingen van meerdere processen na elkaar uitgevoerd.
+    Het slot beschermt niet tegen threads in hetzelfde proces, gebruik daarvoor LeesSchrijfSlot.
+  """
+
+  def __init__(self, bestand: str):
+    """
+      Maken van het slot
+      Args: bestand (str): naam van het slotbestand
+    """
+    if fcntl is None:
+      raise ValueError('fcntl is niet beschikbaar op dit platform')
+    self.bestand = bestand
+    self._handle: int | None = None
+
+  def __enter__(self) -> 'ProcesSlot':
+    if self._handle is None:
+      self._handle = os.open(self.bestand, os.O_RDWR | os.O_CREAT, 0o644)
+    fcntl.flock(self._handle, fcntl.LOCK_EX)
+    return self
+
+  def __exit__(self, *args) -> None:
+    fcntl.flock(self._handle, fcntl.LOCK_UN)
@@ -1,13 +1,99 @@
 """ Aansturing van somfy """
+import json
+import ssl
+import threading
 from urllib.parse import quote_plus
 
 import requests
+from cachetools import cached
+from requests.adapters import HTTPAdapter
 
 BASEURL = 'ha101-1.overkiz.com'
+CERTIFICAAT = './cert/overkiz-root-ca-2048.crt'
+# Aantal open verbindingen per kastje, genoeg voor alle schermen van een pagina
+POOLGROOTTE = 4
+# De standen met de hoogte van een scherm en de lichtsterkte van een zonnesensor
+SCHERMSTAND = 'core:DeploymentState'
+LICHTSTERKTE = 'core:LuminanceState'
+# De soorten apparaten van de schermen en de zonnesensors
+SCHERM = 'io:VerticalExteriorAwningIOComponent'
+ZONNESENSOR = 'io:LightIOSystemSensor'
+
+
+@cached(cache={}, lock=threading.Lock())
+def overkizcontext() -> ssl.SSLContext:
+  """ De SSL context die alleen de Overkiz root CA vertrouwt, eenmalig van schijf geladen
+  Returns: SSLContext: De gedeelde context
+  """
+  return ssl.create_default_context(cafile=CERTIFICAAT)
+
+
+class OverkizAdapter(HTTPAdapter):
+  """ HTTPAdapter die verbindingen opzet met de Overkiz SSL context
+  requests laadt anders bij elke nieuwe verbinding een CA-bestand in de context:
+  dat van verify, REQUESTS_CA_BUNDLE of certifi.
+  """
+
+  def __init__(self, context: ssl.SSLContext, **kwargs):
+    """ Maken van de adapter
+    Args: context (SSLContext): De context voor alle verbindingen
+    """
+    self.context = context
+    super().__init__(**kwargs)
+
+  def init_poolmanager(self, *args, **kwargs):
+    kwargs['ssl_context'] = self.context
+    super().init_poolmanager(*args, **kwargs)
+
+  def build_connection_pool_key_attributes(self, request, verify, cert=None):
+    hostparameters, _ = super().build_connection_pool_key_attributes(request, True, cert)
+    return hostparameters, {'cert_reqs': 'CERT_REQUIRED'}
+
+  def cert_verify(self, conn, url, verify, cert):
+    conn.cert_reqs = 'CERT_REQUIRED'
+
+
+@cached(cache={}, lock=threading.Lock())
+def podsessie(pod: str) -> requests.Session:
+  """ De sessie met open verbindingen naar een kastje
+  Args: pod (str): De pod-identificatie
+  Returns: Session: Dezelfde sessie voor elke aanroep met deze pod
+  """
+  sessie = requests.Session()
+  sessie.headers.update({'Content-type': 'application/json'})
+  sessie.mount(f'https://{pod}.local:8443/',
+               OverkizAdapter(overkizcontext(), pool_connections=1, pool_maxsize=POOLGROOTTE))
+  return sessie
+
+
+def leesstand(setup: dict, device: str, naam: str) -> dict | None:
+  """ Een stand van een apparaat uit de setup van SomfyPod.haalsetup
+  Args: setup (dict): Per deviceURL het apparaat, of de fout van het kastje
+        device (str): Identificatie van het apparaat
+        naam (str): De naam van de stand, bijvoorbeeld SCHERMSTAND
+  Returns: dict: De stand zoals het kastje die per stand geeft, de fout van het kastje
+                 of None als het apparaat of de stand ontbreekt
+  """
+  if not setup.get('error', None) is None:
+    return setup
+  for stand in setup.get(device, {}).get('states', []):
+    if stand.get('name') == naam:
+      return stand
+  return None
+
+
+def bepaalsetupversie(setup: dict) -> tuple:
+  """ De versie van de setup, die alleen verandert als apparaten bijkomen, verdwijnen of een
+      ander label krijgen. Het kastje geeft zelf geen versie, de standen tellen niet mee.
+  Args: setup (dict): Per deviceURL het apparaat
+  Returns: tuple: De gesorteerde (deviceURL, controllableName, label) van alle apparaten
+  """
+  return tuple(sorted((url, device.get('controllableName', ''), device.get('label', ''))
+                      for url, device in setup.items()))
 
 
 class Somfy:
-  """ Aansturing van somfy """
+  """ Inloggen en beheer van tokens bij de somfy cloud """
 
   @staticmethod
   def login(userid: str, password: str) -> str:
@@ -94,109 +180,118 @@ class Somfy:
     with requests.delete(url=url, headers=headers, timeout=10) as response:
       return response.status_code
 
-  @staticmethod
-  def haalgegevens(token: str, pod: str, path: str) -> dict:
+
+class SomfyPod:
+  """ Aansturing van een somfy kastje via de lokale API
+  Houdt de pod, het token, de sessie en de gevonden apparaten vast. Maak een
+  nieuwe SomfyPod wanneer de pod of het token in de instellingen verandert.
+  """
+
+  def __init__(self, pod: str, token: str):
+    """ Verbinding met het kastje
+    Args: pod (str): De pod-identificatie
+          token (str): Een geldig token
+    """
+    self.pod = pod
+    self.token = token
+    self.sessie = podsessie(pod)
+    self.basisurl = f'https://{pod}.local:8443/enduser-mobile-web/1/enduserAPI'
+    self._devices: dict[str, list] = {}
+    self.setupversie: tuple | None = None
+
+  def haalgegevens(self, path: str) -> dict:
     """ Ophalen van gegevens van het somfy kastje
-    Args: token (str): De geldige token
-          pod (str): De pod-identificatie
-          path (str): Het pad naar de op te vragen gegevens
+    Args: path (str): Het pad naar de op te vragen gegevens
     Returns: De opgehaalde gegevens in JSON-formaat
     :rtype: dict
     """
-    url = f'https://{pod}.local:8443/enduser-mobile-web/1/enduserAPI/{path}'
-    headers = {'Content-type': 'application/json', 'Authorization': f'Bearer {token}'}
-    with requests.get(url=url,
-                      headers=headers,
-                      timeout=5,
-                      verify='./cert/overkiz-root-ca-2048.crt') as response:
+    with self.sessie.get(url=f'{self.basisurl}/{path}',
+                         headers={'Authorization': f'Bearer {self.token}'},
+                         timeout=5) as response:
       return response.json()
 
-  @staticmethod
-  def stuurgegevens(token: str, pod: str, path: str, data: str) -> dict:
+  def stuurgegevens(self, path: str, data: str) -> dict:
     """ Sturen van gegevens naar het somfy kastje
-    Args: token (str): De geldige token
-          pod (str): De pod-identificatie
-          path (str): Het pad voor de te versturen gegevens
+    Args: path (str): Het pad voor de te versturen gegevens
           data (str): De te versturen gegevens
     Returns: dict: Het antwoord van de server in JSON-formaat
     """
-    url = f'https://{pod}.local:8443/enduser-mobile-web/1/enduserAPI/{path}'
-    headers = {'Content-type': 'application/json', 'Authorization': f'Bearer {token}'}
-    with requests.post(url=url,
-                       headers=headers,
-                       timeout=5,
-                       verify='./cert/overkiz-root-ca-2048.crt',
-                       data=data) as response:
+    with self.sessie.post(url=f'{self.basisurl}/{path}',
+                          headers={'Authorization': f'Bearer {self.token}'},
+                          timeout=5,
+                          data=data) as response:
       return response.json()
 
-  @staticmethod
-  def haaldevices(pod: str, token: str, path: str) -> list:
+  def haalsetup(self) -> dict:
     """
-    Ophalen van devices
-    Args: pod (str): De pod-identificatie
-          token (str): De geldige token
-          path(str): Het pad van de devices
+    Ophalen van alle apparaten met al hun standen in een verzoek
+    Lees de standen met leesstand, in plaats van een verzoek per apparaat. Is de
+    setupversie veranderd, dan worden de gevonden devices uit deze setup bijgewerkt.
+    Returns: dict: Per deviceURL het apparaat, of de fout van het kastje
+    """
+    devices = self.haalgegevens('setup/devices')
+    if isinstance(devices, dict):
+      return devices
+    setup = {device['deviceURL']: device for device in devices}
+    versie = bepaalsetupversie(setup)
+    if versie != self.setupversie:
+      gevonden: dict[str, list] = {}
+      for url, device in setup.items():
+        gevonden.setdefault(device.get('controllableName'), []).append(
+          {'label': device.get('label'), 'device': url})
+      self._devices = gevonden
+      self.setupversie = versie
+    return setup
+
+  def haaldevices(self, soort: str) -> list:
+    """
+    Ophalen van devices van een soort uit de laatste setup
+    Alleen zonder bekende setupversie, zoals na vergeet(), wordt de setup opgehaald.
+    Args: soort(str): De controllableName van de devices
     Returns: list: Lijst met gevonden devices
     """
-    devicelijst = []
-    deviceurls = Somfy.haalgegevens(token, pod, path)
-    if not (isinstance(deviceurls, dict) and not deviceurls.get('error', None) is None):
-      for schermurl in deviceurls:
-        scherurlencoded = quote_plus(schermurl)
-        device = Somfy.haalgegevens(token, pod, f'setup/devices/{scherurlencoded}')
-        devicelijst.append({'label': device['label'], 'device': schermurl})
-    return devicelijst
+    if self.setupversie is None:
+      setup = self.haalsetup()
+      if not setup.get('error', None) is None:
+        return []
+    return self._devices.get(soort, [])
 
-  @staticmethod
-  def haalschermen(pod: str, token: str) -> list:
+  def vergeet(self) -> None:
+    """
+    Vergeet de setupversie, zodat de devices opnieuw worden opgehaald
+    """
+    self.setupversie = None
+
+  def haalschermen(self) -> list:
     """
     Ophalen van de schermen
-    Args: pod (str): De pod-identificatie
-          token (str): Een geldig token
     Returns: list: Lijst met gevonden schermen
     """
-    path = f'setup/devices/controllables/{quote_plus("io:VerticalExteriorAwningIOComponent")}'
-    return Somfy.haaldevices(pod, token, path)
+    return self.haaldevices(SCHERM)
 
-  @staticmethod
-  def haalzonnesensors(pod: str, token: str) -> list:
+  def haalzonnesensors(self) -> list:
     """
     Ophalen van de zonnesensors
-    Args: pod (str): De pod-identificatie
-          token (str): Een geldig token
     Returns: list: Lijst met gevonden zonnesensors
     """
-    path = f'setup/devices/controllables/{quote_plus("io:LightIOSystemSensor")}'
-    return Somfy.haaldevices(pod, token, path)
+    return self.haaldevices(ZONNESENSOR)
 
-  @staticmethod
-  def haalschermstatus(pod: str, token: str, device: str) -> dict:
+  def verplaats(self, device: str, percentage: int) -> dict:
     """
-    Ophalen van de hoogte van een scherm
-    Args: pod (str): De pod-identificatie
-          token (str): Een geldig token
-          device (str): Identificatie van het scherm
-    Returns: dict: Gegevens van het scherm
+    Verplaats een scherm
+    Args: device (str): Identificatie van het scherm
+          percentage (int): Het gewenste sluitingspercentage
+    Returns: dict: Het antwoord van het kastje
     """
-    percopenstate = quote_plus("core:DeploymentState")
-    schermurlencoded = quote_plus(device)
-    schermstate = Somfy.haalgegevens(token,
-                                     pod,
-                                     f'setup/devices/{schermurlencoded}/states/{percopenstate}')
-    return schermstate
-
-  @staticmethod
-  def haalsensorstatus(pod: str, token: str, device: str) -> dict:
-    """
-    Ophalen van de hoogte van een scherm
-    Args: pod (str): De pod-identificatie
-          token (str): Een geldig token
-          device (str): Identificatie van de sensor
-    Returns: dict: Gegevens van de sensor
-    """
-    lichtsterkte = quote_plus('core:LuminanceState')
-    sensorurlencoded = quote_plus(device)
-    sensorwaarde = Somfy.haalgegevens(token,
-                                      pod,
-                                      f'setup/devices/{sensorurlencoded}/states/{lichtsterkte}')
-    return sensorwaarde
+    data = json.dumps({
+      "label": "verplaats scherm",
+      "actions": [
+        {"commands": [
+          {"name": "setClosure",
+           "parameters": [percentage]
+           }],
+          "deviceURL": device
+        }
+      ]
+    })
+    return self.stuurgegevens('exec/apply', data)
@@ -0,0 +1,52 @@
+import importlib.util
+import json
+import os
+import sys
+
+import pytest
+
+spec = importlib.util.spec_from_file_location(
+  'bench_gegevens', os.path.join(os.path.dirname(__file__), '..', 'benchmarks', 'bench_gegevens.py'))
+bench_gegevens = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(bench_gegevens)
+meting = sys.modules['meting']
+
+
+def test_benchmark(tmp_path):
+  uitvoer = tmp_path / 'resultaten.json'
+  bench_gegevens.main(['--opslag', 'json', 'sqlite', '--sleutels', '10',
+                       '--herhalingen', '5', '--duur', '0.05', '--uitvoer', str(uitvoer)])
+
+  uitkomst = json.loads(uitvoer.read_text(encoding='utf-8'))
+  resultaten = uitkomst['resultaten']
+  assert [(resultaat['opslag'], resultaat['scenario'], resultaat['bewerking']) for resultaat in resultaten] == \
+         [(opslag, scenario, bewerking)
+          for opslag in ['json', 'sqlite']
+          for scenario, bewerking in [('enkel', 'lees'), ('enkel', 'leesint'), ('enkel', 'wijzig'),
+                                      ('enkel', 'verwijder'), ('gelijktijdig', 'lees'),
+                                      ('gelijktijdig', 'wijzig')]]
+  assert all(resultaat['sleutels'] == 10 for resultaat in resultaten)
+  assert resultaten[0]['aantal'] == 5
+  assert resultaten[0]['p50_us'] <= resultaten[0]['p99_us']
+
+
+def test_percentiel():
+  duren = [1000 * nummer for nummer in range(1, 101)]
+  assert meting.percentiel(duren, 0.50) == 51.0
+  assert meting.percentiel(duren, 0.99) == 100.0
+  assert meting.percentiel([], 0.99) == 0.0
+
+
+@pytest.mark.filterwarnings('ignore::urllib3.exceptions.InsecureRequestWarning')
+def test_benchmark_hue(tmp_path):
+  spec_hue = importlib.util.spec_from_file_location(
+    'bench_hue', os.path.join(os.path.dirname(__file__), '..', 'benchmarks', 'bench_hue.py'))
+  bench_hue = importlib.util.module_from_spec(spec_hue)
+  spec_hue.loader.exec_module(bench_hue)
+  uitvoer = tmp_path / 'resultaten.json'
+  bench_hue.main(['--lampen', '5', '--herhalingen', '3', '--uitvoer', str(uitvoer)])
+
+  resultaten = json.loads(uitvoer.read_text(encoding='utf-8'))['resultaten']
+  assert [(resultaat['lampen'], resultaat['bewerking']) for resultaat in resultaten] == \
+         [(5, 'haallampen'), (5, 'stuuractie')]
+  assert all(resultaat['aantal'] == 3 and resultaat['fouten'] == 0 for resultaat in resultaten)
@@ -0,0 +1,259 @@
+import errno
+import json
+import os
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+from gegevens import Gegevens
+
+
+def schrijfbestand(bestand, rijen):
+  with open(bestand, 'w', encoding='utf-8') as f:
+    json.dump({'data': rijen}, f)
+
+
+def test_leesenschrijf(tmp_path):
+  envdb = Gegevens(str(tmp_path / 'envdb.json'))
+  envdb.schrijf('pod', '1234-4321-5678')
+  envdb.wijzig('gridbreedte', 3)
+  envdb.wijzig('gridbreedte', 4)
+
+  assert envdb.lees('pod') == '1234-4321-5678'
+  assert envdb.lees('gridbreedte') == 4
+  assert envdb.leesint('gridhoogte', 5) == 5
+  assert envdb.lees('onbekend') is None
+
+  envdb.verwijder('pod')
+  assert envdb.lees('pod') is None
+  assert Gegevens(str(tmp_path / 'envdb.json')).lees('gridbreedte') == 4
+
+
+def test_leeskopie(tmp_path):
+  envdb = Gegevens(str(tmp_path / 'envdb.json'))
+  lampen = [{'id': 'lamp1', 'automatisch': False}]
+  envdb.schrijf('lampen', lampen)
+  lampen[0]['automatisch'] = True
+  gelezen = envdb.lees('lampen')
+  gelezen[0]['checked'] = False
+
+  assert envdb.lees('lampen') == [{'id': 'lamp1', 'automatisch': False}]
+
+
+def test_leesuitcache(tmp_path):
+  bestand = str(tmp_path / 'envdb.json')
+  schrijfbestand(bestand, [{'env': 'pod', 'value': '1234', 'id': 1},
+                           {'env': 'token', 'value': 'abcd', 'id': 2}])
+  envdb = Gegevens(bestand)
+  with patch('pysondb.db.JsonDatabase.getAll', wraps=envdb.opslag.gegevens.getAll) as mock_getall:
+    for _ in range(10):
+      assert envdb.lees('pod') == '1234'
+      assert envdb.lees('token') == 'abcd'
+
+  assert mock_getall.call_count == 1
+
+
+def test_leesnaexternewijziging(tmp_path):
+  bestand = str(tmp_path / 'envdb.json')
+  schrijfbestand(bestand, [{'env': 'pod', 'value': '1234', 'id': 1}])
+  envdb = Gegevens(bestand)
+  assert envdb.lees('pod') == '1234'
+
+  schrijfbestand(bestand, [{'env': 'pod', 'value': '5678-8765', 'id': 1}])
+  assert envdb.lees('pod') == '5678-8765'
+
+  schrijfbestand(bestand, [{'env': 'pod', 'value': '8765-5678', 'id': 1}])
+  status = os.stat(bestand)
+  os.utime(bestand, ns=(status.st_atime_ns, status.st_mtime_ns + 1_000_000))
+  assert envdb.lees('pod') == '8765-5678'
+
+
+def test_leesdubbel(tmp_path):
+  bestand = str(tmp_path / 'envdb.json')
+  schrijfbestand(bestand, [{'env': 'pod', 'value': '1234', 'id': 1},
+                           {'env': 'pod', 'value': '5678', 'id': 2}])
+  envdb = Gegevens(bestand)
+
+  assert envdb.lees('pod') is None
+  envdb.wijzig('pod', '4321')
+  assert envdb.lees('pod') == '4321'
+
+
+def test_wijzigeenmaalschrijven(tmp_path):
+  bestand = str(tmp_path / 'zonnesterkte.json')
+  schrijfbestand(bestand, [{'env': 'zonnesterkte', 'value': 100, 'id': 12345}])
+  zondb = Gegevens(bestand)
+  with patch('os.replace', wraps=os.replace) as mock_replace, \
+      patch('pysondb.db.JsonDatabase.add') as mock_add, \
+      patch('pysondb.db.JsonDatabase.deleteById') as mock_delete:
+    zondb.wijzig('zonnesterkte', 200)
+
+  assert mock_replace.call_count == 1
+  assert mock_add.call_count == 0
+  assert mock_delete.call_count == 0
+  with open(bestand, encoding='utf-8') as f:
+    assert json.load(f) == {'data': [{'env': 'zonnesterkte', 'value': 200, 'id': 12345}]}
+  assert not [naam for naam in os.listdir(tmp_path) if naam.endswith('.tmp')]
+
+
+def test_wijzigmislukt(tmp_path):
+  bestand = str(tmp_path / 'zonnesterkte.json')
+  schrijfbestand(bestand, [{'env': 'zonnesterkte', 'value': 100, 'id': 12345}])
+  zondb = Gegevens(bestand)
+  with patch('os.replace', side_effect=PermissionError), pytest.raises(PermissionError):
+    zondb.wijzig('zonnesterkte', 200)
+
+  assert zondb.lees('zonnesterkte') == 100
+  assert Gegevens(bestand).lees('zonnesterkte') == 100
+  assert not [naam for naam in os.listdir(tmp_path) if naam.endswith('.tmp')]
+
+
+def test_wijziggekoppeldbestand(tmp_path):
+  bestand = str(tmp_path / 'envdb.json')
+  envdb = Gegevens(bestand)
+  with patch('os.replace', side_effect=OSError(errno.EBUSY, 'Device or resource busy')):
+    envdb.wijzig('pod', '1234-4321-5678')
+
+  assert Gegevens(bestand).lees('pod') == '1234-4321-5678'
+  assert not [naam for naam in os.listdir(tmp_path) if naam.endswith('.tmp')]
+
+
+def test_transactie(tmp_path):
+  bestand = str(tmp_path / 'envdb.json')
+  envdb = Gegevens(bestand)
+  with patch('os.replace', wraps=os.replace) as mock_replace:
+    with envdb.transactie():
+      envdb.wijzig('zonsterktelampen', 350)
+      envdb.wijzig('zonsterktelampenuit', 650)
+      envdb.wijzig('starttijd', 9)
+      envdb.verwijder('eindtijd')
+      assert envdb.lees('starttijd') == 9
+      assert Gegevens(bestand).lees('starttijd') is None
+
+  assert mock_replace.call_count == 1
+  andere = Gegevens(bestand)
+  assert andere.lees('zonsterktelampen') == 350
+  assert andere.lees('zonsterktelampenuit') == 650
+  assert andere.lees('starttijd') == 9
+
+
+def test_transactie_anderethread(tmp_path):
+  envdb = Gegevens(str(tmp_path / 'envdb.json'))
+  envdb.wijzig('gridbreedte', 2)
+  gelezen = []
+  with envdb.transactie():
+    envdb.wijzig('gridbreedte', 3)
+    envdb.wijzig('gridhoogte', 4)
+    lezer = threading.Thread(target=lambda: gelezen.append((envdb.lees('gridbreedte'), envdb.lees('gridhoogte'))))
+    lezer.start()
+    lezer.join()
+
+  assert gelezen == [(2, None)]
+  assert envdb.lees('gridbreedte') == 3
+  assert envdb.lees('gridhoogte') == 4
+
+
+def test_transactie_exceptie(tmp_path):
+  envdb = Gegevens(str(tmp_path / 'envdb.json'))
+  envdb.wijzig('gridbreedte', 2)
+  with pytest.raises(ValueError):
+    with envdb.transactie():
+      envdb.wijzig('gridbreedte', 3)
+      with envdb.transactie():
+        envdb.wijzig('gridhoogte', 4)
+      raise ValueError('fout')
+
+  assert envdb.lees('gridbreedte') == 2
+  assert envdb.lees('gridhoogte') is None
+
+
+def test_transactie_zonderwijziging(tmp_path):
+  envdb = Gegevens(str(tmp_path / 'envdb.json'))
+  envdb.wijzig('gridbreedte', 2)
+  with patch('os.replace') as mock_replace:
+    with envdb.transactie():
+      envdb.wijzig('gridbreedte', 2)
+      envdb.verwijder('onbekend')
+
+  assert mock_replace.call_count == 0
+
+
+def test_wijzigbewerktewaarde(tmp_path):
+  bestand = str(tmp_path / 'envdb.json')
+  envdb = Gegevens(bestand)
+  envdb.wijzig('lampen', [{'id': 'lamp1', 'automatisch': False}])
+  lampen = envdb.lees('lampen')
+  lampen[0]['automatisch'] = True
+  envdb.wijzig('lampen', lampen)
+
+  assert Gegevens(bestand).lees('lampen') == [{'id': 'lamp1', 'automatisch': True}]
+
+
+def test_snapshot(tmp_path):
+  envdb = Gegevens(str(tmp_path / 'envdb.json'))
+  with envdb.transactie():
+    envdb.wijzig('pod', '1234-4321-5678')
+    envdb.wijzig('gridbreedte', 3)
+  with patch('pysondb.db.JsonDatabase.getAll') as mock_getall:
+    instellingen = envdb.snapshot()
+
+  assert mock_getall.call_count == 0
+  assert dict(instellingen) == {'pod': '1234-4321-5678', 'gridbreedte': 3}
+  with pytest.raises(TypeError):
+    instellingen['pod'] = '5678'
+  envdb.wijzig('gridbreedte', 4)
+  assert instellingen['gridbreedte'] == 3
+
+  with envdb.transactie():
+    envdb.wijzig('gridhoogte', 5)
+    envdb.verwijder('pod')
+    assert dict(envdb.snapshot()) == {'gridbreedte': 4, 'gridhoogte': 5}
+
+
+def test_snapshotkopie(tmp_path):
+  envdb = Gegevens(str(tmp_path / 'envdb.json'))
+  envdb.wijzig('lampen', [{'id': 'guid-1-2-3', 'volgorde': 11}])
+  envdb.snapshot()['lampen'][0]['volgorde'] = 33
+
+  assert envdb.lees('lampen') == [{'id': 'guid-1-2-3', 'volgorde': 11}]
+
+
+def test_uitgesteld(tmp_path):
+  bestand = str(tmp_path / 'zonnesterkte.json')
+  zondb = Gegevens(bestand, uitgesteld=('zonnesterkte',), interval=0.2)
+  with patch('os.replace', wraps=os.replace) as mock_replace:
+    for waarde in range(100, 110):
+      zondb.wijzig('zonnesterkte', waarde)
+      assert zondb.lees('zonnesterkte') == waarde
+    assert zondb.snapshot()['zonnesterkte'] == 109
+    assert Gegevens(bestand).lees('zonnesterkte') is None
+    assert mock_replace.call_count == 0
+
+    for _ in range(50):
+      if Gegevens(bestand).lees('zonnesterkte') == 109:
+        break
+      time.sleep(0.05)
+
+  assert mock_replace.call_count == 1
+  assert Gegevens(bestand).lees('zonnesterkte') == 109
+
+
+def test_uitgesteld_schrijfweg(tmp_path):
+  bestand = str(tmp_path / 'zonnesterkte.json')
+  zondb = Gegevens(bestand, uitgesteld=('zonnesterkte',), interval=3600)
+  zondb.wijzig('zonnesterkte', 100)
+  zondb.wijzig('gridbreedte', 3)
+  assert Gegevens(bestand).lees('gridbreedte') == 3
+  assert Gegevens(bestand).lees('zonnesterkte') is None
+
+  zondb.schrijfweg()
+  assert Gegevens(bestand).lees('zonnesterkte') == 100
+
+  zondb.wijzig('zonnesterkte', 200)
+  with zondb.transactie():
+    zondb.wijzig('zonnesterkte', 300)
+  zondb.schrijfweg()
+  assert zondb.lees('zonnesterkte') == 300
+  assert Gegevens(bestand).lees('zonnesterkte') == 300
@@ -0,0 +1,32 @@
+import threading
+import time
+
+from gelijktijdig import haalbinnentijd
+
+
+def test_haalbinnentijd():
+  vrij = threading.Event()
+
+  def fout():
+    raise ValueError('fout')
+
+  begin = time.monotonic()
+  resultaten = haalbinnentijd({'snel': lambda: 1, 'fout': fout, 'traag': lambda: vrij.wait(5)}, 0.1)
+  duur = time.monotonic() - begin
+  vrij.set()
+
+  assert resultaten == {'snel': 1, 'fout': None, 'traag': None}
+  assert duur < 1
+
+
+def test_haalbinnentijd_gelijktijdig():
+  begin = time.monotonic()
+  resultaten = haalbinnentijd({str(nummer): lambda: time.sleep(0.2) or 'klaar'
+                               for nummer in range(5)}, 2)
+
+  assert resultaten == {str(nummer): 'klaar' for nummer in range(5)}
+  assert time.monotonic() - begin < 0.8
+
+
+def test_haalbinnentijd_leeg():
+  assert haalbinnentijd({}, 1) == {}
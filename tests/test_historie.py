@@ -0,0 +1,60 @@
+import pytest
+
+from historie import Tijdreeks
+
+
+def test_voegtoeenzoek(tmp_path):
+  tijdreeks = Tijdreeks(str(tmp_path / 'zonnesterkte.historie'), capaciteit=10)
+  for minuut in range(5):
+    tijdreeks.voegtoe(1000 + minuut * 60, minuut * 100)
+
+  assert tijdreeks.aantal == 5
+  assert tijdreeks.zoek(1060, 1180) == [(1060, 100), (1120, 200)]
+  assert tijdreeks.zoek(0, 1000) == []
+  assert tijdreeks.zoek(2000, 3000) == []
+
+
+def test_ringbuffer(tmp_path):
+  tijdreeks = Tijdreeks(str(tmp_path / 'zonnesterkte.historie'), capaciteit=4)
+  for tijdstip in range(10):
+    tijdreeks.voegtoe(tijdstip, -tijdstip)
+
+  assert tijdreeks.aantal == 4
+  assert tijdreeks.zoek(0, 100) == [(6, -6), (7, -7), (8, -8), (9, -9)]
+  assert tijdreeks.zoek(7, 9) == [(7, -7), (8, -8)]
+
+
+def test_tijdsprongterug(tmp_path):
+  tijdreeks = Tijdreeks(str(tmp_path / 'zonnesterkte.historie'), capaciteit=4)
+  tijdreeks.voegtoe(100, 1)
+  tijdreeks.voegtoe(50, 2)
+
+  assert tijdreeks.zoek(0, 200) == [(100, 1), (100, 2)]
+
+
+def test_opnieuwopenen(tmp_path):
+  bestand = str(tmp_path / 'zonnesterkte.historie')
+  tijdreeks = Tijdreeks(bestand, capaciteit=3)
+  for tijdstip in range(5):
+    tijdreeks.voegtoe(tijdstip, tijdstip * 10)
+  tijdreeks.sluit()
+
+  opnieuw = Tijdreeks(bestand, capaciteit=100)
+  assert opnieuw.capaciteit == 3
+  assert opnieuw.zoek(0, 10) == [(2, 20), (3, 30), (4, 40)]
+
+
+def test_geentijdreeks(tmp_path):
+  bestand = tmp_path / 'zonnesterkte.historie'
+  bestand.write_bytes(b'{"data": []}' * 10)
+  with pytest.raises(ValueError):
+    Tijdreeks(str(bestand))
+
+
+def test_samenvatting(tmp_path):
+  tijdreeks = Tijdreeks(str(tmp_path / 'zonnesterkte.historie'), capaciteit=100)
+  for tijdstip, waarde in [(0, 100), (120, 300), (240, 200), (720, 50), (1900, 10)]:
+    tijdreeks.voegtoe(tijdstip, waarde)
+
+  assert tijdreeks.samenvatting(0, 1800, 600) == [{'tijd': 0, 'gemiddeld': 200, 'min': 100, 'max': 300},
+                                                  {'tijd': 600, 'gemiddeld': 50, 'min': 50, 'max': 50}]
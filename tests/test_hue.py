@@ -1,7 +1,12 @@
+import json
+import threading
+import time
 import unittest
 from unittest import mock
 from unittest.mock import ANY
 
+import requests
+
 
 class MyTestCaseHue(unittest.TestCase):
   @staticmethod
@@ -26,11 +31,10 @@ class MyTestCaseHue(unittest.TestCase):
       )
     return mock_resp
 
-  @mock.patch('pysondb.db.JsonDatabase.getByQuery',
-              side_effect=[[{'env': 'hueip', 'value': '4.3.2.1', 'id': 82265347}],
-                           [{'env': 'hueuser', 'value': 'abcd1234qwer8765', 'id': 918273548237}]
-                           ])
-  @mock.patch('requests.get')
+  @mock.patch('gegevens.Gegevens.snapshot',
+              return_value={'hueip': '4.3.2.1',
+                            'hueuser': 'abcd1234qwer8765'})
+  @mock.patch('requests.Session.get')
   def test_huegetdata(self, mock_get, mock_envdb):
     import thuis
     mock_resp = self._mock_response(status=200,
@@ -41,70 +45,180 @@ class MyTestCaseHue(unittest.TestCase):
     response = bridge.haalgegevens('path')
     self.assertEqual(response, ANY)
     mock_get.assert_called_once()
-    self.assertEqual(mock_envdb.call_count, 2)
+    self.assertEqual(mock_envdb.call_count, 1)
 
 
-  @mock.patch('pysondb.db.JsonDatabase.getByQuery',
-              side_effect=[[{'env': 'hueip', 'value': '4.3.2.1', 'id': 82265347}],
-                           [{'env': 'hueuser', 'value': 'abcd1234qwer8765', 'id': 918273548237}]
-                           ])
-  @mock.patch('requests.put')
+  @mock.patch('gegevens.Gegevens.snapshot',
+              return_value={'hueip': '4.3.2.1',
+                            'hueuser': 'abcd1234qwer8765'})
+  @mock.patch('requests.Session.put')
   def test_zetlampaan(self, mock_requestput, mock_envdb):
     import thuis
-    thuis.zetlampaan('lampid')
-    self.assertEqual(mock_envdb.call_count, 2)
+    thuis.zetlampaan('lampid').result(timeout=5)
+    self.assertEqual(mock_envdb.call_count, 1)
     self.assertEqual(mock_requestput.call_count, 1)
 
-  @mock.patch('pysondb.db.JsonDatabase.getByQuery',
-              side_effect=[[{'env': 'hueip', 'value': '4.3.2.1', 'id': 82265347}],
-                           [{'env': 'hueuser', 'value': 'abcd1234qwer8765', 'id': 918273548237}]
-                           ])
-  @mock.patch('requests.put')
+  @mock.patch('gegevens.Gegevens.snapshot',
+              return_value={'hueip': '4.3.2.1',
+                            'hueuser': 'abcd1234qwer8765'})
+  @mock.patch('requests.Session.put')
   def test_zetlampuit(self, mock_requestput, mock_envdb):
     import thuis
-    thuis.zetlampaan('lampid')
-    self.assertEqual(mock_envdb.call_count, 2)
+    thuis.zetlampaan('lampid').result(timeout=5)
+    self.assertEqual(mock_envdb.call_count, 1)
+    self.assertEqual(mock_requestput.call_count, 1)
+
+  @mock.patch('gegevens.Gegevens.snapshot',
+              return_value={'hueip': '4.3.2.1',
+                            'hueuser': 'abcd1234qwer8765',
+                            'groepen': {'huis': 'huis-1-2-3', 'ruimtes': []}})
+  @mock.patch('gegevens.Gegevens.lees')
+  @mock.patch('requests.Session.put')
+  def test_zetallelampenuit(self, mock_requestput, mock_envdb, mock_snapshot):
+    import thuis
+    resultaten = thuis.allelampenuit()
+    self.assertEqual(resultaten, {'huis-1-2-3': None})
+    self.assertEqual(mock_envdb.call_count, 0)
+    self.assertEqual(mock_snapshot.call_count, 2)
     self.assertEqual(mock_requestput.call_count, 1)
+    self.assertEqual(mock_requestput.call_args.kwargs['url'],
+                     'https://4.3.2.1/clip/v2/resource/grouped_light/huis-1-2-3')
 
-  @mock.patch('pysondb.db.JsonDatabase.getByQuery',
-              side_effect=[[{'env': 'lampen', 'value': [{"id": "guid-1-2-3", "naam": "Test Lamp"},
-                                                        {"id": "guid-4-5-6", "naam": "Lamp 2"}], 'id': 192378239}],
-                           [{'env': 'hueip', 'value': '4.3.2.1', 'id': 82265347}],
-                           [{'env': 'hueuser', 'value': 'abcd1234qwer8765', 'id': 918273548237}],
-                           [{'env': 'hueip', 'value': '4.3.2.1', 'id': 82265347}],
-                           [{'env': 'hueuser', 'value': 'abcd1234qwer8765', 'id': 918273548237}],
+  @mock.patch('gegevens.Gegevens.snapshot',
+              return_value={'hueip': '4.3.2.1',
+                            'hueuser': 'abcd1234qwer8765',
+                            'groepen': {}})
+  @mock.patch('gegevens.Gegevens.lees',
+              side_effect=[[{'id': 'guid-1-2-3', 'naam': 'Test Lamp'}, {'id': 'guid-4-5-6', 'naam': 'Lamp 2'}],
                            ])
-  @mock.patch('requests.put')
-  def test_zetallelampenuit(self, mock_requestput, mock_envdb):
+  @mock.patch('requests.Session.put')
+  def test_zetallelampenuit_zondergroep(self, mock_requestput, mock_envdb, mock_snapshot):
     import thuis
     thuis.allelampenuit()
-    self.assertEqual(mock_envdb.call_count, 5)
+    self.assertEqual(mock_envdb.call_count, 1)
+    self.assertEqual(mock_snapshot.call_count, 3)
     self.assertEqual(mock_requestput.call_count, 2)
 
-  @mock.patch('pysondb.db.JsonDatabase.getByQuery',
-              return_value=[{'env': 'lampen', 'value': [], 'id': 29346298364}])
-  @mock.patch('pysondb.db.JsonDatabase.deleteById')
-  def test_ververslampen(self, mock_delete, mock_query):
+  @mock.patch('gegevens.Gegevens.wijzig')
+  @mock.patch('requests.Session.get')
+  def test_haalgroepen(self, mock_get, mock_wijzig):
     import thuis
-    thuis.ververslampen()
+    antwoorden = {'bridge_home': {'data': [{'services': [{'rid': 'huis-id', 'rtype': 'grouped_light'}]}]},
+                  'room': {'data': [{'metadata': {'name': 'Woonkamer'},
+                                     'services': [{'rid': 'woonkamer-id', 'rtype': 'grouped_light'}]},
+                                    {'metadata': {'name': 'Berging'}, 'services': []}]},
+                  'zone': {'data': [{'metadata': {'name': 'Beneden'},
+                                     'services': [{'rid': 'beneden-id', 'rtype': 'grouped_light'}]}]}}
+
+    def antwoord(url, timeout, verify):
+      response = mock.MagicMock()
+      response.__enter__.return_value = self._mock_response(json_data=antwoorden[url.rsplit('/', 1)[1]])
+      return response
+
+    mock_get.side_effect = antwoord
+
+    groepen = thuis.haalgroepen({'hueip': '4.3.2.1', 'hueuser': 'abcd1234qwer8765'})
+
+    self.assertEqual(groepen, {'huis': 'huis-id',
+                               'ruimtes': [{'id': 'beneden-id', 'naam': 'Beneden', 'soort': 'zone'},
+                                           {'id': 'woonkamer-id', 'naam': 'Woonkamer', 'soort': 'room'}]})
+    mock_wijzig.assert_called_once_with('groepen', groepen)
+    self.assertEqual(thuis.haalgroepen({'groepen': groepen}), groepen)
+    self.assertEqual(mock_get.call_count, 3)
+
+  @mock.patch('gegevens.Gegevens.wijzig')
+  @mock.patch('requests.Session.get', side_effect=requests.ConnectTimeout)
+  def test_haalgroepen_onbereikbaar(self, mock_get, mock_wijzig):
+    import thuis
+    self.assertEqual(thuis.haalgroepen({'hueip': '4.3.2.1', 'hueuser': 'abcd1234qwer8765'}), {})
+    self.assertEqual(thuis.haalgroepen({}), {})
+    self.assertEqual(mock_get.call_count, 1)
+    self.assertEqual(mock_wijzig.call_count, 0)
+
+  @mock.patch('gegevens.Gegevens.wijzig')
+  @mock.patch('requests.Session.get')
+  def test_haalgroepen_fout(self, mock_get, mock_wijzig):
+    import thuis
+    response = mock.MagicMock()
+    response.__enter__.return_value = self._mock_response(
+      json_data={'errors': [{'description': 'unauthorized user'}], 'data': []})
+    mock_get.return_value = response
 
-    self.assertEqual(mock_delete.call_count, 1)
-    self.assertEqual(mock_query.call_count, 1)
+    self.assertEqual(thuis.haalgroepen({'hueip': '4.3.2.1', 'hueuser': 'abcd1234qwer8765'}), {})
+    self.assertEqual(mock_get.call_count, 3)
+    self.assertEqual(mock_wijzig.call_count, 0)
 
-  def test_kleurberekenen_04_04_40(self):
+  @mock.patch('hue.Hue.stuurgegevens')
+  def test_voeruitoplampen_gelijktijdig(self, mock_stuur):
     import thuis
-    kleurwaarde = thuis.bepaalhexrgbvanxy(0.4, 0.4, 40)
-    self.assertEqual(kleurwaarde, '#3d664d')
-    xwaarde, ywaarde, brightness = thuis.bepaalxyvanrgb(kleurwaarde)
-    self.assertEqual(xwaarde, 0.4)
-    self.assertEqual(ywaarde, 0.4)
-    self.assertEqual(brightness, 40)
-
-  def test_kleurberekenen_wit(self):
+    from hue import Hue, LampActie
+    slot = threading.Lock()
+    onderweg = []
+    hoogste = []
+
+    def langzaam(path, data):
+      with slot:
+        onderweg.append(path)
+        hoogste.append(len(onderweg))
+      time.sleep(0.1)
+      with slot:
+        onderweg.remove(path)
+      return {}
+
+    mock_stuur.side_effect = langzaam
+    bridge = Hue('4.3.2.1', 'abcd1234qwer8765', gelijktijdig=2)
+    resultaten = thuis.voeruitoplampen(['lamp1', 'lamp2', 'lamp3', 'lamp4'],
+                                       lambda lampid: bridge.plaatsactie(lampid, LampActie().aan(False)))
+
+    self.assertEqual(resultaten, {'lamp1': None, 'lamp2': None, 'lamp3': None, 'lamp4': None})
+    self.assertEqual(mock_stuur.call_count, 4)
+    self.assertEqual(max(hoogste), 2)
+
+  def test_voeruitoplampen_fout(self):
+    import thuis
+    fout = requests.ConnectTimeout('bridge reageert niet')
+
+    def zetuit(lampid):
+      if lampid == 'lamp2':
+        raise fout
+
+    opdracht = mock.Mock(side_effect=zetuit)
+
+    resultaten = thuis.voeruitoplampen(['lamp1', 'lamp2', 'lamp3'], opdracht)
+
+    self.assertEqual(resultaten, {'lamp1': None, 'lamp2': fout, 'lamp3': None})
+    self.assertEqual(opdracht.call_count, 3)
+    self.assertEqual(thuis.voeruitoplampen([], opdracht), {})
+
+  @mock.patch('gegevens.Gegevens.snapshot',
+              return_value={'hueip': '4.3.2.2',
+                            'hueuser': 'abcd1234qwer8765'})
+  def test_gethue_hergebruik(self, mock_envdb):
     import thuis
-    kleurwaarde = thuis.bepaalhexrgbvanxy(0, 0, 100)
-    self.assertEqual(kleurwaarde, '#ffffff')
-    xwaarde, ywaarde, brightness = thuis.bepaalxyvanrgb(kleurwaarde)
-    self.assertEqual(xwaarde, 0)
-    self.assertEqual(ywaarde, 0)
-    self.assertEqual(brightness, 100)
+    bridge = thuis.gethue()
+
+    self.assertIs(thuis.gethue(), bridge)
+    self.assertEqual(bridge.wachtrij.gelijktijdig, thuis.lampengelijktijdig)
+    self.assertFalse(bridge.sessie.verify)
+    self.assertEqual(bridge.sessie.headers['hue-application-key'], 'abcd1234qwer8765')
+    self.assertEqual(mock_envdb.call_count, 2)
+    self.assertIsNot(thuis.gethue({'hueip': '4.3.2.2', 'hueuser': 'ander'}), bridge)
+
+  @mock.patch('requests.Session.put')
+  def test_stuuractie(self, mock_requestput):
+    from hue import Hue, LampActie
+    bridge = Hue('4.3.2.1', 'abcd1234qwer8765')
+    bridge.stuuractie('lampid', LampActie().aan().dim(50).kleur(0.3, 0.4).overgang(400))
+
+    mock_requestput.assert_called_once()
+    self.assertEqual(mock_requestput.call_args.kwargs['url'], 'https://4.3.2.1/clip/v2/resource/light/lampid')
+    self.assertEqual(json.loads(mock_requestput.call_args.kwargs['data']),
+                     {'on': {'on': True}, 'dimming': {'brightness': 50},
+                      'color': {'xy': {'x': 0.3, 'y': 0.4}}, 'dynamics': {'duration': 400}})
+
+  @mock.patch('gegevens.Gegevens.verwijder')
+  def test_ververslampen(self, mock_verwijder):
+    import thuis
+    thuis.ververslampen()
+
+    self.assertEqual(mock_verwijder.call_args_list, [mock.call('lampen'), mock.call('groepen')])
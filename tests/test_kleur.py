@@ -0,0 +1,59 @@
+import unittest
+
+
+class MyTestCaseKleur(unittest.TestCase):
+  def test_kleurberekenen_rondgang(self):
+    from kleur import bepaalhexrgbvanxy, bepaalxyvanrgb
+    for kleurwaarde in ('#ff0000', '#00ff00', '#0000ff', '#3d664d', '#808080', '#a1b2c3'):
+      xwaarde, ywaarde, brightness = bepaalxyvanrgb(kleurwaarde)
+      self.assertEqual(bepaalhexrgbvanxy(xwaarde, ywaarde, brightness), kleurwaarde)
+
+  def test_kleurberekenen_rood(self):
+    from kleur import bepaalxyvanrgb
+    self.assertEqual(bepaalxyvanrgb('#ff0000'), (0.6401, 0.33, 100.0))
+    self.assertEqual(bepaalxyvanrgb('#7f0000'), (0.6401, 0.33, 49.8))
+
+  def test_kleurberekenen_wit(self):
+    from kleur import bepaalhexrgbvanxy, bepaalxyvanrgb
+    kleurwaarde = bepaalhexrgbvanxy(0.3127, 0.329, 100)
+    self.assertEqual(kleurwaarde, '#ffffff')
+    self.assertEqual(bepaalxyvanrgb(kleurwaarde), (0.3127, 0.329, 100.0))
+    self.assertEqual(bepaalhexrgbvanxy(0, 0, 100), '#ffffff')
+
+  def test_kleurberekenen_zwart(self):
+    from kleur import bepaalhexrgbvanxy, bepaalxyvanrgb
+    self.assertEqual(bepaalxyvanrgb('#000000'), (0.3127, 0.329, 0.0))
+    self.assertEqual(bepaalhexrgbvanxy(0.3127, 0.329, 0), '#000000')
+
+  def test_binnengamut(self):
+    from kleur import GAMUTS, bepaalxyvanrgb, binnengamut
+    self.assertEqual(binnengamut(0.4, 0.4, GAMUTS['C']), (0.4, 0.4))
+    self.assertEqual(bepaalxyvanrgb('#00ff00', GAMUTS['B']), (0.409, 0.518, 100.0))
+    xwaarde, ywaarde = binnengamut(0.8, 0.2, GAMUTS['A'])
+    self.assertAlmostEqual(xwaarde, 0.704, places=3)
+    self.assertAlmostEqual(ywaarde, 0.296, places=3)
+
+  def test_leesgamut(self):
+    from kleur import GAMUTS, leesgamut
+    gamut = {'red': {'x': 0.6915, 'y': 0.3083}, 'green': {'x': 0.17, 'y': 0.7},
+             'blue': {'x': 0.1532, 'y': 0.0475}}
+    self.assertEqual(leesgamut({'gamut': gamut, 'gamut_type': 'C'}), GAMUTS['C'])
+    self.assertEqual(leesgamut({'gamut_type': 'A'}), GAMUTS['A'])
+    self.assertIsNone(leesgamut({'gamut_type': 'other'}))
+
+  def test_bepaalhexrgbvanxylijst(self):
+    from kleur import bepaalhexrgbvanxy, bepaalhexrgbvanxylijst
+    kleuren = [(0.6401, 0.33, 100), (0.3127, 0.329, 50), (0.6401, 0.33, 100)]
+    self.assertEqual(bepaalhexrgbvanxylijst(kleuren), [bepaalhexrgbvanxy(*kleur) for kleur in kleuren])
+    self.assertEqual(bepaalhexrgbvanxylijst([]), [])
+
+  def test_haalgamut(self):
+    import thuis
+    from kleur import GAMUTS
+    thuis.lampverwachting.wis()
+    self.assertIsNone(thuis.haalgamut('lamp1'))
+    thuis.lampverwachting.bewaar('light', {'errors': [], 'data': [{'id': 'lamp1', 'color': {'gamut_type': 'B'}},
+                                                                  {'id': 'lamp2'}]})
+    self.assertEqual(thuis.haalgamut('lamp1'), GAMUTS['B'])
+    self.assertIsNone(thuis.haalgamut('lamp2'))
+    thuis.lampverwachting.wis()
@@ -0,0 +1,144 @@
+import json
+import queue
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+import pytest
+
+from hue import Hue
+from lampstatus import LampStatus, voegsamen
+
+LAMPEN = {'errors': [],
+          'data': [{'id': 'lamp1', 'type': 'light', 'metadata': {'name': 'Staande lamp'},
+                    'on': {'on': False}, 'dimming': {'brightness': 50.0}},
+                   {'id': 'lamp2', 'type': 'light', 'metadata': {'name': 'Plafond'},
+                    'on': {'on': True}}]}
+
+
+class NepBridge(ThreadingHTTPServer):
+  """ Bridge met de light-resource en een eventstream """
+  daemon_threads = True
+
+  def __init__(self):
+    super().__init__(('127.0.0.1', 0), NepBridgeHandler)
+    self.events = queue.Queue()
+    self.lampverzoeken = 0
+    self.streams = 0
+
+
+class NepBridgeHandler(BaseHTTPRequestHandler):
+  def log_message(self, *args):
+    pass
+
+  def do_GET(self):
+    if self.path == '/clip/v2/resource/light':
+      self.server.lampverzoeken += 1
+      inhoud = json.dumps(LAMPEN).encode()
+      self.send_response(200)
+      self.send_header('Content-Type', 'application/json')
+      self.send_header('Content-Length', str(len(inhoud)))
+      self.end_headers()
+      self.wfile.write(inhoud)
+    elif self.path == '/eventstream/clip/v2':
+      self.server.streams += 1
+      self.send_response(200)
+      self.send_header('Content-Type', 'text/event-stream')
+      self.send_header('Connection', 'close')
+      self.end_headers()
+      self.wfile.write(b': hi\n\n')
+      self.wfile.flush()
+      while (event := self.server.events.get()) is not None:
+        self.wfile.write(f'id: 1:0\ndata: {json.dumps(event)}\n\n'.encode())
+        self.wfile.flush()
+    else:
+      self.send_error(404)
+
+
+@pytest.fixture()
+def nepbridge():
+  server = NepBridge()
+  threading.Thread(target=server.serve_forever, daemon=True).start()
+  yield server
+  server.shutdown()
+  server.server_close()
+
+
+def wachtop(voorwaarde, tijd=5):
+  einde = time.monotonic() + tijd
+  while not voorwaarde():
+    assert time.monotonic() < einde
+    time.sleep(0.01)
+
+
+def maakbridge(server):
+  bridge = Hue('127.0.0.1', 'gebruiker')
+  bridge.basisurl = f'http://127.0.0.1:{server.server_port}'
+  return bridge
+
+
+def test_eventstream(nepbridge):
+  bridge = maakbridge(nepbridge)
+  status = LampStatus(lambda: bridge, wachttijd=0.1)
+  assert status.lampdata() is None
+  status.start()
+  wachtop(lambda: nepbridge.streams == 1)
+
+  assert status.lampdata() == LAMPEN
+  nepbridge.events.put([{'type': 'update',
+                         'data': [{'id': 'lamp1', 'type': 'light', 'on': {'on': True},
+                                   'dimming': {'brightness': 80.0}},
+                                  {'id': 'groep1', 'type': 'grouped_light', 'on': {'on': True}}]}])
+  wachtop(lambda: status.lampdata()['data'][0]['on'] == {'on': True})
+  assert status.lampdata()['data'][0] == {'id': 'lamp1', 'type': 'light', 'metadata': {'name': 'Staande lamp'},
+                                          'on': {'on': True}, 'dimming': {'brightness': 80.0}}
+  nepbridge.events.put([{'type': 'delete', 'data': [{'id': 'lamp2', 'type': 'light'}]},
+                        {'type': 'add', 'data': [{'id': 'lamp3', 'type': 'light', 'on': {'on': False}}]}])
+  wachtop(lambda: [lamp['id'] for lamp in status.lampdata()['data']] == ['lamp1', 'lamp3'])
+  assert nepbridge.lampverzoeken == 1
+
+  # Na het wegvallen van de stream worden de lampen opnieuw opgehaald
+  nepbridge.events.put(None)
+  wachtop(lambda: nepbridge.streams == 2)
+  assert nepbridge.lampverzoeken == 2
+  assert status.lampdata() == LAMPEN
+  status.stop()
+  nepbridge.events.put(None)
+  assert status.lampdata() is None
+
+
+def test_bridgeonbereikbaar(nepbridge):
+  bridge = maakbridge(nepbridge)
+  bridge.basisurl = 'http://127.0.0.1:1'
+  status = LampStatus(lambda: bridge, wachttijd=0.05)
+  status.start()
+  time.sleep(0.2)
+  status.stop()
+
+  assert status.lampdata() is None
+
+
+def test_voegsamen():
+  lamp = {'on': {'on': False}, 'color': {'xy': {'x': 0.1, 'y': 0.2}, 'gamut_type': 'C'}}
+  voegsamen(lamp, {'on': {'on': True}, 'color': {'xy': {'x': 0.3, 'y': 0.4}}, 'dimming': {'brightness': 10}})
+
+  assert lamp == {'on': {'on': True}, 'color': {'xy': {'x': 0.3, 'y': 0.4}, 'gamut_type': 'C'},
+                  'dimming': {'brightness': 10}}
+
+
+@patch('gegevens.Gegevens.snapshot',
+       return_value={'hueip': '1.2.3.4',
+                     'hueuser': '7da7a68792t3r',
+                     'lampen': [{'id': 'lamp1', 'naam': 'Staande lamp', 'volgorde': 11},
+                                {'id': 'lamp2', 'naam': 'Plafond', 'volgorde': 12}]})
+@patch('requests.Session.get')
+def test_haallampenuittabel(mock_get, mock_snapshot):
+  import thuis
+  with patch.object(thuis.lampstatus, 'lampdata', return_value=LAMPEN):
+    lampen = thuis.haallampen()
+
+  assert [(lamp['id'], lamp['status'], lamp['volgorde']) for lamp in lampen] == [('lamp1', 'Uit', 11),
+                                                                                ('lamp2', 'Aan', 12)]
+  assert mock_get.call_count == 0
+  assert mock_snapshot.call_count == 1
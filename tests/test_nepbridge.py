@@ -0,0 +1,104 @@
+import importlib.util
+import os
+import time
+
+import pytest
+import requests
+
+from hue import Hue, LampActie
+from lampstatus import LampStatus
+
+spec = importlib.util.spec_from_file_location(
+  'nepbridge', os.path.join(os.path.dirname(__file__), '..', 'benchmarks', 'nepbridge.py'))
+nepbridge = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(nepbridge)
+
+# De nagebootste bridge heeft een zelf ondertekend certificaat, net als een echte bridge
+pytestmark = pytest.mark.filterwarnings('ignore::urllib3.exceptions.InsecureRequestWarning')
+
+
+@pytest.fixture()
+def bridge():
+  with nepbridge.NepBridge(lampen=200) as server:
+    yield server
+
+
+def wachtop(voorwaarde, tijd=5):
+  einde = time.monotonic() + tijd
+  while not voorwaarde():
+    assert time.monotonic() < einde
+    time.sleep(0.01)
+
+
+def test_haalgegevens(bridge):
+  hue = Hue(bridge.adres, 'gebruiker')
+  lampdata = hue.haalgegevens('light')
+
+  assert lampdata['errors'] == []
+  assert len(lampdata['data']) == 200
+  lampid = lampdata['data'][0]['id']
+  assert hue.haalgegevens(f'light/{lampid}')['data'] == [lampdata['data'][0]]
+  assert hue.haalgegevens('room') == {'errors': [], 'data': []}
+  assert hue.haalgegevens('light/onbekend')['errors'] == [{'description': 'resource not found'}]
+
+
+def test_stuuractie(bridge):
+  hue = Hue(bridge.adres, 'gebruiker')
+  lampid = next(iter(bridge.lampen))
+  hue.stuuractie(lampid, LampActie().aan(False).dim(20).overgang(400))
+
+  lamp = bridge.lampdata(lampid)[0]
+  assert lamp['on'] == {'on': False}
+  assert lamp['dimming'] == {'brightness': 20}
+  assert 'dynamics' not in lamp
+  hue.stuuractie('huis', LampActie().aan(), 'grouped_light')
+  assert all(lamp['on']['on'] for lamp in bridge.lampdata())
+  assert bridge.verzoeken['PUT'] == 2
+  with pytest.raises(requests.HTTPError):
+    hue.stuuractie('onbekend', LampActie().aan())
+
+
+def test_gebruiker():
+  with nepbridge.NepBridge(lampen=1, gebruiker='sleutel') as server:
+    assert Hue(server.adres, 'sleutel').haalgegevens('light')['errors'] == []
+    assert Hue(server.adres, 'fout').haalgegevens('light')['errors'] == [{'description': 'unauthorized user'}]
+
+
+def test_foutkans():
+  with nepbridge.NepBridge(lampen=1, foutkans=1.0) as server:
+    hue = Hue(server.adres, 'gebruiker')
+    assert hue.haalgegevens('light')['errors'] == [{'description': 'service unavailable'}]
+    with pytest.raises(requests.HTTPError) as fout:
+      hue.stuuractie(next(iter(server.lampen)), LampActie().aan())
+    assert fout.value.response.status_code == 503
+
+
+def test_haallampen(bridge):
+  import thuis
+  thuis.lampverwachting.wis()
+  instellingen = {'hueip': bridge.adres, 'hueuser': 'gebruiker',
+                  'lampen': [{'id': lampid, 'volgorde': 11} for lampid in bridge.lampen]}
+
+  lampen = thuis.haallampen(instellingen)
+
+  assert len(lampen) == 200
+  assert lampen[0]['naam'] == 'Lamp 001'
+  assert lampen[0]['rgbwaarde'] == '#000000'
+  assert lampen[1]['rgbwaarde'] != '#000000'
+  assert thuis.haalgamut(lampen[1]['id']) == thuis.leesgamut({'gamut_type': 'C'})
+  thuis.lampverwachting.wis()
+
+
+def test_lampstatus_eventstream(bridge):
+  hue = Hue(bridge.adres, 'gebruiker')
+  status = LampStatus(lambda: hue, wachttijd=0.1)
+  status.start()
+  try:
+    wachtop(lambda: status.lampdata() is not None)
+    lampid = next(iter(bridge.lampen))
+    wachtop(lambda: bridge.volgers == 1)
+    hue.stuuractie(lampid, LampActie().dim(33))
+    wachtop(lambda: next(lamp for lamp in status.lampdata()['data']
+                         if lamp['id'] == lampid)['dimming']['brightness'] == 33)
+  finally:
+    status.stop()
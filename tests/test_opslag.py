@@ -0,0 +1,160 @@
+import json
+import os
+import sqlite3
+from unittest.mock import patch
+
+import pytest
+
+from gegevens import Gegevens
+from opslag import JsonOpslag, LogOpslag, Opslag, SqliteOpslag, maakopslag
+
+
+def schrijfbestand(bestand, rijen):
+  with open(bestand, 'w', encoding='utf-8') as f:
+    json.dump({'data': rijen}, f)
+
+
+@pytest.mark.parametrize('soort', ['json', 'sqlite', 'log'])
+def test_gegevens(tmp_path, soort):
+  bestand = str(tmp_path / 'envdb.json')
+  envdb = Gegevens(bestand, soort)
+  envdb.schrijf('pod', '1234-4321-5678')
+  envdb.wijzig('lampen', [{'id': 'guid-1-2-3', 'naam': 'Test Lamp', 'volgorde': 11}])
+  with envdb.transactie():
+    envdb.wijzig('gridbreedte', 3)
+    envdb.wijzig('gridhoogte', 4)
+  envdb.verwijder('pod')
+
+  opnieuw = Gegevens(bestand, soort)
+  assert opnieuw.lees('pod') is None
+  assert opnieuw.lees('lampen') == [{'id': 'guid-1-2-3', 'naam': 'Test Lamp', 'volgorde': 11}]
+  assert opnieuw.leesint('gridbreedte', 2) == 3
+  assert opnieuw.leesint('gridhoogte', 5) == 4
+
+
+def test_maakopslag(tmp_path):
+  assert isinstance(maakopslag(str(tmp_path / 'envdb.json')), JsonOpslag)
+  sqliteopslag = maakopslag(str(tmp_path / 'envdb.json'), 'sqlite')
+  assert isinstance(sqliteopslag, SqliteOpslag)
+  assert sqliteopslag.bestand == str(tmp_path / 'envdb.sqlite')
+  logopslag = maakopslag(str(tmp_path / 'zonnesterkte.json'), 'log')
+  assert isinstance(logopslag, LogOpslag)
+  assert logopslag.bestand == str(tmp_path / 'zonnesterkte.log')
+  with pytest.raises(ValueError):
+    maakopslag(str(tmp_path / 'envdb.json'), 'onbekend')
+
+
+def test_sqlite_migratie(tmp_path):
+  bestand = str(tmp_path / 'envdb.json')
+  schrijfbestand(bestand, [{'env': 'pod', 'value': '1234-4321-5678', 'id': 1},
+                           {'env': 'gridbreedte', 'value': 3, 'id': 2}])
+  envdb = Gegevens(bestand, 'sqlite')
+  assert envdb.lees('pod') == '1234-4321-5678'
+  assert envdb.lees('gridbreedte') == 3
+
+  envdb.wijzig('gridbreedte', 4)
+  schrijfbestand(bestand, [{'env': 'pod', 'value': 'gewijzigd', 'id': 1}])
+  opnieuw = Gegevens(bestand, 'sqlite')
+  assert opnieuw.lees('pod') == '1234-4321-5678'
+  assert opnieuw.lees('gridbreedte') == 4
+
+
+def test_sqlite_wal(tmp_path):
+  opslag = SqliteOpslag(str(tmp_path / 'envdb.sqlite'))
+  with sqlite3.connect(opslag.bestand) as verbinding:
+    assert verbinding.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+
+
+def test_sqlite_persleutel(tmp_path):
+  bestand = str(tmp_path / 'envdb.json')
+  envdb = Gegevens(bestand, 'sqlite')
+  with envdb.transactie():
+    for nummer in range(50):
+      envdb.wijzig(f'sleutel{nummer}', nummer)
+  statements = []
+  envdb.opslag._verbinding.set_trace_callback(statements.append)
+  envdb.wijzig('sleutel7', 700)
+
+  assert [statement for statement in statements if statement.startswith(('INSERT', 'DELETE'))] == \
+         ["INSERT INTO gegevens (sleutel, waarde) VALUES ('sleutel7', '700') "
+          "ON CONFLICT (sleutel) DO UPDATE SET waarde = excluded.waarde"]
+
+
+def test_sqlite_anderproces(tmp_path):
+  bestand = str(tmp_path / 'envdb.json')
+  envdb = Gegevens(bestand, 'sqlite')
+  envdb.wijzig('pod', '1234')
+  assert envdb.lees('pod') == '1234'
+
+  with sqlite3.connect(str(tmp_path / 'envdb.sqlite')) as verbinding:
+    verbinding.execute("UPDATE gegevens SET waarde = '\"5678\"' WHERE sleutel = 'pod'")
+
+  assert envdb.lees('pod') == '5678'
+
+
+def test_log_toevoegen(tmp_path):
+  bestand = str(tmp_path / 'zonnesterkte.json')
+  schrijfbestand(bestand, [{'env': 'zonnesterkte', 'value': 100, 'id': 1}])
+  zondb = Gegevens(bestand, 'log')
+  assert zondb.lees('zonnesterkte') == 100
+  with patch('os.fsync', wraps=os.fsync) as mock_fsync, \
+      patch('os.replace', wraps=os.replace) as mock_replace:
+    for waarde in range(200, 210):
+      zondb.wijzig('zonnesterkte', waarde)
+
+  assert mock_fsync.call_count == 10
+  assert mock_replace.call_count == 0
+  with open(tmp_path / 'zonnesterkte.log', encoding='utf-8') as f:
+    regels = f.read().splitlines()
+  assert len(regels) == 11
+  assert json.loads(regels[-1]) == {'w': {'zonnesterkte': 209}, 'd': []}
+  assert Gegevens(bestand, 'log').lees('zonnesterkte') == 209
+
+
+def test_log_onvolledigeregel(tmp_path):
+  bestand = str(tmp_path / 'zonnesterkte.json')
+  zondb = Gegevens(bestand, 'log')
+  zondb.wijzig('zonnesterkte', 100)
+  with open(tmp_path / 'zonnesterkte.log', 'a', encoding='utf-8') as f:
+    f.write('{"w": {"zonnesterkte": 2')
+
+  opnieuw = Gegevens(bestand, 'log')
+  assert opnieuw.lees('zonnesterkte') == 100
+  opnieuw.wijzig('zonnesterkte', 300)
+  assert Gegevens(bestand, 'log').lees('zonnesterkte') == 300
+
+
+def test_log_comprimeer(tmp_path):
+  opslag = LogOpslag(str(tmp_path / 'zonnesterkte.log'), drempel=5)
+  zondb = Gegevens(str(tmp_path / 'zonnesterkte.json'))
+  zondb.opslag = opslag
+  for waarde in range(10):
+    zondb.wijzig('zonnesterkte', waarde)
+
+  with open(opslag.bestand, encoding='utf-8') as f:
+    assert len(f.read().splitlines()) < 10
+  assert zondb.lees('zonnesterkte') == 9
+  assert LogOpslag(opslag.bestand).laad() == {'zonnesterkte': 9}
+
+
+def test_log_comprimeer_andereproces(tmp_path):
+  bestand = str(tmp_path / 'envdb.json')
+  eerste = Gegevens(bestand, 'log', processlot=True)
+  tweede = Gegevens(bestand, 'log', processlot=True)
+  eerste.opslag.drempel = tweede.opslag.drempel = 3
+  for waarde in range(10):
+    eerste.wijzig('eerste', waarde)
+    tweede.wijzig('tweede', waarde)
+
+  with open(eerste.opslag.bestand, encoding='utf-8') as f:
+    assert len(f.read().splitlines()) < 20
+  assert LogOpslag(eerste.opslag.bestand).laad() == {'eerste': 9, 'tweede': 9}
+
+
+def test_opslag_abstract():
+  class Onvolledig(Opslag):
+    def laad(self):
+      return {}
+
+  with pytest.raises(TypeError):
+    Onvolledig()
@@ -1,9 +1,15 @@
+import threading
+import time
+from concurrent.futures import Future
 from unittest.mock import patch, MagicMock
 
 import pytest
 from flask import Flask
+from freezegun import freeze_time
 
 import thuis
+from gegevens import Gegevens
+from historie import Tijdreeks
 
 
 @pytest.fixture
@@ -11,6 +17,21 @@ def mock_env_weerapikey(monkeypatch):
   monkeypatch.setenv("WEER_API_KEY", "dummykey")
 
 
+@pytest.fixture(autouse=True)
+def envdb(tmp_path, monkeypatch):
+  monkeypatch.setattr(thuis, 'envdb', Gegevens(str(tmp_path / 'envdb.json')))
+  return thuis.envdb
+
+
+def maaksetup(standen, labels=None):
+  return [{'deviceURL': device,
+           'label': (labels or {}).get(device, device),
+           'controllableName': 'io:VerticalExteriorAwningIOComponent',
+           'states': [{'name': 'core:NameState', 'type': 3, 'value': device},
+                      {'name': 'core:DeploymentState', 'type': 1, 'value': waarde}]}
+          for device, waarde in standen.items()]
+
+
 def maakmockresponse(jsondata):
   mock_response = MagicMock()
   mock_response.getcode.return_value = 200
@@ -25,11 +46,18 @@ def app():
   app.config.update({
     "TESTING": True,
   })
+  thuis.lampverwachting.wis()
+  thuis.schermverwachting.wis()
+  thuis.somfycache.clear()
 
   @app.route('/thuis', methods=['GET'])
   def thuishoofdpagina():
     return thuis.thuispagina()
 
+  @app.route('/thuis/zonnesterkte/historie', methods=['GET'])
+  def thuiszonnesterktehistoriepagina():
+    return thuis.zonnesterktehistoriepagina()
+
   @app.route('/thuis/instellingen', methods=['GET'])
   def thuisinstellingenpagina():
     return thuis.instellingenpagina()
@@ -82,169 +110,116 @@ def test_404(client):
   assert b"404 Not Found" in response.data
 
 
-@patch('pysondb.db.JsonDatabase.getByQuery',
-       side_effect=[[{'env': 'gridbreedte', 'value': 2, 'id': 23964723}],
-                    [{'env': 'gridhoogte', 'value': 5, 'id': 129462834}],
-                    [{'env': 'pod', 'value': '1234-4321-5678', 'id': 28234834}],
-                    [{'env': 'jsessionid', 'value': 'E3~1234CAFE5678DECA', 'id': 286349129001}],
-                    ])
+@patch('gegevens.Gegevens.snapshot',
+       return_value={'gridbreedte': 2,
+                     'gridhoogte': 5})
 @patch('thuis.haallampen')
 @patch('thuis.haalzonnesterkte')
 def test_hoofdpaginaget(mock_zonnesterkte, mock_haallampen, mock_dbgetbyquery, client):
   response = client.get('/thuis')
   assert b"<h1>Thuis</h1>" in response.data
-  assert mock_dbgetbyquery.call_count == 2
+  assert mock_dbgetbyquery.call_count == 1
   assert mock_haallampen.call_count == 1
   assert mock_zonnesterkte.call_count == 1
 
 
-@patch('pysondb.db.JsonDatabase.getByQuery',
-       side_effect=[[{'env': 'pod', 'value': '1234-4321-5678', 'id': 28234834}],
-                    [],
-                    [{'env': 'gridbreedte', 'value': 2, 'id': 23964723}],
-                    [{'env': 'gridhoogte', 'value': 5, 'id': 129462834}],
-                    ])
+@patch('gegevens.Gegevens.snapshot',
+       return_value={'hueip': '1234-4321-5678',
+                     'gridbreedte': 2,
+                     'gridhoogte': 5})
 @patch('thuis.haalzonnesterkte')
 def test_hoofdpaginaget_geenjsessionid(mock_zonnesterkte, mock_dbgetbyquery, client):
   response = client.get('/thuis')
   assert b"<h1>Thuis</h1>" in response.data
-  assert mock_dbgetbyquery.call_count == 4
+  assert mock_dbgetbyquery.call_count == 1
   assert mock_zonnesterkte.call_count == 1
 
 
-@patch('pysondb.db.JsonDatabase.getByQuery',
-       side_effect=[[{'env': 'pod', 'value': '1234-4321-5678', 'id': 28234834}],
-                    [],
-                    [{'env': 'hueip', 'value': '1.2.3.4', 'id': 298346936}],
-                    [{'env': 'hueuser', 'value': '7da7a68792t3r', 'id': 23164382}],
-                    [],
-                    [],
-                    [],
-                    [],
-                    [],
-                    [],
-                    [],
-                    [],
-                    ])
+@patch('gegevens.Gegevens.snapshot',
+       return_value={'pod': '1234-4321-5678',
+                     'hueip': '1.2.3.4',
+                     'hueuser': '7da7a68792t3r'})
 def test_instellingenget_geenjsessionidengeenuserpass(mock_dbgetbyquery, client):
   response = client.get('/thuis/instellingen')
   assert b"<h1>Instellingen</h1>" in response.data
   assert b"id=\"userid\" name=\"userid\"" in response.data
   assert b"id=\"password\" name=\"password\"" in response.data
-  assert mock_dbgetbyquery.call_count == 12
+  assert mock_dbgetbyquery.call_count == 1
 
 
-@patch('pysondb.db.JsonDatabase.add')
-@patch('gegevens.Gegevens.verwijder')
-def test_loginpaginapost_save(mock_deleteenv, mock_dbadd, client):
+@patch('gegevens.Gegevens.wijzig')
+def test_loginpaginapost_save(mock_wijzig, client):
   data = {'actie': 'login', 'userid': 'dummy', 'password': '<PASSWORD>', 'savelogin': 'on'}
   response = client.post('/thuis/instellingen', data=data)
 
   assert response.status_code == 302
   assert b"<h1>Redirecting...</h1>" in response.data
   assert b"/thuis/instellingen" in response.data
-  assert mock_dbadd.call_count == 3
-  assert mock_deleteenv.call_count == 3
+  assert mock_wijzig.call_count == 3
 
 
-@patch('pysondb.db.JsonDatabase.add')
-def test_loginpaginapost_nosave(mock_dbadd, client):
+@patch('gegevens.Gegevens.wijzig')
+def test_loginpaginapost_nosave(mock_wijzig, client):
   data = {'actie': 'login', 'userid': 'dummy', 'password': '<PASSWORD>', 'savelogin': 'off'}
   response = client.post('/thuis/instellingen', data=data)
 
   assert response.status_code == 302
   assert b"<h1>Redirecting...</h1>" in response.data
   assert b"/thuis/instellingen" in response.data
-  assert mock_dbadd.call_count == 1
+  assert mock_wijzig.call_count == 1
 
 
-@patch('pysondb.db.JsonDatabase.getByQuery',
-       side_effect=[[{'env': 'pod', 'value': 'oldvalue', 'id': 92374834}],
-                    ])
-@patch('pysondb.db.JsonDatabase.deleteById',
-       return_value=None)
-@patch('pysondb.db.JsonDatabase.add')
-def test_instellingen_pod(mock_dbadd, mock_dbdelete, mock_dbget, client):
+@patch('gegevens.Gegevens.wijzig')
+def test_instellingen_pod(mock_wijzig, client):
   data = {'actie': 'updatepod', 'pod': 'dummy'}
   response = client.post('/thuis/instellingen', data=data)
 
   assert response.status_code == 302
   assert b"<h1>Redirecting...</h1>" in response.data
   assert b"/thuis" in response.data
-  assert mock_dbadd.call_count == 1
-  assert mock_dbdelete.call_count == 1
-  assert mock_dbget.call_count == 1
+  mock_wijzig.assert_called_once_with('pod', 'dummy')
 
 
-@patch('pysondb.db.JsonDatabase.getByQuery',
-       side_effect=[[{'env': 'hueip', 'value': 'oldvalue', 'id': 192639182}],
-                    ])
-@patch('pysondb.db.JsonDatabase.deleteById',
-       return_value=None)
-@patch('pysondb.db.JsonDatabase.add')
-def test_hueippaginapost(mock_dbadd, mock_dbdelete, mock_dbget, client):
+@patch('gegevens.Gegevens.wijzig')
+def test_hueippaginapost(mock_wijzig, client):
   data = {'actie': 'updatehueip', 'hueip': 'dummy'}
   response = client.post('/thuis/instellingen', data=data)
 
   assert response.status_code == 302
   assert b"<h1>Redirecting...</h1>" in response.data
   assert b"/thuis/instellingen" in response.data
-  assert mock_dbadd.call_count == 1
-  assert mock_dbdelete.call_count == 1
-  assert mock_dbget.call_count == 1
+  mock_wijzig.assert_called_once_with('hueip', 'dummy')
 
 
-@patch('pysondb.db.JsonDatabase.getByQuery',
-       side_effect=[[{'env': 'hueuser', 'value': 'oldvalue', 'id': 192639182}],
-                    ])
-@patch('pysondb.db.JsonDatabase.deleteById',
-       return_value=None)
-@patch('pysondb.db.JsonDatabase.add')
-def test_hueuserpaginapost(mock_dbadd, mock_dbdelete, mock_dbget, client):
+@patch('gegevens.Gegevens.wijzig')
+def test_hueuserpaginapost(mock_wijzig, client):
   data = {'actie': 'updatehueuser', 'hueuser': 'dummy'}
   response = client.post('/thuis/instellingen', data=data)
 
   assert response.status_code == 302
   assert b"<h1>Redirecting...</h1>" in response.data
   assert b"/thuis/instellingen" in response.data
-  assert mock_dbadd.call_count == 1
-  assert mock_dbdelete.call_count == 1
-  assert mock_dbget.call_count == 1
+  mock_wijzig.assert_called_once_with('hueuser', 'dummy')
 
 
-@patch('pysondb.db.JsonDatabase.getByQuery',
-       side_effect=[[{'env': 'gridbreedte', 'value': 2, 'id': 13478564}],
-                    [{'env': 'gridhoogte', 'value': 5, 'id': 923784393}],
-                    ])
-@patch('pysondb.db.JsonDatabase.deleteById',
-       return_value=None)
-@patch('pysondb.db.JsonDatabase.add')
-def test_gridpaginapost(mock_dbadd, mock_dbdelete, mock_dbget, client):
+@patch('gegevens.Gegevens.wijzig')
+def test_gridpaginapost(mock_wijzig, client):
   data = {'actie': 'updategrid', 'gridhoogte': 7, 'gridbreedte': 8}
   response = client.post('/thuis/instellingen', data=data)
 
   assert response.status_code == 302
   assert b"<h1>Redirecting...</h1>" in response.data
   assert b"/thuis/instellingen" in response.data
-  assert mock_dbadd.call_count == 2
-  assert mock_dbdelete.call_count == 2
-  assert mock_dbget.call_count == 2
-
-
-@patch('pysondb.db.JsonDatabase.getByQuery',
-       side_effect=[[{'env': 'pod', 'value': '1234-4321-5678', 'id': 28234834}],
-                    [{'env': 'jsessionid', 'value': 'E3~1234CAFE5678DECA', 'id': 286349129001}],
-                    [],
-                    [],
-                    [{'env': 'userid', 'value': 'email@adres.com', 'id': 23649273}],
-                    [{'env': 'password', 'value': 'password', 'id': 9852364}],
-                    [],
-                    [],
-                    [],
-                    [],
-                    [],
-                    [],
-                    ])
+  assert mock_wijzig.call_count == 2
+  mock_wijzig.assert_any_call('gridbreedte', 8)
+  mock_wijzig.assert_any_call('gridhoogte', 7)
+
+
+@patch('gegevens.Gegevens.snapshot',
+       return_value={'pod': '1234-4321-5678',
+                     'jsessionid': 'E3~1234CAFE5678DECA',
+                     'userid': 'email@adres.com',
+                     'password': 'password'})
 @patch('somfy.Somfy.getavailabletokens',
        return_value=[{'label': 'Python token',
                       'gatewayId': '1234-4321-5678',
@@ -263,83 +238,52 @@ def test_instellingenpaginaget(mock_getavailabletokens, mock_dbgetbyquery, clien
   assert b"<td>Thuis token</td>" in response.data
   assert b"<td>2025-02-01 1" in response.data
   assert b":10:50</td>" in response.data
-  assert mock_dbgetbyquery.call_count == 12
+  assert mock_dbgetbyquery.call_count == 1
   assert mock_getavailabletokens.call_count == 1
 
 
-@patch('pysondb.db.JsonDatabase.getByQuery',
-       side_effect=[[{'env': 'pod', 'value': '1234-4321-5678', 'id': 28234834}],
-                    [{'env': 'jsessionid', 'value': 'E3~1234CAFE5678DECA', 'id': 286349129001}],
-                    [],
-                    [],
-                    [],
-                    [],
-                    [],
-                    [],
-                    [],
-                    [],
-                    [],
-                    ])
-@patch('pysondb.db.JsonDatabase.deleteById',
-       return_value=None)
+@patch('gegevens.Gegevens.snapshot',
+       return_value={'pod': '1234-4321-5678',
+                     'jsessionid': 'E3~1234CAFE5678DECA'})
+@patch('gegevens.Gegevens.verwijder')
 @patch('somfy.Somfy.getavailabletokens', return_value={'error': 'unauthorized'})
-def test_instellingenpaginaget_geensessie(mock_getavailabletokens, mock_dbdelete, mock_dbquery, client):
+def test_instellingenpaginaget_geensessie(mock_getavailabletokens, mock_verwijder, mock_dblees, client):
   response = client.get('/thuis/instellingen')
 
   assert response.status_code == 302
   assert b"Redirecting..." in response.data
   assert b"/thuis" in response.data
-  assert mock_dbquery.call_count == 11
-  assert mock_dbdelete.call_count == 0
+  assert mock_dblees.call_count == 1
+  mock_verwijder.assert_called_once_with('jsessionid')
   assert mock_getavailabletokens.call_count == 1
 
 
-@patch('pysondb.db.JsonDatabase.getByQuery',
-       side_effect=[[{'env': 'pod', 'value': '1234-4321-5678', 'id': 28234834}],
-                    [{'env': 'jsessionid', 'value': 'E3~1234CAFE5678DECA', 'id': 286349129001}],
-                    [{'env': 'hueip', 'value': '1.2.3.4', 'id': 298346936}],
-                    [{'env': 'hueuser', 'value': '7da7a68792t3r', 'id': 23164382}],
-                    [{'env': 'userid', 'value': 'email@adres.com', 'id': 236910029}],
-                    [{'env': 'password', 'value': 'password', 'id': 236910029}],
-                    [],
-                    [],
-                    [],
-                    [],
-                    [{'env': 'jsessionid', 'value': 'E3~1234CAFE5678DECA', 'id': 286349129001}],
-                    ])
-@patch('pysondb.db.JsonDatabase.deleteById',
-       return_value=None)
-@patch('pysondb.db.JsonDatabase.add',
-       return_value=None)
+@patch('gegevens.Gegevens.snapshot',
+       return_value={'pod': '1234-4321-5678',
+                     'jsessionid': 'E3~1234CAFE5678DECA',
+                     'hueip': '1.2.3.4',
+                     'hueuser': '7da7a68792t3r',
+                     'userid': 'email@adres.com',
+                     'password': 'password'})
+@patch('gegevens.Gegevens.verwijder')
+@patch('gegevens.Gegevens.wijzig')
 @patch('somfy.Somfy.getavailabletokens',
        side_effect=[{'error': 'unauthorized'}])
-def test_instellingenpaginaget_invalidsessie_login(mock_getavailabletokens, mock_dbadd, mock_dbdelete, mock_dbquery,
+def test_instellingenpaginaget_invalidsessie_login(mock_getavailabletokens, mock_wijzig, mock_verwijder, mock_dblees,
                                                    client):
   response = client.get('/thuis/instellingen')
 
   assert response.status_code == 302
   assert b"<h1>Redirecting...</h1>" in response.data
   assert b"/thuis/instellingen" in response.data
-  assert mock_dbquery.call_count == 11
+  assert mock_dblees.call_count == 1
   assert mock_getavailabletokens.call_count == 1
-  assert mock_dbdelete.call_count == 1
-  assert mock_dbadd.call_count == 0
-
-
-@patch('pysondb.db.JsonDatabase.getByQuery',
-       side_effect=[[],
-                    [{'env': 'jsessionid', 'value': 'E3~1234CAFE5678DECA', 'id': 286349129001}],
-                    [],
-                    [],
-                    [],
-                    [],
-                    [],
-                    [],
-                    [],
-                    [],
-                    [],
-                    [],
-                    ])
+  mock_verwijder.assert_called_once_with('jsessionid')
+  assert mock_wijzig.call_count == 0
+
+
+@patch('gegevens.Gegevens.snapshot',
+       return_value={'jsessionid': 'E3~1234CAFE5678DECA'})
 @patch('somfy.Somfy.getavailabletokens', return_value=[{'data': 'dummytoken'}])
 def test_instellingenpaginaget_geenpod(mock_getavailabletokens, mock_dbquery, client):
   response = client.get('/thuis/instellingen')
@@ -348,25 +292,16 @@ def test_instellingenpaginaget_geenpod(mock_getavailabletokens, mock_dbquery, cl
   assert b"<h1>Instellingen</h1>" in response.data
   assert b"Voor de werking is het nummer van de POD nodig" in response.data
   assert b"dummytoken" not in response.data
-  assert mock_dbquery.call_count == 12
+  assert mock_dbquery.call_count == 1
   assert mock_getavailabletokens.call_count == 0
 
 
-@patch('pysondb.db.JsonDatabase.getByQuery',
-       side_effect=[[{'env': 'pod', 'value': '1234-4321-5678', 'id': 28234834}],
-                    [],
-                    [{'env': 'hueip', 'value': '1.2.3.4', 'id': 298346936}],
-                    [{'env': 'hueuser', 'value': '7da7a68792t3r', 'id': 23164382}],
-                    [{'env': 'userid', 'value': 'email@adres.com', 'id': 236910029}],
-                    [{'env': 'password', 'value': 'password', 'id': 236910029}],
-                    [],
-                    [],
-                    [],
-                    [],
-                    [],
-                    [],
-                    [],
-                    ])
+@patch('gegevens.Gegevens.snapshot',
+       return_value={'pod': '1234-4321-5678',
+                     'hueip': '1.2.3.4',
+                     'hueuser': '7da7a68792t3r',
+                     'userid': 'email@adres.com',
+                     'password': 'password'})
 @patch('somfy.Somfy.getavailabletokens',
        return_value=[{'label': 'Python token',
                       'gatewayId': '1234-4321-5678',
@@ -379,9 +314,9 @@ def test_instellingenpaginaget_geenpod(mock_getavailabletokens, mock_dbquery, cl
                       'uuid': 'b3d4be51-1c5f-4f3c-acce-9f8a8f345328',
                       'scope': 'devmode'}])
 @patch('somfy.Somfy.login', return_value='E3~5678CAFE1234DECA')
-@patch('pysondb.db.JsonDatabase.add')
-def test_instellingenpaginaget_geenjsessionid_autologin(mock_adddb, mock_somfylogin, mock_getavailabletokens,
-                                                        mock_dbquery, client):
+@patch('gegevens.Gegevens.wijzig')
+def test_instellingenpaginaget_geenjsessionid_autologin(mock_wijzig, mock_somfylogin, mock_getavailabletokens,
+                                                        mock_dblees, client):
   response = client.get('/thuis/instellingen')
 
   assert response.status_code == 200
@@ -390,22 +325,22 @@ def test_instellingenpaginaget_geenjsessionid_autologin(mock_adddb, mock_somfylo
   assert b"<td>2025-02-01 1" in response.data
   assert b":10:50</td>" in response.data
   assert mock_somfylogin.call_count == 1
-  assert mock_dbquery.call_count == 13
+  assert mock_dblees.call_count == 1
   assert mock_getavailabletokens.call_count == 1
-  assert mock_adddb.call_count == 1
-
-
-@patch('pysondb.db.JsonDatabase.getByQuery',
-       side_effect=[[{'env': 'pod', 'value': '1234-4321-5678', 'id': 28234834}],
-                    [{'env': 'jsessionid', 'value': 'E3~1234CAFE5678DECA', 'id': 286349129001}],
-                    [],
-                    [],
-                    [],
-                    [],
-                    [],
-                    [],
-                    [],
-                    [],
+  mock_wijzig.assert_called_once_with('jsessionid', 'E3~5678CAFE1234DECA')
+
+
+@patch('gegevens.Gegevens.lees',
+       side_effect=['1234-4321-5678',
+                    'E3~1234CAFE5678DECA',
+                    None,
+                    None,
+                    None,
+                    None,
+                    None,
+                    None,
+                    None,
+                    None,
                     ])
 @patch('somfy.Somfy.getavailabletokens',
        return_value=[{'label': 'Python token',
@@ -429,16 +364,16 @@ def test_instellingenpaginapost_delete(mock_deletetoken, mock_gettokens, mock_ge
   assert mock_deletetoken.call_count == 1
 
 
-@patch('pysondb.db.JsonDatabase.getByQuery',
-       side_effect=[[{'env': 'pod', 'value': '1234-4321-5678', 'id': 28234834}],
-                    [{'env': 'jsessionid', 'value': 'E3~1234CAFE5678DECA', 'id': 286349129001}],
-                    [],
-                    [],
-                    [],
-                    [],
-                    [],
-                    [],
-                    [],
+@patch('gegevens.Gegevens.lees',
+       side_effect=['1234-4321-5678',
+                    'E3~1234CAFE5678DECA',
+                    None,
+                    None,
+                    None,
+                    None,
+                    None,
+                    None,
+                    None,
                     ])
 @patch('somfy.Somfy.getavailabletokens',
        return_value=[{'label': 'Python token',
@@ -465,15 +400,8 @@ def test_instellingenpaginapost_createtoken(mock_gegevens, mock_createtoken, moc
   assert mock_gegevens.call_count == 1
 
 
-@patch('pysondb.db.JsonDatabase.getByQuery',
-       side_effect=[[{'env': 'zonsterktelampen', 'value': 375, 'id': 92374019283}],
-                    [{'env': 'zonsterktelampenuit', 'value': 375, 'id': 92374019283}],
-                    [{'env': 'starttijd', 'value': 10, 'id': 3937243}],
-                    [{'env': 'eindtijd', 'value': 21, 'id': 8237849237}],
-                    ])
-@patch('pysondb.db.JsonDatabase.deleteById', return_value=None)
-@patch('pysondb.db.JsonDatabase.add')
-def test_instellingenpaginapost_zonsterkte(mock_dbadd, mock_dbdel, mock_dbget, client):
+@patch('gegevens.Gegevens.wijzig')
+def test_instellingenpaginapost_zonsterkte(mock_wijzig, client):
   data = {'actie': 'updateautolampen',
           'zonsterkteaan': '350',
           'zonsterkteuit': '650',
@@ -483,33 +411,29 @@ def test_instellingenpaginapost_zonsterkte(mock_dbadd, mock_dbdel, mock_dbget, c
   response = client.post('/thuis/instellingen', data=data)
   assert b"<h1>Redirecting...</h1>" in response.data
   assert b"/thuis/instellingen" in response.data
-  assert mock_dbadd.call_count == 4
-  assert mock_dbdel.call_count == 4
-  assert mock_dbget.call_count == 4
-
-
-@patch('pysondb.db.JsonDatabase.getByQuery',
-       side_effect=[[{'env': 'hueip', 'value': '1.2.3.4', 'id': 298346936}],
-                    [{'env': 'hueuser', 'value': '7da7a68792t3r', 'id': 23164382}],
-                    [],
-                    [{'env': 'gridbreedte', 'value': 2, 'id': 13478564}],
-                    [{'env': 'gridhoogte', 'value': 5, 'id': 923784393}],
-                    [{"env": "lampen",
-                      "value": [{"id": "dummyaan_id", "naam": "dummyaan", "volgorde": 11},
-                                {"id": "dummyuit_id", "naam": "dummyuit", "volgorde": 12},
-                                {"id": "dummydimbaar_id", "naam": "dummydimbaar", "volgorde": 21}],
-                      "id": 293874398
-                      }
-                     ],
-                    [{'env': 'gridbreedte', 'value': 2, 'id': 13478564}],
-                    [{'env': 'gridhoogte', 'value': 5, 'id': 923784393}],
-                    [],
-                    ]
-       )
-@patch('requests.get')
-@patch('pysondb.db.JsonDatabase.add')
+  assert mock_wijzig.call_count == 4
+  mock_wijzig.assert_any_call('zonsterktelampen', 350)
+  mock_wijzig.assert_any_call('eindtijd', 23)
+
+
+@patch('gegevens.Gegevens.snapshot',
+       return_value={'hueip': '1.2.3.4',
+                     'hueuser': '7da7a68792t3r',
+                     'gridbreedte': 2,
+                     'gridhoogte': 5,
+                     'groepen': {'huis': 'huis_id',
+                                 'ruimtes': [{'id': 'woonkamer_id', 'naam': 'Woonkamer', 'soort': 'room'}]}})
+@patch('gegevens.Gegevens.lees',
+       side_effect=[2,
+                    5,
+                    [{'id': 'dummyaan_id', 'naam': 'dummyaan', 'volgorde': 11},
+                     {'id': 'dummyuit_id', 'naam': 'dummyuit', 'volgorde': 12},
+                     {'id': 'dummydimbaar_id', 'naam': 'dummydimbaar', 'volgorde': 21}],
+                    ])
+@patch('requests.Session.get')
+@patch('gegevens.Gegevens.schrijf')
 @patch('thuis.haalzonnesterkte', side_effect=[{'value': 123}])
-def test_lampenpagina(mock_zonnesterkte, mock_envadd, mock_requestsget, mock_env, client):
+def test_lampenpagina(mock_zonnesterkte, mock_envadd, mock_requestsget, mock_env, mock_snapshot, client):
   mock_requestsget.return_value = maakmockresponse({'errors': [],
                                                     'data': [{'id': 'dummyaan_id',
                                                               'metadata': {'name': 'dummyaan'},
@@ -536,34 +460,31 @@ def test_lampenpagina(mock_zonnesterkte, mock_envadd, mock_requestsget, mock_env
   assert b">Uit<" in response.data
   assert b">dummydimbaar<" in response.data
   assert b"value=\"23.34\">" in response.data
+  assert b"<p>Woonkamer</p>" in response.data
+  assert b"value=\"woonkamer_id\"" in response.data
   assert mock_requestsget.call_count == 1
-  assert mock_env.call_count == 8
+  assert mock_env.call_count == 3
+  assert mock_snapshot.call_count == 1
   assert mock_envadd.call_count == 1
   assert mock_zonnesterkte.call_count == 1
 
 
-@patch('pysondb.db.JsonDatabase.getByQuery',
-       side_effect=[[{'env': 'hueip', 'value': '1.2.3.4', 'id': 298346936}],
-                    [{'env': 'hueuser', 'value': '7da7a68792t3r', 'id': 23164382}],
-                    [],
-                    [],
-                    [],
-                    [{"env": "lampen",
-                      "value": [{"id": "dummyaan_id", "naam": "dummyaan", "volgorde": 11},
-                                {"id": "dummyuit_id", "naam": "dummyuit", "volgorde": 12},
-                                {"id": "dummydimbaar_id", "naam": "dummydimbaar", "volgorde": 21}],
-                      "id": 293874398
-                      }
-                     ],
-                    [{'env': 'gridbreedte', 'value': 3, 'id': 13478564}],
-                    [{'env': 'gridhoogte', 'value': 4, 'id': 923784393}],
-                    [],
-                    ]
-       )
-@patch('requests.get')
-@patch('pysondb.db.JsonDatabase.add')
+@patch('gegevens.Gegevens.snapshot',
+       return_value={'hueip': '1.2.3.4',
+                     'hueuser': '7da7a68792t3r',
+                     'groepen': {}})
+@patch('gegevens.Gegevens.lees',
+       side_effect=[None,
+                    None,
+                    [{'id': 'dummyaan_id', 'naam': 'dummyaan', 'volgorde': 11},
+                     {'id': 'dummyuit_id', 'naam': 'dummyuit', 'volgorde': 12},
+                     {'id': 'dummydimbaar_id', 'naam': 'dummydimbaar', 'volgorde': 21}],
+                    ])
+@patch('requests.Session.get')
+@patch('gegevens.Gegevens.schrijf')
 @patch('thuis.haalzonnesterkte', side_effect=[{'value': 123}])
-def test_lampenpagina_defaultgrid(mock_zonnesterkte, mock_envadd, mock_requestsget, mock_env, client):
+def test_lampenpagina_defaultgrid(mock_zonnesterkte, mock_envadd, mock_requestsget, mock_env, mock_snapshot,
+                                  client):
   mock_requestsget.return_value = maakmockresponse({'errors': [],
                                                     'data': [{'id': 'dummyaan_id',
                                                               'metadata': {'name': 'dummyaan'},
@@ -591,17 +512,45 @@ def test_lampenpagina_defaultgrid(mock_zonnesterkte, mock_envadd, mock_requestsg
   assert b">dummydimbaar<" in response.data
   assert b"value=\"23.34\">" in response.data
   assert mock_requestsget.call_count == 1
-  assert mock_env.call_count == 8
+  assert mock_env.call_count == 3
+  assert mock_snapshot.call_count == 1
   assert mock_envadd.call_count == 3
   assert mock_zonnesterkte.call_count == 1
 
 
-@patch('pysondb.db.JsonDatabase.getByQuery',
-       side_effect=[[],
-                    [{'env': 'hueuser', 'value': '7da7a68792t3r', 'id': 23164382}],
-                    ]
-       )
-@patch('requests.get')
+@patch('gegevens.Gegevens.snapshot',
+       return_value={'hueip': '1.2.3.4',
+                     'hueuser': '7da7a68792t3r',
+                     'groepen': {},
+                     'lampen': [{'id': 'dummydimbaar_id', 'naam': 'dummydimbaar', 'volgorde': 11}]})
+@patch('requests.Session.get')
+@patch('hue.Hue.plaatsactie')
+@patch('thuis.haalzonnesterkte', return_value=123)
+def test_lampenpagina_naopdracht(mock_zonnesterkte, mock_plaatsactie, mock_requestsget, mock_snapshot, client):
+  verstuurd = Future()
+  verstuurd.set_result({'errors': []})
+  mock_plaatsactie.return_value = verstuurd
+  mock_requestsget.return_value = maakmockresponse({'errors': [],
+                                                    'data': [{'id': 'dummydimbaar_id',
+                                                              'metadata': {'name': 'dummydimbaar'},
+                                                              'on': {'on': False},
+                                                              'dimming': {'brightness': 23.34}
+                                                              }]}
+                                                   )
+  client.get('/thuis/lampen')
+  response = client.post('/thuis/lampen', data={'actie': 'lampdim', 'lampid': 'dummydimbaar_id', 'dimwaarde': '60'})
+  assert response.status_code == 302
+  response = client.get('/thuis/lampen')
+
+  assert b"value=\"60.0\">" in response.data
+  assert b">Aan<" in response.data
+  assert mock_plaatsactie.call_count == 1
+  assert mock_requestsget.call_count == 1
+
+
+@patch('gegevens.Gegevens.snapshot',
+       return_value={'hueuser': '7da7a68792t3r'})
+@patch('requests.Session.get')
 def test_lampenpagina_missendegegevens(mock_requestsget, mock_env, client):
   mock_requestsget.return_value = maakmockresponse({'errors': [],
                                                     'data': [{'metadata': {'name': 'dummy'},
@@ -614,16 +563,13 @@ def test_lampenpagina_missendegegevens(mock_requestsget, mock_env, client):
   assert b"<h1>Redirecting...</h1>" in response.data
   assert b"/thuis" in response.data
   assert mock_requestsget.call_count == 0
-  assert mock_env.call_count == 2
+  assert mock_env.call_count == 1
 
 
-@patch('pysondb.db.JsonDatabase.getByQuery',
-       side_effect=[[{'env': 'hueip', 'value': '1.2.3.4', 'id': 298346936}],
-                    [{'env': 'hueuser', 'value': '7da7a68792t3r', 'id': 23164382}],
-                    [],
-                    ]
-       )
-@patch('requests.get')
+@patch('gegevens.Gegevens.snapshot',
+       return_value={'hueip': '1.2.3.4',
+                     'hueuser': '7da7a68792t3r'})
+@patch('requests.Session.get')
 def test_lampenpagina_error(mock_requestsget, mock_env, client):
   mock_requestsget.return_value = maakmockresponse({'errors': [{'error': 'error'}],
                                                     'data': [{'metadata': {'name': 'dummy'},
@@ -636,20 +582,16 @@ def test_lampenpagina_error(mock_requestsget, mock_env, client):
   assert b"<h1>Redirecting...</h1>" in response.data
   assert b"/thuis" in response.data
   assert mock_requestsget.call_count == 1
-  assert mock_env.call_count == 3
+  assert mock_env.call_count == 1
 
 
-@patch('pysondb.db.JsonDatabase.getByQuery',
-       side_effect=[[{'env': 'pod', 'value': '1234-4321-5678', 'id': 28234834}],
-                    [{'env': 'jsessionid', 'value': 'E3~1234CAFE5678DECA', 'id': 286349129001}],
-                    [{'env': 'schermen', 'value': [{'label': 'label 1.1', 'device': 'io://1234-4321-5678/13579'},
-                                                   {'label': 'label 2.2', 'device': 'io://1234-4321-5678/24680'}]}]
-                    ]
-       )
-@patch('somfy.Somfy.haalgegevens',
-       side_effect=[{'value': '0'},
-                    {'value': '50'}
-                    ])
+@patch('gegevens.Gegevens.snapshot',
+       return_value={'pod': '1234-4321-5678',
+                     'token': 'E3~1234CAFE5678DECA',
+                     'schermen': [{'label': 'label 1.1', 'device': 'io://1234-4321-5678/13579'}, {'label': 'label 2.2', 'device': 'io://1234-4321-5678/24680'}]})
+@patch('somfy.SomfyPod.haalgegevens',
+       return_value=maaksetup({'io://1234-4321-5678/13579': 0, 'io://1234-4321-5678/24680': 50},
+                              {'io://1234-4321-5678/13579': 'label 1.1', 'io://1234-4321-5678/24680': 'label 2.2'}))
 @patch('thuis.haalwindsnelheid', return_value=2)
 def test_schermenpagina(mock_wind, mock_somfy, mock_env, mock_env_weerapikey, client):
   response = client.get('/thuis/schermen')
@@ -657,17 +599,16 @@ def test_schermenpagina(mock_wind, mock_somfy, mock_env, mock_env_weerapikey, cl
   assert b"<h1>Schermen</h1>" in response.data
   assert b">label 1.1<" in response.data
   assert b">0<" in response.data
+  assert b">50<" in response.data
   assert b">Windsnelheid 2 bft<" in response.data
-  assert mock_env.call_count == 3
-  assert mock_somfy.call_count == 2
+  assert mock_env.call_count == 1
+  mock_somfy.assert_called_once_with('setup/devices')
   assert mock_wind.call_count == 1
 
 
-@patch('pysondb.db.JsonDatabase.getByQuery',
-       side_effect=[[],
-                    [{'env': 'jsessionid', 'value': 'E3~1234CAFE5678DECA', 'id': 286349129001}]
-                    ])
-@patch('somfy.Somfy.haalgegevens',
+@patch('gegevens.Gegevens.snapshot',
+       return_value={'token': 'E3~1234CAFE5678DECA'})
+@patch('somfy.SomfyPod.haalgegevens',
        return_value={'error': 'dummy'})
 @patch('thuis.haalwindsnelheid', return_value=2)
 def test_schermenpagina_geenpod(mock_wind, mock_somfy, mock_env, mock_env_weerapikey, client):
@@ -676,47 +617,36 @@ def test_schermenpagina_geenpod(mock_wind, mock_somfy, mock_env, mock_env_weerap
   assert response.status_code == 302
   assert b"<h1>Redirecting...</h1>" in response.data
   assert b"/thuis" in response.data
-  assert mock_env.call_count == 2
+  assert mock_env.call_count == 1
   assert mock_somfy.call_count == 0
   assert mock_wind.call_count == 0
 
 
-@patch('pysondb.db.JsonDatabase.getByQuery',
-       side_effect=[[{'env': 'pod', 'value': '1234-4321-5678', 'id': 28234834}],
-                    [{'env': 'jsessionid', 'value': 'E3~1234CAFE5678DECA', 'id': 286349129001}],
-                    []
-                    ]
-       )
-@patch('thuis.haalschermen',
-       return_value=[{'label': 'label 1.2', 'device': 'io://1234-4321-5678/13579'},
-                     {'label': 'label 2.2', 'device': 'io://1234-4321-5678/24680'}]
-       )
-@patch('somfy.Somfy.haalgegevens',
-       side_effect=[{'value': '0'},
-                    {'value': '50'}
-                    ]
-       )
+@patch('gegevens.Gegevens.snapshot',
+       return_value={'pod': '1234-4321-5678',
+                     'token': 'E3~1234CAFE5678DECA'})
+@patch('somfy.SomfyPod.haalgegevens',
+       return_value=maaksetup({'io://1234-4321-5678/13579': 0, 'io://1234-4321-5678/24680': 50},
+                              {'io://1234-4321-5678/13579': 'label 1.2', 'io://1234-4321-5678/24680': 'label 2.2'}))
 @patch('thuis.haalwindsnelheid', return_value=2)
-def test_schermenpagina_geenschermcache(mock_wind, mock_somfy, mock_schermen, mock_envquery, mock_env_weerapikey,
-                                        client):
+def test_schermenpagina_geenschermcache(mock_wind, mock_somfy, mock_envquery, mock_env_weerapikey, envdb, client):
   response = client.get('/thuis/schermen')
 
   assert b"<h1>Schermen</h1>" in response.data
   assert b">label 1.2<" in response.data
   assert b">0<" in response.data
-  assert mock_envquery.call_count == 3
-  assert mock_schermen.call_count == 1
-  assert mock_somfy.call_count == 2
+  assert envdb.lees('schermen') == [{'label': 'label 1.2', 'device': 'io://1234-4321-5678/13579'},
+                                    {'label': 'label 2.2', 'device': 'io://1234-4321-5678/24680'}]
+  assert mock_envquery.call_count == 1
+  mock_somfy.assert_called_once_with('setup/devices')
   assert mock_wind.call_count == 1
 
 
-@patch('pysondb.db.JsonDatabase.getByQuery',
-       side_effect=[[{'env': 'pod', 'value': '1234-4321-5678', 'id': 28234834}],
-                    [{'env': 'jsessionid', 'value': 'E3~1234CAFE5678DECA', 'id': 286349129001}],
-                    [{'env': 'schermen', 'value': [{'label': 'label 1.3', 'device': 'io://1234-4321-5678/13579'},
-                                                   {'label': 'label 2.3', 'device': 'io://1234-4321-5678/24680'}]}]
-                    ])
-@patch('somfy.Somfy.haalgegevens',
+@patch('gegevens.Gegevens.snapshot',
+       return_value={'pod': '1234-4321-5678',
+                     'token': 'E3~1234CAFE5678DECA',
+                     'schermen': [{'label': 'label 1.3', 'device': 'io://1234-4321-5678/13579'}, {'label': 'label 2.3', 'device': 'io://1234-4321-5678/24680'}]})
+@patch('somfy.SomfyPod.haalgegevens',
        return_value={'error': 'dummy'})
 @patch('thuis.haalwindsnelheid', return_value=2)
 def test_schermenpagina_error(mock_wind, mock_somfy, mock_env, mock_env_weerapikey, client):
@@ -725,9 +655,131 @@ def test_schermenpagina_error(mock_wind, mock_somfy, mock_env, mock_env_weerapik
   assert response.status_code == 302
   assert b"<h1>Redirecting...</h1>" in response.data
   assert b"/thuis" in response.data
-  assert mock_env.call_count == 3
+  assert mock_env.call_count == 1
   assert mock_somfy.call_count == 1
-  assert mock_wind.call_count == 0
+  assert mock_wind.call_count == 1
+
+
+@patch('gegevens.Gegevens.snapshot',
+       return_value={'pod': '1234-4321-5678',
+                     'token': 'E3~1234CAFE5678DECA',
+                     'schermen': [{'label': 'label 1.4', 'device': 'io://1234-4321-5678/13579'},
+                                  {'label': 'label 2.4', 'device': 'io://1234-4321-5678/24680'}]})
+@patch('gegevens.Gegevens.lees', side_effect=['E3~1234CAFE5678DECA', '1234-4321-5678'])
+@patch('somfy.SomfyPod.stuurgegevens', return_value={'execId': 'dummy'})
+@patch('somfy.SomfyPod.haalgegevens',
+       return_value=maaksetup({'io://1234-4321-5678/13579': 0, 'io://1234-4321-5678/24680': 50}))
+@patch('thuis.haalwindsnelheid', return_value=2)
+def test_schermenpagina_naopdracht(mock_wind, mock_haal, mock_stuur, mock_lees, mock_snapshot, client):
+  client.get('/thuis/schermen')
+  response = client.post('/thuis/schermen',
+                         data={'actie': 'zetscherm', 'device': 'io://1234-4321-5678/24680', 'percentage': '80'})
+  assert response.status_code == 302
+  response = client.get('/thuis/schermen')
+
+  assert b">80<" in response.data
+  assert b">0<" in response.data
+  assert b">50<" not in response.data
+  assert mock_stuur.call_count == 1
+  assert mock_haal.call_count == 1
+
+
+@patch('gegevens.Gegevens.snapshot',
+       return_value={'pod': '1234-4321-5678',
+                     'token': 'E3~1234CAFE5678DECA',
+                     'schermen': [{'label': 'label 1.5', 'device': 'io://1234-4321-5678/13579'},
+                                  {'label': 'label 2.5', 'device': 'io://1234-4321-5678/24680'}]})
+@patch('thuis.schermenwachttijd', 0.2)
+def test_schermenpagina_telaat(mock_env, mock_env_weerapikey, client):
+  vrij = threading.Event()
+
+  def haalgegevens(path):
+    vrij.wait(5)
+    return maaksetup({'io://1234-4321-5678/13579': 30, 'io://1234-4321-5678/24680': 30})
+
+  def haalwindsnelheid():
+    vrij.wait(5)
+    return 2
+
+  with patch('somfy.SomfyPod.haalgegevens', side_effect=haalgegevens), \
+      patch('thuis.haalwindsnelheid', side_effect=haalwindsnelheid):
+    begin = time.monotonic()
+    response = client.get('/thuis/schermen')
+    duur = time.monotonic() - begin
+    vrij.set()
+
+  assert response.status_code == 200
+  assert duur < 2
+  assert b">label 1.5<" in response.data
+  assert response.data.count(b">onbekend<") == 2
+  assert b">Windsnelheid onbekend<" in response.data
+  assert thuis.schermverwachting.bekend('io://1234-4321-5678/24680') is None
+
+
+@patch('gegevens.Gegevens.snapshot',
+       return_value={'pod': '1234-4321-5678',
+                     'token': 'E3~1234CAFE5678DECA',
+                     'schermen': [{'label': 'label 1.6', 'device': 'io://1234-4321-5678/13579'},
+                                  {'label': 'label 2.6', 'device': 'io://1234-4321-5678/24680'}]})
+@patch('somfy.SomfyPod.haalgegevens', return_value=maaksetup({'io://1234-4321-5678/13579': 40}))
+@patch('thuis.haalwindsnelheid', return_value=3)
+def test_schermenpagina_ontbreekt(mock_wind, mock_somfy, mock_env, mock_env_weerapikey, envdb, client):
+  response = client.get('/thuis/schermen')
+
+  assert response.status_code == 200
+  assert b">40<" in response.data
+  assert b">label 2.6<" not in response.data
+  assert b">Windsnelheid 3 bft<" in response.data
+  assert envdb.lees('schermen') == [{'label': 'io://1234-4321-5678/13579', 'device': 'io://1234-4321-5678/13579'}]
+
+
+@patch('somfy.SomfyPod.haalgegevens')
+@patch('thuis.haalwindsnelheid', return_value=3)
+def test_schermenpagina_nieuwesetup(mock_wind, mock_somfy, mock_env_weerapikey, envdb, client):
+  envdb.schrijf('pod', '1234-4321-5678')
+  envdb.schrijf('token', 'E3~1234CAFE5678DECA')
+  mock_somfy.return_value = maaksetup({'io://1234-4321-5678/13579': 10}, {'io://1234-4321-5678/13579': 'label 1.8'})
+  client.get('/thuis/schermen')
+  mock_somfy.return_value = maaksetup({'io://1234-4321-5678/13579': 10, 'io://1234-4321-5678/24680': 20},
+                                      {'io://1234-4321-5678/13579': 'voor', 'io://1234-4321-5678/24680': 'achter'})
+  response = client.get('/thuis/schermen')
+
+  assert b">label 1.8<" not in response.data
+  assert b">voor<" in response.data
+  assert b">20<" in response.data
+  assert envdb.lees('schermen') == [{'label': 'voor', 'device': 'io://1234-4321-5678/13579'},
+                                    {'label': 'achter', 'device': 'io://1234-4321-5678/24680'}]
+  assert mock_somfy.call_count == 2
+
+
+@patch('somfy.SomfyPod.haalgegevens',
+       return_value=maaksetup({'io://1234-4321-5678/13579': 10}, {'io://1234-4321-5678/13579': 'label 1.9'}))
+@patch('thuis.haalwindsnelheid', return_value=3)
+def test_schermenpagina_naververs(mock_wind, mock_somfy, mock_env_weerapikey, envdb, client):
+  envdb.schrijf('pod', '1234-4321-5678')
+  envdb.schrijf('token', 'E3~1234CAFE5678DECA')
+  client.get('/thuis/schermen')
+  client.post('/thuis/schermen', data={'actie': 'ververs'})
+  response = client.get('/thuis/schermen')
+
+  assert b">label 1.9<" in response.data
+  assert envdb.lees('schermen') == [{'label': 'label 1.9', 'device': 'io://1234-4321-5678/13579'}]
+  assert mock_somfy.call_count == 2
+
+
+@patch('gegevens.Gegevens.snapshot',
+       return_value={'pod': '1234-4321-5678',
+                     'token': 'E3~1234CAFE5678DECA',
+                     'schermen': [{'label': 'label 1.7', 'device': 'io://1234-4321-5678/13579'}]})
+@patch('somfy.SomfyPod.haalgegevens', side_effect=thuis.requests.ConnectionError('geen verbinding'))
+@patch('thuis.haalwindsnelheid', return_value=3)
+def test_schermenpagina_mislukt(mock_wind, mock_somfy, mock_env, mock_env_weerapikey, client):
+  response = client.get('/thuis/schermen')
+
+  assert response.status_code == 200
+  assert b">label 1.7<" in response.data
+  assert b">onbekend<" in response.data
+  assert b">Windsnelheid 3 bft<" in response.data
 
 
 @patch('thuis.verplaatsscherm')
@@ -845,7 +897,10 @@ def test_lampenpaginapost_dim(mock_doeactieoplamp, client):
   assert response.status_code == 302
   assert b"<h1>Redirecting...</h1>" in response.data
   assert b"/thuis/lampen" in response.data
-  assert mock_doeactieoplamp.call_count == 2
+  assert mock_doeactieoplamp.call_count == 1
+  lampid, actie = mock_doeactieoplamp.call_args.args
+  assert lampid == 'dummyid'
+  assert actie.data == {'on': {'on': True}, 'dimming': {'brightness': 12.34}}
 
 
 @patch('thuis.doeactieoplamp')
@@ -856,7 +911,32 @@ def test_lampenpaginapost_kleur(mock_doeactieoplamp, client):
   assert response.status_code == 302
   assert b"<h1>Redirecting...</h1>" in response.data
   assert b"/thuis/lampen" in response.data
-  assert mock_doeactieoplamp.call_count == 3
+  assert mock_doeactieoplamp.call_count == 1
+  assert set(mock_doeactieoplamp.call_args.args[1].data) == {'on', 'dimming', 'color'}
+
+
+@pytest.mark.parametrize('actie, status', [('groepaan', True), ('groepuit', False)])
+@patch('thuis.doeactieopgroep')
+def test_lampenpaginapost_groepaanuit(mock_doeactieopgroep, actie, status, client):
+  data = {'actie': actie, 'groepid': 'woonkamer_id'}
+  response = client.post('/thuis/lampen', data=data)
+
+  assert response.status_code == 302
+  assert b"/thuis/lampen" in response.data
+  groepid, groepactie = mock_doeactieopgroep.call_args.args
+  assert groepid == 'woonkamer_id'
+  assert groepactie.data == {'on': {'on': status}}
+
+
+@patch('thuis.doeactieopgroep')
+def test_lampenpaginapost_groepdim(mock_doeactieopgroep, client):
+  data = {'actie': 'groepdim', 'groepid': 'woonkamer_id', 'dimwaarde': '40'}
+  response = client.post('/thuis/lampen', data=data)
+
+  assert response.status_code == 302
+  assert b"/thuis/lampen" in response.data
+  assert mock_doeactieopgroep.call_count == 1
+  assert mock_doeactieopgroep.call_args.args[1].data == {'on': {'on': True}, 'dimming': {'brightness': 40.0}}
 
 
 @patch('thuis.allelampenuit')
@@ -881,14 +961,10 @@ def test_lampenpaginapost_ververs(mock_ververs, client):
   assert mock_ververs.call_count == 1
 
 
-@patch('pysondb.db.JsonDatabase.getByQuery',
-       side_effect=[
-         [{'env': 'lampen', 'value': [{"id": "dummyid1", "naam": "Lampnaam1", "volgorde": 11, "automatisch": True},
-                                      {"id": "dummyid2", "naam": "Lampnaam2", "volgorde": 22, "automatisch": False}],
-           'id': 92734098234}],
-         [{'env': 'gridbreedte', 'value': 2, 'id': 13478564}],
-         [{'env': 'gridhoogte', 'value': 5, 'id': 923784393}],
-       ])
+@patch('gegevens.Gegevens.snapshot',
+       return_value={'lampen': [{'id': 'dummyid1', 'naam': 'Lampnaam1', 'volgorde': 11, 'automatisch': True}, {'id': 'dummyid2', 'naam': 'Lampnaam2', 'volgorde': 22, 'automatisch': False}],
+                     'gridbreedte': 2,
+                     'gridhoogte': 5})
 def test_lampengrid(mock_env, client):
   response = client.get('/thuis/lampengrid')
   assert b"<h1>Lampengrid</h1>" in response.data
@@ -900,25 +976,41 @@ def test_lampengrid(mock_env, client):
   assert b"id=\"dummyid2-plek\"" in response.data
   assert b"value=\"22\"" in response.data
   assert b"id=\"dummyid2-auto\"" in response.data
-  assert mock_env.call_count == 3
+  assert mock_env.call_count == 1
 
 
-@patch('pysondb.db.JsonDatabase.getByQuery',
-       side_effect=[
-         [{'env': 'lampen', 'value': [{"id": "dummyid1", "naam": "Lampnaam1", "volgorde": 11},
-                                      {"id": "dummyid2", "naam": "Lampnaam2", "volgorde": 22}], 'id': 92734098234}],
-         [{'env': 'gridbreedte', 'value': 2, 'id': 13478564}],
-         [{'env': 'gridhoogte', 'value': 5, 'id': 923784393}],
-       ])
-@patch('pysondb.db.JsonDatabase.deleteById', return_value=None)
-@patch('pysondb.db.JsonDatabase.add')
-def test_lampengrid_post(mock_add, mock_del, mock_env, client):
+@patch('gegevens.Gegevens.lees',
+       side_effect=[[{'id': 'dummyid1', 'naam': 'Lampnaam1', 'volgorde': 11},
+                     {'id': 'dummyid2', 'naam': 'Lampnaam2', 'volgorde': 22}],
+                    ])
+@patch('gegevens.Gegevens.wijzig')
+def test_lampengrid_post(mock_wijzig, mock_env, client):
   data = {'dummyid1-plek': '11', 'dummyid2-plek': '33', 'dummyid1-auto': 'on'}
   response = client.post('/thuis/lampengrid', data=data)
 
   assert response.status_code == 302
   assert b"<h1>Redirecting...</h1>" in response.data
   assert b"/thuis" in response.data
-  assert mock_env.call_count == 2
-  assert mock_del.call_count == 1
-  assert mock_add.call_count == 1
+  assert mock_env.call_count == 1
+  mock_wijzig.assert_called_once_with('lampen',
+                                      [{'id': 'dummyid1', 'naam': 'Lampnaam1', 'volgorde': 11, 'automatisch': True},
+                                       {'id': 'dummyid2', 'naam': 'Lampnaam2', 'volgorde': 33, 'automatisch': False}])
+
+
+@freeze_time("2025-05-17 12:00:00")
+def test_zonnesterktehistorie(tmp_path, client):
+  tijdreeks = Tijdreeks(str(tmp_path / 'zonnesterkte.historie'))
+  tijdreeks.voegtoe(1747483200 - 3 * 86400, 999)
+  for stap in range(6):
+    tijdreeks.voegtoe(1747483200 - 7200 + stap * 120, 100 * stap)
+  with patch('thuis.getzonhistorie', return_value=tijdreeks):
+    dag = client.get('/thuis/zonnesterkte/historie?periode=dag')
+    maand = client.get('/thuis/zonnesterkte/historie?periode=maand')
+    onbekend = client.get('/thuis/zonnesterkte/historie?periode=jaar')
+
+  assert dag.json == {'periode': 'dag',
+                      'interval': 600,
+                      'punten': [{'tijd': 1747476000, 'gemiddeld': 200, 'min': 0, 'max': 400},
+                                 {'tijd': 1747476600, 'gemiddeld': 500, 'min': 500, 'max': 500}]}
+  assert [punt['gemiddeld'] for punt in maand.json['punten']] == [999, 250]
+  assert onbekend.status_code == 400
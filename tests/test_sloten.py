@@ -0,0 +1,114 @@
+import fcntl
+import os
+import threading
+import time
+
+import pytest
+
+from gegevens import Gegevens
+from sloten import LeesSchrijfSlot, ProcesSlot
+
+
+def test_lezersgelijktijdig():
+  slot = LeesSchrijfSlot()
+  samen = threading.Barrier(3, timeout=5)
+
+  def lees():
+    with slot.lezen():
+      samen.wait()
+
+  lezers = [threading.Thread(target=lees) for _ in range(3)]
+  for lezer in lezers:
+    lezer.start()
+  for lezer in lezers:
+    lezer.join()
+
+  assert not samen.broken
+
+
+def test_schrijverwachtoplezer():
+  slot = LeesSchrijfSlot()
+  volgorde = []
+  gestart = threading.Event()
+
+  def schrijf():
+    gestart.set()
+    with slot.schrijven():
+      volgorde.append('schrijven')
+
+  with slot.lezen():
+    schrijver = threading.Thread(target=schrijf)
+    schrijver.start()
+    gestart.wait()
+    schrijver.join(0.1)
+    volgorde.append('lezen')
+    with slot.lezen():
+      volgorde.append('opnieuw lezen')
+  schrijver.join()
+
+  assert volgorde == ['lezen', 'opnieuw lezen', 'schrijven']
+
+
+def test_lezersnaschrijver():
+  slot = LeesSchrijfSlot()
+  stop = threading.Event()
+
+  def schrijf():
+    while not stop.is_set():
+      with slot.schrijven():
+        time.sleep(0.001)
+
+  schrijver = threading.Thread(target=schrijf)
+  schrijver.start()
+  begin = time.monotonic()
+  for _ in range(20):
+    with slot.lezen():
+      pass
+  duur = time.monotonic() - begin
+  stop.set()
+  schrijver.join()
+
+  assert duur < 1
+
+
+def test_schrijventijdenslezen():
+  slot = LeesSchrijfSlot()
+  with slot.schrijven():
+    with slot.lezen(), slot.schrijven():
+      pass
+  with slot.lezen(), pytest.raises(RuntimeError):
+    with slot.schrijven():
+      pass
+
+
+def test_processlot(tmp_path):
+  bestand = str(tmp_path / 'envdb.json.proces.lock')
+  with ProcesSlot(bestand):
+    handle = os.open(bestand, os.O_RDWR)
+    try:
+      with pytest.raises(BlockingIOError):
+        fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    finally:
+      os.close(handle)
+
+
+@pytest.mark.parametrize('soort', ['json', 'sqlite', 'log'])
+def test_gelijktijdigwijzigen(tmp_path, soort):
+  bestand = str(tmp_path / 'envdb.json')
+  envdb = Gegevens(bestand, soort, processlot=True)
+  gelezen = []
+
+  def wijzig(nummer):
+    for teller in range(10):
+      envdb.wijzig(f'sleutel{nummer}', teller)
+      gelezen.append(envdb.lees(f'sleutel{nummer}') == teller)
+
+  threads = [threading.Thread(target=wijzig, args=(nummer,)) for nummer in range(4)]
+  for thread in threads:
+    thread.start()
+  for thread in threads:
+    thread.join()
+
+  assert all(gelezen) and len(gelezen) == 40
+  opnieuw = Gegevens(bestand, soort)
+  assert [opnieuw.lees(f'sleutel{nummer}') for nummer in range(4)] == [9, 9, 9, 9]
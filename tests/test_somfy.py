@@ -1,3 +1,6 @@
+import importlib.util
+import json
+import os
 import unittest
 from unittest.mock import ANY
 
@@ -27,87 +30,201 @@ class MyTestCaseSomfy(unittest.TestCase):
       )
     return mock_resp
 
-  @mock.patch('requests.get')
+  @mock.patch('requests.Session.get')
   def test_somfylogin(self, mock_get):
-    from somfy import Somfy
+    from somfy import SomfyPod
     mock_resp = self._mock_response(status=200,
                                     content="""{'json': 'data'}""")
     mock_get.return_value.__enter__.return_value = mock_resp
 
-    response = Somfy.haalgegevens('token', 'pod', 'path')
+    response = SomfyPod('pod', 'token').haalgegevens('path')
     self.assertEqual(response, ANY)
     mock_get.assert_called_once()
+    self.assertEqual(mock_get.call_args.kwargs['url'],
+                     'https://pod.local:8443/enduser-mobile-web/1/enduserAPI/path')
+    self.assertEqual(mock_get.call_args.kwargs['headers'], {'Authorization': 'Bearer token'})
 
-  @mock.patch('somfy.Somfy.haalgegevens',
-              side_effect=[['io://1234-4321-5678/13579', 'io://1234-4321-5678/24680'],
-                           {'label': 'label 1.0'},
-                           {'label': 'label 2.0'}
-                           ]
-              )
-  @mock.patch('pysondb.db.JsonDatabase.add')
+  @mock.patch('somfy.SomfyPod.haalgegevens',
+              return_value=[{'deviceURL': 'io://1234-4321-5678/13579', 'label': 'label 1.0',
+                             'controllableName': 'io:VerticalExteriorAwningIOComponent', 'states': []},
+                            {'deviceURL': 'io://1234-4321-5678/24680', 'label': 'label 2.0',
+                             'controllableName': 'io:VerticalExteriorAwningIOComponent', 'states': []},
+                            {'deviceURL': 'io://1234-4321-5678/93682392', 'label': 'zonsensor',
+                             'controllableName': 'io:LightIOSystemSensor', 'states': []}])
+  @mock.patch('gegevens.Gegevens.schrijf')
   def test_haalschermen(self, mock_dbadd, mock_somfy):
     import thuis
-    reponse = thuis.haalschermen('pod', 'token')
+    from somfy import SomfyPod
+    somfy = SomfyPod('pod', 'token')
+    thuis.haalsetup(somfy)
     expected = [{'label': 'label 1.0', 'device': 'io://1234-4321-5678/13579'},
                 {'label': 'label 2.0', 'device': 'io://1234-4321-5678/24680'}]
-    self.assertEqual(reponse, expected)
+    self.assertEqual(somfy.haalschermen(), expected)
+    self.assertEqual(somfy.haalzonnesensors(), [{'label': 'zonsensor', 'device': 'io://1234-4321-5678/93682392'}])
+    mock_somfy.assert_called_once_with('setup/devices')
+    mock_dbadd.assert_any_call('schermen', expected)
+    self.assertEqual(mock_dbadd.call_count, 2)
+    somfy.vergeet()
+    self.assertEqual(somfy.haalschermen(), expected)
+    self.assertEqual(mock_somfy.call_count, 2)
+
+  @mock.patch('somfy.SomfyPod.haalgegevens')
+  def test_haaldevices_setupversie(self, mock_somfy):
+    from somfy import SomfyPod
+    scherm = {'deviceURL': 'io://1234-4321-5678/13579', 'label': 'label 1.0',
+              'controllableName': 'io:VerticalExteriorAwningIOComponent',
+              'states': [{'name': 'core:DeploymentState', 'type': 1, 'value': 0}]}
+    somfy = SomfyPod('pod', 'token')
+    mock_somfy.return_value = [scherm]
+    somfy.haalsetup()
+    versie = somfy.setupversie
+    gevonden = somfy.haalschermen()
+    self.assertEqual(versie, (('io://1234-4321-5678/13579', 'io:VerticalExteriorAwningIOComponent', 'label 1.0'),))
+
+    mock_somfy.return_value = [{**scherm, 'states': [{'name': 'core:DeploymentState', 'type': 1, 'value': 80}]}]
+    somfy.haalsetup()
+    self.assertEqual(somfy.setupversie, versie)
+    self.assertIs(somfy.haalschermen(), gevonden)
+
+    mock_somfy.return_value = [scherm, {**scherm, 'deviceURL': 'io://1234-4321-5678/24680', 'label': 'label 2.0'}]
+    somfy.haalsetup()
+    self.assertNotEqual(somfy.setupversie, versie)
+    self.assertEqual(somfy.haalschermen(), [{'label': 'label 1.0', 'device': 'io://1234-4321-5678/13579'},
+                                            {'label': 'label 2.0', 'device': 'io://1234-4321-5678/24680'}])
     self.assertEqual(mock_somfy.call_count, 3)
-    self.assertEqual(mock_dbadd.call_count, 1)
 
-  @mock.patch('pysondb.db.JsonDatabase.getByQuery',
-              side_effect=[[{'env': 'token', 'value': '4321c0de', 'id': 236910029}],
-                           [{'env': 'pod', 'value': '1234-4321-5678', 'id': 28234834}]
-                           ])
-  @mock.patch('requests.post')
+  @mock.patch('somfy.SomfyPod.haalgegevens', return_value={'error': 'dummy'})
+  def test_haaldevices_fout(self, mock_somfy):
+    from somfy import SomfyPod
+    somfy = SomfyPod('pod', 'token')
+
+    self.assertEqual(somfy.haalschermen(), [])
+    self.assertEqual(somfy.haalschermen(), [])
+    self.assertEqual(mock_somfy.call_count, 2)
+
+  @mock.patch('somfy.SomfyPod.haalgegevens',
+              return_value=[{'deviceURL': 'io://1234-4321-5678/13579',
+                             'label': 'label 1.0',
+                             'states': [{'name': 'core:NameState', 'type': 3, 'value': 'label 1.0'},
+                                        {'name': 'core:DeploymentState', 'type': 1, 'value': 30}]},
+                            {'deviceURL': 'io://1234-4321-5678/93682392',
+                             'label': 'zonsensor',
+                             'states': [{'name': 'core:LuminanceState', 'type': 2, 'value': 1234}]}])
+  def test_haalsetup(self, mock_somfy):
+    from somfy import leesstand, LICHTSTERKTE, SCHERMSTAND, SomfyPod
+    setup = SomfyPod('pod', 'token').haalsetup()
+
+    mock_somfy.assert_called_once_with('setup/devices')
+    self.assertEqual(list(setup), ['io://1234-4321-5678/13579', 'io://1234-4321-5678/93682392'])
+    self.assertEqual(leesstand(setup, 'io://1234-4321-5678/13579', SCHERMSTAND),
+                     {'name': 'core:DeploymentState', 'type': 1, 'value': 30})
+    self.assertEqual(leesstand(setup, 'io://1234-4321-5678/93682392', LICHTSTERKTE)['value'], 1234)
+    self.assertIsNone(leesstand(setup, 'io://1234-4321-5678/93682392', SCHERMSTAND))
+    self.assertIsNone(leesstand(setup, 'io://1234-4321-5678/24680', SCHERMSTAND))
+
+  @mock.patch('somfy.SomfyPod.haalgegevens', return_value={'error': 'dummy', 'errorCode': 'RESOURCE_ACCESS_DENIED'})
+  def test_haalsetup_fout(self, mock_somfy):
+    from somfy import leesstand, SCHERMSTAND, SomfyPod
+    setup = SomfyPod('pod', 'token').haalsetup()
+
+    self.assertEqual(setup, {'error': 'dummy', 'errorCode': 'RESOURCE_ACCESS_DENIED'})
+    self.assertIs(leesstand(setup, 'io://1234-4321-5678/13579', SCHERMSTAND), setup)
+
+  @mock.patch('gegevens.Gegevens.snapshot',
+              return_value={'token': '4321c0de', 'pod': '1234-4321-5678'})
+  @mock.patch('requests.Session.post')
   def test_verplaatsscherm(self, mock_requestspost, mock_getenv):
     import thuis
     thuis.verplaatsscherm('device', '20')
-    self.assertEqual(mock_getenv.call_count, 2)
+    self.assertEqual(mock_getenv.call_count, 1)
     self.assertEqual(mock_requestspost.call_count, 1)
+    self.assertEqual(json.loads(mock_requestspost.call_args.kwargs['data'])['actions'],
+                     [{'commands': [{'name': 'setClosure', 'parameters': ['20']}], 'deviceURL': 'device'}])
+
+  @mock.patch('gegevens.Gegevens.snapshot', return_value={'token': '4321c0de'})
+  @mock.patch('requests.Session.post')
+  def test_verplaatsscherm_geenpod(self, mock_requestspost, mock_getenv):
+    import thuis
+    thuis.verplaatsscherm('device', '20')
+    self.assertEqual(mock_requestspost.call_count, 0)
 
-  @mock.patch('pysondb.db.JsonDatabase.getByQuery',
-              side_effect=[[{'env': 'schermen', 'value': [{'label': 'label 1.1', 'device': 'io://1234-4321-5678/13579'},
-                                                          {'label': 'label 2.2',
-                                                           'device': 'io://1234-4321-5678/24680'}]}],
-                           [{'env': 'token', 'value': 'token', 'id': 286349129001}],
-                           [{'env': 'pod', 'value': '1234-4321-5678', 'id': 28234834}],
-                           [{'env': 'token', 'value': 'token', 'id': 286349129001}],
-                           [{'env': 'pod', 'value': '1234-4321-5678', 'id': 28234834}]
-                           ]
-              )
-  @mock.patch('somfy.Somfy.stuurgegevens')
+  @mock.patch('gegevens.Gegevens.snapshot',
+              return_value={'schermen': [{'label': 'label 1.1', 'device': 'io://1234-4321-5678/13579'},
+                                         {'label': 'label 2.2', 'device': 'io://1234-4321-5678/24680'}],
+                            'token': 'token',
+                            'pod': '1234-4321-5678'})
+  @mock.patch('somfy.SomfyPod.stuurgegevens')
   def test_sluitalles(self, mock_somfy, mock_query):
     import thuis
     thuis.sluitalles()
     self.assertEqual(mock_somfy.call_count, 2)
-    self.assertEqual(mock_query.call_count, 5)
-
-  @mock.patch('pysondb.db.JsonDatabase.getByQuery',
-              side_effect=[[{'env': 'schermen', 'value': [{'label': 'label 1.1', 'device': 'io://1234-4321-5678/13579'},
-                                                          {'label': 'label 2.2',
-                                                           'device': 'io://1234-4321-5678/24680'}]}],
-                           [{'env': 'token', 'value': 'token', 'id': 286349129001}],
-                           [{'env': 'pod', 'value': '1234-4321-5678', 'id': 28234834}],
-                           [{'env': 'token', 'value': 'token', 'id': 286349129001}],
-                           [{'env': 'pod', 'value': '1234-4321-5678', 'id': 28234834}]
-                           ]
-              )
-  @mock.patch('somfy.Somfy.stuurgegevens')
+    self.assertEqual(mock_query.call_count, 1)
+
+  @mock.patch('gegevens.Gegevens.snapshot',
+              return_value={'schermen': [{'label': 'label 1.1', 'device': 'io://1234-4321-5678/13579'},
+                                         {'label': 'label 2.2', 'device': 'io://1234-4321-5678/24680'}],
+                            'token': 'token',
+                            'pod': '1234-4321-5678'})
+  @mock.patch('somfy.SomfyPod.stuurgegevens')
   def test_openalles(self, mock_somfy, mock_query):
     import thuis
     thuis.openalles()
     self.assertEqual(mock_somfy.call_count, 2)
-    self.assertEqual(mock_query.call_count, 5)
+    self.assertEqual(mock_query.call_count, 1)
 
-  @mock.patch('pysondb.db.JsonDatabase.getByQuery',
-              return_value=[{'env': 'schermen', 'value': [], 'id': 2349126349}])
-  @mock.patch('pysondb.db.JsonDatabase.deleteById')
-  def test_verversschermen(self, mock_delete, mock_query):
+  @mock.patch('gegevens.Gegevens.snapshot',
+              return_value={'token': 'token', 'pod': '1234-4321-5678'})
+  @mock.patch('gegevens.Gegevens.verwijder')
+  def test_verversschermen(self, mock_verwijder, mock_snapshot):
     import thuis
-    thuis.verversschermen()
+    with mock.patch('somfy.SomfyPod.vergeet') as mock_vergeet:
+      thuis.verversschermen()
 
-    self.assertEqual(mock_delete.call_count, 1)
-    self.assertEqual(mock_query.call_count, 1)
+    mock_verwijder.assert_called_once_with('schermen')
+    mock_vergeet.assert_called_once_with()
+
+  @mock.patch('gegevens.Gegevens.snapshot',
+              return_value={'token': 'token', 'pod': '1234-4321-5678'})
+  def test_getsomfy(self, mock_snapshot):
+    import thuis
+    somfy = thuis.getsomfy()
+
+    self.assertIs(thuis.getsomfy(), somfy)
+    self.assertEqual((somfy.pod, somfy.token), ('1234-4321-5678', 'token'))
+    self.assertIsNot(thuis.getsomfy({'token': 'nieuw', 'pod': '1234-4321-5678'}), somfy)
+    self.assertIsNone(thuis.getsomfy({'pod': '1234-4321-5678'}))
+
+  def test_podsessie(self):
+    from somfy import OverkizAdapter, overkizcontext, podsessie
+    sessie = podsessie('1234-4321-5678')
+
+    self.assertIs(podsessie('1234-4321-5678'), sessie)
+    self.assertIsNot(podsessie('8765-4321-1234'), sessie)
+    self.assertIsInstance(sessie.get_adapter('https://1234-4321-5678.local:8443/enduser-mobile-web'), OverkizAdapter)
+    self.assertIs(sessie.get_adapter('https://1234-4321-5678.local:8443/enduser-mobile-web').context, overkizcontext())
+    self.assertNotIsInstance(sessie.get_adapter('https://ha101-1.overkiz.com/'), OverkizAdapter)
+
+  def test_overkizadapter(self):
+    import ssl
+    import requests
+    from somfy import OverkizAdapter
+    map_ = os.path.join(os.path.dirname(__file__), '..', 'benchmarks')
+    spec = importlib.util.spec_from_file_location('nepbridge', os.path.join(map_, 'nepbridge.py'))
+    nepbridge = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(nepbridge)
+    sessie = requests.Session()
+
+    with nepbridge.NepBridge(lampen=1) as bridge:
+      adapter = OverkizAdapter(ssl.create_default_context(cafile=bridge.certificaat))
+      sessie.mount('https://', adapter)
+      for _ in range(3):
+        with sessie.get(f'https://{bridge.adres}/clip/v2/resource/light', timeout=5) as response:
+          self.assertEqual(response.status_code, 200)
+      with self.assertRaises(requests.exceptions.SSLError):
+        requests.get(f'https://{bridge.adres}/clip/v2/resource/light', timeout=5)
+
+    pools = list(adapter.poolmanager.pools._container.values())
+    self.assertEqual([pool.num_connections for pool in pools], [1])
 
 
 if __name__ == '__main__':
@@ -0,0 +1,51 @@
+import time
+
+from verwachting import Verwachting, bevat
+
+
+def test_verwachtingbevestigd():
+  verwachting = Verwachting(duur=10)
+  verwachting.verwacht('lamp1', {'on': {'on': True}})
+  verwachting.verwacht('lamp1', {'dimming': {'brightness': 40}})
+  oud = {'id': 'lamp1', 'on': {'on': False}, 'dimming': {'brightness': 80, 'min_dim_level': 2}}
+
+  assert verwachting.verwachtvoor(['lamp2', 'lamp1'])
+  assert verwachting.pasaan('lamp1', oud) == {'id': 'lamp1', 'on': {'on': True},
+                                              'dimming': {'brightness': 40, 'min_dim_level': 2}}
+  assert oud['on'] == {'on': False}
+  nieuw = {'id': 'lamp1', 'on': {'on': True}, 'dimming': {'brightness': 40, 'min_dim_level': 2}}
+  assert verwachting.pasaan('lamp1', nieuw) is nieuw
+  assert not verwachting.verwachtvoor(['lamp1'])
+
+
+def test_verwachtingverlopen():
+  verwachting = Verwachting(duur=0.05)
+  verwachting.verwacht('scherm', {'value': 100})
+  verwachting.bewaar('scherm', {'value': 0})
+
+  assert verwachting.bekend('scherm') == {'value': 0}
+  assert verwachting.pasaan('scherm', {'value': 0}) == {'value': 100}
+  time.sleep(0.1)
+  assert verwachting.bekend('scherm') is None
+  assert verwachting.pasaan('scherm', {'value': 0}) == {'value': 0}
+
+
+def test_vergeetenwis():
+  verwachting = Verwachting(duur=10)
+  verwachting.verwacht('lamp1', {'on': {'on': True}})
+  verwachting.verwacht('lamp2', {'on': {'on': True}})
+  verwachting.bewaar('light', {'data': []})
+  verwachting.vergeet('lamp1')
+
+  assert not verwachting.verwachtvoor(['lamp1'])
+  assert verwachting.verwachtvoor(['lamp2'])
+  verwachting.wis()
+  assert not verwachting.verwachtvoor(['lamp2'])
+  assert verwachting.bekend('light') is None
+
+
+def test_bevat():
+  assert bevat({'on': {'on': True}, 'id': 'x'}, {'on': {'on': True}})
+  assert not bevat({'on': {'on': True}}, {'on': {'on': False}})
+  assert not bevat({'value': 10}, {'value': 20})
+  assert not bevat({}, {'color': {'xy': {'x': 0.1}}})
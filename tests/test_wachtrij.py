@@ -0,0 +1,84 @@
+import threading
+import time
+from unittest.mock import Mock
+
+import pytest
+import requests
+
+import wachtrij
+from wachtrij import Emmer, OpdrachtWachtrij
+
+
+def test_emmer():
+  emmer = Emmer(snelheid=50, grootte=5)
+  begin = time.monotonic()
+  for _ in range(10):
+    emmer.neem()
+  duur = time.monotonic() - begin
+
+  assert 0.08 <= duur < 0.5
+  assert emmer.beschikbaar() < 1
+
+
+def test_samenvoegen():
+  verzonden = []
+  eerste = threading.Event()
+  doorgaan = threading.Event()
+
+  def verstuur(pad, gegevens):
+    verzonden.append((pad, gegevens))
+    eerste.set()
+    doorgaan.wait(5)
+    return {'errors': []}
+
+  rij = OpdrachtWachtrij(verstuur, Emmer(100, 100), gelijktijdig=2)
+  bezig = rij.plaats('light/1', {'dimming': {'brightness': 10}})
+  assert eerste.wait(5)
+  tweede = rij.plaats('light/1', {'on': {'on': True}, 'dimming': {'brightness': 20}})
+  derde = rij.plaats('light/1', {'dimming': {'brightness': 30}})
+  assert rij.wachtend() == 1
+  doorgaan.set()
+
+  assert derde is tweede
+  assert bezig.result(5) == {'errors': []}
+  assert tweede.result(5) == {'errors': []}
+  assert rij.wachtend() == 0
+  assert verzonden == [('light/1', {'dimming': {'brightness': 10}}),
+                       ('light/1', {'on': {'on': True}, 'dimming': {'brightness': 30}})]
+
+
+def test_gelijktijdig():
+  def verstuur(pad, gegevens):
+    time.sleep(0.2)
+
+  rij = OpdrachtWachtrij(verstuur, Emmer(100, 100), gelijktijdig=4)
+  begin = time.monotonic()
+  opdrachten = [rij.plaats(f'light/{nummer}', {'on': {'on': False}}) for nummer in range(4)]
+  for opdracht in opdrachten:
+    opdracht.result(5)
+
+  assert time.monotonic() - begin < 0.6
+
+
+def test_teveelverzoeken(monkeypatch):
+  monkeypatch.setattr(wachtrij, 'HERHAALTIJD', 0.01)
+  antwoord = Mock(status_code=429)
+  verstuur = Mock(side_effect=[requests.HTTPError(response=antwoord), {'errors': []}])
+
+  rij = OpdrachtWachtrij(verstuur, Emmer(100, 100))
+
+  assert rij.plaats('light/1', {'on': {'on': True}}).result(5) == {'errors': []}
+  assert verstuur.call_count == 2
+
+
+def test_fout(monkeypatch):
+  monkeypatch.setattr(wachtrij, 'HERHAALTIJD', 0.01)
+  verstuur = Mock(side_effect=[requests.HTTPError(response=Mock(status_code=429))] * 3
+                  + [requests.ConnectTimeout('bridge reageert niet'), {'errors': []}])
+  rij = OpdrachtWachtrij(verstuur, Emmer(100, 100), gelijktijdig=1)
+
+  with pytest.raises(requests.HTTPError):
+    rij.plaats('light/1', {'on': {'on': True}}).result(5)
+  with pytest.raises(requests.ConnectTimeout):
+    rij.plaats('light/1', {'on': {'on': True}}).result(5)
+  assert rij.plaats('light/1', {'on': {'on': True}}).result(5) == {'errors': []}
@@ -1,37 +1,67 @@
 from unittest.mock import patch
 
+import pytest
 from freezegun import freeze_time
 
 import thuis
+from gegevens import Gegevens
+from somfy import SomfyPod
 
 
-@patch('pysondb.db.JsonDatabase.getByQuery',
-       side_effect=[[{'env': 'token', 'value': 'token', 'id': 286349129001}],
-                    [{'env': 'pod', 'value': '1234-4321-5678', 'id': 28234834}],
-                    [{'env': 'sensors',
-                      'value': [{"label": "zonsensor", "device": "io://1234-4321-5678/93682392"}]}],
-                    ])
-@patch('thuis.haalzonnesensors',
-       side_effect=[{"label": "zonsensor", "device": "io://1234-4321-5678/93682392"}])
-@patch('somfy.Somfy.haalgegevens',
-       side_effect=[{'value': 1234}])
-def test_haalzonnesterkte(mock_somfy, mock_sensors, mock_envdb):
+def maaksetup(device, waarde):
+  return [{'deviceURL': device,
+           'label': 'zonsensor',
+           'controllableName': 'io:LightIOSystemSensor',
+           'states': [{'name': 'core:LuminanceState', 'type': 2, 'value': waarde}]}]
+
+
+@pytest.fixture(autouse=True)
+def nieuwekastjes():
+  thuis.somfycache.clear()
+
+
+@pytest.fixture(autouse=True)
+def envdb(tmp_path, monkeypatch):
+  monkeypatch.setattr(thuis, 'envdb', Gegevens(str(tmp_path / 'envdb.json')))
+  return thuis.envdb
+
+
+@pytest.fixture(autouse=True)
+def historie(tmp_path, monkeypatch):
+  monkeypatch.setenv('THUIS_HISTORIE', str(tmp_path / 'zonnesterkte.historie'))
+  thuis.getzonhistorie.cache_clear()
+  yield tmp_path / 'zonnesterkte.historie'
+  thuis.getzonhistorie.cache_clear()
+
+
+def test_getzonhistorie(historie):
+  assert not historie.exists()
+  tijdreeks = thuis.getzonhistorie()
+
+  assert historie.exists()
+  assert thuis.getzonhistorie() is tijdreeks
+
+
+@patch('gegevens.Gegevens.snapshot',
+       return_value={'token': 'token',
+                     'pod': '1234-4321-5678',
+                     'sensors': [{'label': 'zonsensor', 'device': 'io://1234-4321-5678/93682392'}]})
+@patch('somfy.SomfyPod.haalgegevens',
+       return_value=maaksetup('io://1234-4321-5678/93682392', 1234))
+def test_haalzonnesterkte(mock_somfy, mock_envdb):
   resultaat = thuis.haalzonnesterkte()
 
   assert resultaat == 1234
-  assert mock_envdb.call_count == 3
-  assert mock_sensors.call_count == 0
-  assert mock_somfy.call_count == 1
+  assert mock_envdb.call_count == 1
+  mock_somfy.assert_called_once_with('setup/devices')
 
 
-@patch('pysondb.db.JsonDatabase.getByQuery',
-       side_effect=[[{'env': 'token', 'value': 'token', 'id': 286349129001}],
-                    [{'env': 'pod', 'value': '1234-4321-5678', 'id': 28234834}],
-                    [{'env': 'sensors',
-                      'value': [{"label": "zonsensor", "device": "io://1234-4321-5678/93682392"}]}],
-                    ])
-@patch('somfy.Somfy.haalgegevens',
-       side_effect=[{'value': 4321}])
+@patch('gegevens.Gegevens.snapshot',
+       return_value={'token': 'token',
+                     'pod': '1234-4321-5678',
+                     'sensors': [{'label': 'zonsensor', 'device': 'io://1234-4321-5678/93682392'}]})
+@patch('somfy.SomfyPod.haalgegevens',
+       return_value=maaksetup('io://1234-4321-5678/93682392', 4321))
 def test_haalzonnesterkte_uitcache(mock_somfy, mock_envdb):
   resultaat = thuis.haalzonnesterkte()
 
@@ -40,110 +70,114 @@ def test_haalzonnesterkte_uitcache(mock_somfy, mock_envdb):
   assert mock_somfy.call_count == 0
 
 
-@patch('pysondb.db.JsonDatabase.getByQuery',
-       side_effect=[[],
-                    [{'env': 'pod', 'value': '1234-4321-5678', 'id': 28234834}],
-                    [{'env': 'sensors',
-                      'value': [{"label": "zonsensor", "device": "io://1234-4321-5678/93682392"}]}],
-                    ])
-@patch('somfy.Somfy.haalgegevens',
-       side_effect=[{'value': 2345}])
+@patch('gegevens.Gegevens.snapshot',
+       return_value={'pod': '1234-4321-5678',
+                     'sensors': [{'label': 'zonsensor', 'device': 'io://1234-4321-5678/93682392'}]})
+@patch('somfy.SomfyPod.haalgegevens',
+       return_value=maaksetup('io://1234-4321-5678/93682392', 2345))
 def test_haalzonnesterkte_geentoken(mock_somfy, mock_envdb):
   thuis.haalzonnesterkte.cache_clear()
   resultaat = thuis.haalzonnesterkte()
 
   assert resultaat == -1
-  assert mock_envdb.call_count == 2
+  assert mock_envdb.call_count == 1
   assert mock_somfy.call_count == 0
 
 
-@patch('pysondb.db.JsonDatabase.getByQuery',
-       side_effect=[[{'env': 'token', 'value': 'token2', 'id': 286349129001}],
-                    [],
-                    [{'env': 'sensors',
-                      'value': [{"label": "zonsensor", "device": "io://1234-4321-5678/93682392"}]}],
-                    ])
-@patch('somfy.Somfy.haalgegevens',
-       side_effect=[{'value': 3456}])
+@patch('gegevens.Gegevens.snapshot',
+       return_value={'token': 'token2',
+                     'sensors': [{'label': 'zonsensor', 'device': 'io://1234-4321-5678/93682392'}]})
+@patch('somfy.SomfyPod.haalgegevens',
+       return_value=maaksetup('io://1234-4321-5678/93682392', 3456))
 def test_haalzonnesterkte_geenpod(mock_somfy, mock_envdb):
   thuis.haalzonnesterkte.cache_clear()
   resultaat = thuis.haalzonnesterkte()
 
   assert resultaat == -1
-  assert mock_envdb.call_count == 2
+  assert mock_envdb.call_count == 1
   assert mock_somfy.call_count == 0
 
 
-@patch('pysondb.db.JsonDatabase.getByQuery',
-       side_effect=[[{'env': 'token', 'value': 'token2', 'id': 286349129001}],
-                    [{'env': 'pod', 'value': '1234-4321-5678', 'id': 28234834}],
-                    [],
-                    ])
-@patch('thuis.haalzonnesensors',
-       side_effect=[[{"label": "zonsensor", "device": "io://1234-4321-5678/93682392"}]])
-@patch('somfy.Somfy.haalgegevens',
-       side_effect=[{'value': 4567}])
-def test_haalzonnesterkte_geensensors(mock_somfy, mock_sensors, mock_envdb):
+@patch('gegevens.Gegevens.snapshot',
+       return_value={'token': 'token2',
+                     'pod': '1234-4321-5678'})
+@patch('somfy.SomfyPod.haalgegevens',
+       return_value=maaksetup('io://1234-4321-5678/93682392', 4567))
+def test_haalzonnesterkte_geensensors(mock_somfy, mock_envdb, envdb):
   thuis.haalzonnesterkte.cache_clear()
   resultaat = thuis.haalzonnesterkte()
 
   assert resultaat == 4567
-  assert mock_envdb.call_count == 3
-  assert mock_sensors.call_count == 1
+  assert envdb.lees('sensors') == [{'label': 'zonsensor', 'device': 'io://1234-4321-5678/93682392'}]
+  assert mock_envdb.call_count == 1
   assert mock_somfy.call_count == 1
 
 
-@patch('pysondb.db.JsonDatabase.getByQuery',
-       side_effect=[[{'env': 'token', 'value': 'token2', 'id': 286349129001}],
-                    [{'env': 'pod', 'value': '1234-4321-5678', 'id': 28234834}],
-                    [{'env': 'sensors',
-                      'value': [{"label": "zonsensor", "device": "io://1234-4321-5678/93682392"}]}],
-                    ])
-@patch('somfy.Somfy.haalgegevens',
+@patch('gegevens.Gegevens.snapshot',
+       return_value={'token': 'token2',
+                     'pod': '1234-4321-5678',
+                     'sensors': [{'label': 'zonsensor', 'device': 'io://1234-4321-5678/93682392'}]})
+@patch('somfy.SomfyPod.haalgegevens',
        return_value={'error': 'dummy'})
 def test_haalzonnesterkte_somfyerror(mock_somfy, mock_envdb):
   thuis.haalzonnesterkte.cache_clear()
   resultaat = thuis.haalzonnesterkte()
 
   assert resultaat == -2
-  assert mock_envdb.call_count == 3
+  assert mock_envdb.call_count == 1
   assert mock_somfy.call_count == 1
 
 
-@patch('pysondb.db.JsonDatabase.getByQuery',
-       side_effect=[[{'env': 'token', 'value': 'token2', 'id': 286349129001}],
-                    [{'env': 'pod', 'value': '1234-4321-5678', 'id': 28234834}],
-                    [{'env': 'sensors', 'value': []}],
-                    ])
-@patch('somfy.Somfy.haalgegevens',
-       side_effect=[{'value': 4567}])
-@patch('thuis.haalzonnesensors', return_value=[])
-def test_haalzonnesterkte_geensensor(mock_haalsensors, mock_somfy, mock_envdb):
+@patch('gegevens.Gegevens.snapshot',
+       return_value={'token': 'token2',
+                     'pod': '1234-4321-5678',
+                     'sensors': []})
+@patch('somfy.SomfyPod.haalgegevens',
+       return_value=[{'deviceURL': 'io://1234-4321-5678/13579', 'label': 'scherm',
+                      'controllableName': 'io:VerticalExteriorAwningIOComponent', 'states': []}])
+def test_haalzonnesterkte_geensensor(mock_somfy, mock_envdb, envdb):
   thuis.haalzonnesterkte.cache_clear()
   resultaat = thuis.haalzonnesterkte()
 
   assert resultaat == -4
-  assert mock_envdb.call_count == 3
-  assert mock_somfy.call_count == 0
-  assert mock_haalsensors.call_count == 1
+  assert envdb.lees('sensors') == []
+  assert mock_envdb.call_count == 1
+  assert mock_somfy.call_count == 1
 
 
-@patch('pysondb.db.JsonDatabase.add')
-@patch('somfy.Somfy.haalgegevens',
-       side_effect=[['io://sensorurl'],
-                    {'label': 'zonlabel'}])
-def test_haalzonnesensors(mock_somfy, mock_envdbadd):
-  resultaat = thuis.haalzonnesensors('pod', 'token')
+@patch('gegevens.Gegevens.snapshot',
+       return_value={'token': 'token2',
+                     'pod': '1234-4321-5678',
+                     'sensors': [{'label': 'zonsensor', 'device': 'io://1234-4321-5678/93682392'}]})
+@patch('somfy.SomfyPod.haalgegevens',
+       return_value=[{**maaksetup('io://1234-4321-5678/93682392', 5678)[0], 'states': []}])
+def test_haalzonnesterkte_geenstand(mock_somfy, mock_envdb):
+  thuis.haalzonnesterkte.cache_clear()
+  resultaat = thuis.haalzonnesterkte()
 
-  assert resultaat == [{'label': 'zonlabel', 'device': 'io://sensorurl'}]
-  assert mock_envdbadd.call_count == 1
+  assert resultaat == -3
+  assert mock_somfy.call_count == 1
+
+
+@patch('gegevens.Gegevens.schrijf')
+@patch('somfy.SomfyPod.haalgegevens',
+       return_value=maaksetup('io://sensorurl', 1234))
+def test_haalsetup(mock_somfy, mock_envdbadd):
+  somfy = SomfyPod('pod', 'token')
+  resultaat = thuis.haalsetup(somfy)
+  thuis.haalsetup(somfy)
+
+  assert list(resultaat) == ['io://sensorurl']
+  mock_envdbadd.assert_any_call('sensors', [{'label': 'zonsensor', 'device': 'io://sensorurl'}])
+  mock_envdbadd.assert_any_call('schermen', [])
+  assert mock_envdbadd.call_count == 2
   assert mock_somfy.call_count == 2
 
 
-@patch('pysondb.db.JsonDatabase.getByQuery',
-       side_effect=[[{'env': 'zonnesterkte', 'value': 1234, 'id': 29346023}],
+@patch('gegevens.Gegevens.lees',
+       side_effect=[1234,
                     ])
-@patch('pysondb.db.JsonDatabase.add')
+@patch('gegevens.Gegevens.schrijf')
 def test_haalzonnesterkteuitdb(mock_envdbadd, mock_zondbget):
   resultaat = thuis.haalzonnesterkteuitdb()
 
@@ -152,10 +186,10 @@ def test_haalzonnesterkteuitdb(mock_envdbadd, mock_zondbget):
   assert mock_envdbadd.call_count == 0
 
 
-@patch('pysondb.db.JsonDatabase.getByQuery',
-       side_effect=[[],
+@patch('gegevens.Gegevens.lees',
+       side_effect=[None,
                     ])
-@patch('pysondb.db.JsonDatabase.add')
+@patch('gegevens.Gegevens.schrijf')
 def test_haalzonnesterkteuitdb_nieuw(mock_envdbadd, mock_zondbget):
   resultaat = thuis.haalzonnesterkteuitdb()
 
@@ -168,44 +202,39 @@ def test_haalzonnesterkteuitdb_nieuw(mock_envdbadd, mock_zondbget):
 @patch('thuis.haalzonnesterkte', return_value=976)
 @patch('thuis.schakellampenaan')
 @patch('thuis.schakellampenuit')
-@patch('pysondb.db.JsonDatabase.add')
-@patch('pysondb.db.JsonDatabase.deleteById')
-@patch('pysondb.db.JsonDatabase.getByQuery',
-       side_effect=[[{'env': 'zonsterktelampen', 'value': 977, 'id': 9712382}],
-                    [{'env': 'zonsterktelampenuit', 'value': 999, 'id': 9293648236}],
-                    [{'env': 'starttijd', 'value': 9, 'id': 13287633}],
-                    [{'env': 'eindtijd', 'value': 23, 'id': 92379283}],
-                    [],
-                    ])
+@patch('historie.Tijdreeks.voegtoe')
+@patch('gegevens.Gegevens.wijzig')
+@patch('gegevens.Gegevens.snapshot',
+       return_value={'zonsterktelampen': 977,
+                     'zonsterktelampenuit': 999,
+                     'starttijd': 9,
+                     'eindtijd': 23})
 @freeze_time("2025-05-17 17:01:02")
-def test_checkzonnesterkte_hoog_laag(mock_leesdb, mock_del, mock_add, mock_schakeluit, mock_schakelaan,
+def test_checkzonnesterkte_hoog_laag(mock_leesdb, mock_wijzig, mock_voegtoe, mock_schakeluit, mock_schakelaan,
                                      mock_haalzonnesterkte, mock_haaluitdb):
   thuis.checkzonnesterkte()
 
+  mock_voegtoe.assert_called_once_with(1747501262, 976)
   assert mock_haaluitdb.call_count == 1
   assert mock_haalzonnesterkte.call_count == 1
   assert mock_schakelaan.call_count == 1
   assert mock_schakeluit.call_count == 0
-  assert mock_add.call_count == 1
-  assert mock_del.call_count == 0
-  assert mock_leesdb.call_count == 5
+  assert mock_wijzig.call_count == 1
+  assert mock_leesdb.call_count == 1
 
 
 @patch('thuis.haalzonnesterkteuitdb', return_value=978)
 @patch('thuis.haalzonnesterkte', return_value=977)
 @patch('thuis.schakellampenaan')
 @patch('thuis.schakellampenuit')
-@patch('pysondb.db.JsonDatabase.add')
-@patch('pysondb.db.JsonDatabase.deleteById')
-@patch('pysondb.db.JsonDatabase.getByQuery',
-       side_effect=[[{'env': 'zonsterktelampen', 'value': 977, 'id': 9712382}],
-                    [{'env': 'zonsterktelampenuit', 'value': 999, 'id': 9293648236}],
-                    [{'env': 'starttijd', 'value': 9, 'id': 13287633}],
-                    [{'env': 'eindtijd', 'value': 23, 'id': 92379283}],
-                    [],
-                    ])
+@patch('gegevens.Gegevens.wijzig')
+@patch('gegevens.Gegevens.snapshot',
+       return_value={'zonsterktelampen': 977,
+                     'zonsterktelampenuit': 999,
+                     'starttijd': 9,
+                     'eindtijd': 23})
 @freeze_time("2025-05-17 17:01:02")
-def test_checkzonnesterkte_hoog_laag_grens(mock_leesdb, mock_del, mock_add, mock_schakeluit, mock_schakelaan,
+def test_checkzonnesterkte_hoog_laag_grens(mock_leesdb, mock_wijzig, mock_schakeluit, mock_schakelaan,
                                            mock_haalzonnesterkte, mock_haaluitdb):
   thuis.checkzonnesterkte()
 
@@ -213,25 +242,22 @@ def test_checkzonnesterkte_hoog_laag_grens(mock_leesdb, mock_del, mock_add, mock
   assert mock_haalzonnesterkte.call_count == 1
   assert mock_schakelaan.call_count == 1
   assert mock_schakeluit.call_count == 0
-  assert mock_add.call_count == 1
-  assert mock_del.call_count == 0
-  assert mock_leesdb.call_count == 5
+  assert mock_wijzig.call_count == 1
+  assert mock_leesdb.call_count == 1
 
 
 @patch('thuis.haalzonnesterkteuitdb', return_value=4321)
 @patch('thuis.haalzonnesterkte', return_value=4000)
 @patch('thuis.schakellampenaan')
 @patch('thuis.schakellampenuit')
-@patch('pysondb.db.JsonDatabase.getByQuery',
-       side_effect=[[{'env': 'zonsterktelampen', 'value': 400, 'id': 9712382}],
-                    [{'env': 'zonsterktelampenuit', 'value': 500, 'id': 9712382}],
-                    [{'env': 'starttijd', 'value': 9, 'id': 13287633}],
-                    [{'env': 'eindtijd', 'value': 23, 'id': 92379283}],
-                    [],
-                    ])
-@patch('pysondb.db.JsonDatabase.add')
+@patch('gegevens.Gegevens.snapshot',
+       return_value={'zonsterktelampen': 400,
+                     'zonsterktelampenuit': 500,
+                     'starttijd': 9,
+                     'eindtijd': 23})
+@patch('gegevens.Gegevens.wijzig')
 @freeze_time("2025-05-17 17:01:02")
-def test_checkzonnesterkte_hoog_hoog(mock_adddb, mock_leesdb, mock_schakeluit, mock_schakelaan, mock_haalzonnesterkte,
+def test_checkzonnesterkte_hoog_hoog(mock_wijzig, mock_leesdb, mock_schakeluit, mock_schakelaan, mock_haalzonnesterkte,
                                      mock_haaluitdb):
   thuis.checkzonnesterkte()
 
@@ -239,25 +265,20 @@ def test_checkzonnesterkte_hoog_hoog(mock_adddb, mock_leesdb, mock_schakeluit, m
   assert mock_haalzonnesterkte.call_count == 1
   assert mock_schakelaan.call_count == 0
   assert mock_schakeluit.call_count == 0
-  assert mock_leesdb.call_count == 5
-  assert mock_adddb.call_count == 1
+  assert mock_leesdb.call_count == 1
+  assert mock_wijzig.call_count == 1
 
 
 @patch('thuis.haalzonnesterkteuitdb', return_value=401)
 @patch('thuis.haalzonnesterkte', return_value=399)
 @patch('thuis.schakellampenaan')
 @patch('thuis.schakellampenuit')
-@patch('pysondb.db.JsonDatabase.add')
-@patch('pysondb.db.JsonDatabase.deleteById')
-@patch('pysondb.db.JsonDatabase.getByQuery',
-       side_effect=[[{'env': 'zonsterktelampen', 'value': None, 'id': 2983749273}],
-                    [{'env': 'zonsterktelampenuit', 'value': None, 'id': 2983749273}],
-                    [{'env': 'starttijd', 'value': 9, 'id': 13287633}],
-                    [{'env': 'eindtijd', 'value': 23, 'id': 92379283}],
-                    [],
-                    ])
+@patch('gegevens.Gegevens.wijzig')
+@patch('gegevens.Gegevens.snapshot',
+       return_value={'starttijd': 9,
+                     'eindtijd': 23})
 @freeze_time("2025-05-17 17:01:02")
-def test_checkzonnesterkte_hoog_laag_default(mock_leesdb, mock_delete, mock_add, mock_schakeluit, mock_schakelaan,
+def test_checkzonnesterkte_hoog_laag_default(mock_leesdb, mock_wijzig, mock_schakeluit, mock_schakelaan,
                                              mock_haalzonnesterkte, mock_haaluitdb):
   thuis.checkzonnesterkte()
 
@@ -265,25 +286,22 @@ def test_checkzonnesterkte_hoog_laag_default(mock_leesdb, mock_delete, mock_add,
   assert mock_haalzonnesterkte.call_count == 1
   assert mock_schakelaan.call_count == 1
   assert mock_schakeluit.call_count == 0
-  assert mock_add.call_count == 1
-  assert mock_delete.call_count == 0
-  assert mock_leesdb.call_count == 5
+  assert mock_wijzig.call_count == 1
+  assert mock_leesdb.call_count == 1
 
 
 @patch('thuis.haalzonnesterkteuitdb', return_value=300)
 @patch('thuis.haalzonnesterkte', return_value=350)
 @patch('thuis.schakellampenaan')
 @patch('thuis.schakellampenuit')
-@patch('pysondb.db.JsonDatabase.getByQuery',
-       side_effect=[[{'env': 'zonsterktelampen', 'value': 400, 'id': 9712382}],
-                    [{'env': 'zonsterktelampenuit', 'value': 600, 'id': 9712382}],
-                    [{'env': 'starttijd', 'value': 9, 'id': 13287633}],
-                    [{'env': 'eindtijd', 'value': 23, 'id': 92379283}],
-                    [],
-                    ])
-@patch('pysondb.db.JsonDatabase.add')
+@patch('gegevens.Gegevens.snapshot',
+       return_value={'zonsterktelampen': 400,
+                     'zonsterktelampenuit': 600,
+                     'starttijd': 9,
+                     'eindtijd': 23})
+@patch('gegevens.Gegevens.wijzig')
 @freeze_time("2025-05-17 17:01:02")
-def test_checkzonnesterkte_laag_laag(mock_adddb, mock_leesdb, mock_schakeluit, mock_schakelaan, mock_haalzonnesterkte,
+def test_checkzonnesterkte_laag_laag(mock_wijzig, mock_leesdb, mock_schakeluit, mock_schakelaan, mock_haalzonnesterkte,
                                      mock_haaluitdb):
   thuis.checkzonnesterkte()
 
@@ -291,24 +309,22 @@ def test_checkzonnesterkte_laag_laag(mock_adddb, mock_leesdb, mock_schakeluit, m
   assert mock_haalzonnesterkte.call_count == 1
   assert mock_schakelaan.call_count == 0
   assert mock_schakeluit.call_count == 0
-  assert mock_leesdb.call_count == 5
-  assert mock_adddb.call_count == 1
+  assert mock_leesdb.call_count == 1
+  assert mock_wijzig.call_count == 1
 
 
 @patch('thuis.haalzonnesterkteuitdb', return_value=390)
 @patch('thuis.haalzonnesterkte', return_value=500)
 @patch('thuis.schakellampenaan')
 @patch('thuis.schakellampenuit')
-@patch('pysondb.db.JsonDatabase.getByQuery',
-       side_effect=[[{'env': 'zonsterktelampen', 'value': 300, 'id': 9712382}],
-                    [{'env': 'zonsterktelampenuit', 'value': 400, 'id': 9712382}],
-                    [{'env': 'starttijd', 'value': 9, 'id': 13287633}],
-                    [{'env': 'eindtijd', 'value': 23, 'id': 92379283}],
-                    [],
-                    ])
-@patch('pysondb.db.JsonDatabase.add')
+@patch('gegevens.Gegevens.snapshot',
+       return_value={'zonsterktelampen': 300,
+                     'zonsterktelampenuit': 400,
+                     'starttijd': 9,
+                     'eindtijd': 23})
+@patch('gegevens.Gegevens.wijzig')
 @freeze_time("2025-05-17 17:01:02")
-def test_checkzonnesterkte_laag_hoog(mock_adddb, mock_leesdb, mock_schakeluit, mock_schakelaan, mock_haalzonnesterkte,
+def test_checkzonnesterkte_laag_hoog(mock_wijzig, mock_leesdb, mock_schakeluit, mock_schakelaan, mock_haalzonnesterkte,
                                      mock_haaluitdb):
   thuis.checkzonnesterkte()
 
@@ -316,24 +332,22 @@ def test_checkzonnesterkte_laag_hoog(mock_adddb, mock_leesdb, mock_schakeluit, m
   assert mock_haalzonnesterkte.call_count == 1
   assert mock_schakelaan.call_count == 0
   assert mock_schakeluit.call_count == 1
-  assert mock_leesdb.call_count == 5
-  assert mock_adddb.call_count == 1
+  assert mock_leesdb.call_count == 1
+  assert mock_wijzig.call_count == 1
 
 
 @patch('thuis.haalzonnesterkteuitdb', return_value=390)
 @patch('thuis.haalzonnesterkte', return_value=400)
 @patch('thuis.schakellampenaan')
 @patch('thuis.schakellampenuit')
-@patch('pysondb.db.JsonDatabase.getByQuery',
-       side_effect=[[{'env': 'zonsterktelampen', 'value': 300, 'id': 9712382}],
-                    [{'env': 'zonsterktelampenuit', 'value': 400, 'id': 9712382}],
-                    [{'env': 'starttijd', 'value': 9, 'id': 13287633}],
-                    [{'env': 'eindtijd', 'value': 23, 'id': 92379283}],
-                    [],
-                    ])
-@patch('pysondb.db.JsonDatabase.add')
+@patch('gegevens.Gegevens.snapshot',
+       return_value={'zonsterktelampen': 300,
+                     'zonsterktelampenuit': 400,
+                     'starttijd': 9,
+                     'eindtijd': 23})
+@patch('gegevens.Gegevens.wijzig')
 @freeze_time("2025-05-17 17:01:02")
-def test_checkzonnesterkte_laag_hoog_grens(mock_adddb, mock_leesdb, mock_schakeluit, mock_schakelaan,
+def test_checkzonnesterkte_laag_hoog_grens(mock_wijzig, mock_leesdb, mock_schakeluit, mock_schakelaan,
                                            mock_haalzonnesterkte,
                                            mock_haaluitdb):
   thuis.checkzonnesterkte()
@@ -342,24 +356,22 @@ def test_checkzonnesterkte_laag_hoog_grens(mock_adddb, mock_leesdb, mock_schakel
   assert mock_haalzonnesterkte.call_count == 1
   assert mock_schakelaan.call_count == 0
   assert mock_schakeluit.call_count == 1
-  assert mock_leesdb.call_count == 5
-  assert mock_adddb.call_count == 1
+  assert mock_leesdb.call_count == 1
+  assert mock_wijzig.call_count == 1
 
 
 @patch('thuis.haalzonnesterkteuitdb', return_value=600)
 @patch('thuis.haalzonnesterkte', return_value=400)
 @patch('thuis.schakellampenaan')
 @patch('thuis.schakellampenuit')
-@patch('pysondb.db.JsonDatabase.getByQuery',
-       side_effect=[[{'env': 'zonsterktelampen', 'value': 400, 'id': 9712382}],
-                    [{'env': 'zonsterktelampenuit', 'value': 400, 'id': 9712382}],
-                    [{'env': 'starttijd', 'value': 15, 'id': 13287633}],
-                    [{'env': 'eindtijd', 'value': 23, 'id': 92379283}],
-                    [],
-                    ])
-@patch('pysondb.db.JsonDatabase.add')
+@patch('gegevens.Gegevens.snapshot',
+       return_value={'zonsterktelampen': 400,
+                     'zonsterktelampenuit': 400,
+                     'starttijd': 15,
+                     'eindtijd': 23})
+@patch('gegevens.Gegevens.wijzig')
 @freeze_time("2025-05-17 14:34:56")
-def test_checkzonnesterkte_vroeg(mock_adddb, mock_leesdb, mock_schakeluit, mock_schakelaan, mock_haalzonnesterkte,
+def test_checkzonnesterkte_vroeg(mock_wijzig, mock_leesdb, mock_schakeluit, mock_schakelaan, mock_haalzonnesterkte,
                                  mock_haaluitdb):
   thuis.checkzonnesterkte()
 
@@ -367,24 +379,21 @@ def test_checkzonnesterkte_vroeg(mock_adddb, mock_leesdb, mock_schakeluit, mock_
   assert mock_haalzonnesterkte.call_count == 1
   assert mock_schakelaan.call_count == 0
   assert mock_schakeluit.call_count == 0
-  assert mock_leesdb.call_count == 5
-  assert mock_adddb.call_count == 1
+  assert mock_leesdb.call_count == 1
+  assert mock_wijzig.call_count == 1
 
 
 @patch('thuis.haalzonnesterkteuitdb', return_value=600)
 @patch('thuis.haalzonnesterkte', return_value=400)
 @patch('thuis.schakellampenaan')
 @patch('thuis.schakellampenuit')
-@patch('pysondb.db.JsonDatabase.getByQuery',
-       side_effect=[[{'env': 'zonsterktelampen', 'value': 400, 'id': 9712382}],
-                    [{'env': 'zonsterktelampenuit', 'value': 400, 'id': 9712382}],
-                    [],
-                    [{'env': 'eindtijd', 'value': 23, 'id': 92379283}],
-                    [],
-                    ])
-@patch('pysondb.db.JsonDatabase.add')
+@patch('gegevens.Gegevens.snapshot',
+       return_value={'zonsterktelampen': 400,
+                     'zonsterktelampenuit': 400,
+                     'eindtijd': 23})
+@patch('gegevens.Gegevens.wijzig')
 @freeze_time("2025-05-17 08:34:56")
-def test_checkzonnesterkte_vroeg_default(mock_adddb, mock_leesdb, mock_schakeluit, mock_schakelaan,
+def test_checkzonnesterkte_vroeg_default(mock_wijzig, mock_leesdb, mock_schakeluit, mock_schakelaan,
                                          mock_haalzonnesterkte, mock_haaluitdb):
   thuis.checkzonnesterkte()
 
@@ -392,24 +401,22 @@ def test_checkzonnesterkte_vroeg_default(mock_adddb, mock_leesdb, mock_schakelui
   assert mock_haalzonnesterkte.call_count == 1
   assert mock_schakelaan.call_count == 0
   assert mock_schakeluit.call_count == 0
-  assert mock_leesdb.call_count == 5
-  assert mock_adddb.call_count == 1
+  assert mock_leesdb.call_count == 1
+  assert mock_wijzig.call_count == 1
 
 
 @patch('thuis.haalzonnesterkteuitdb', return_value=600)
 @patch('thuis.haalzonnesterkte', return_value=400)
 @patch('thuis.schakellampenaan')
 @patch('thuis.schakellampenuit')
-@patch('pysondb.db.JsonDatabase.getByQuery',
-       side_effect=[[{'env': 'zonsterktelampen', 'value': 400, 'id': 9712382}],
-                    [{'env': 'zonsterktelampenuit', 'value': 400, 'id': 9712382}],
-                    [{'env': 'starttijd', 'value': 9, 'id': 13287633}],
-                    [{'env': 'eindtijd', 'value': 20, 'id': 92379283}],
-                    [],
-                    ])
-@patch('pysondb.db.JsonDatabase.add')
+@patch('gegevens.Gegevens.snapshot',
+       return_value={'zonsterktelampen': 400,
+                     'zonsterktelampenuit': 400,
+                     'starttijd': 9,
+                     'eindtijd': 20})
+@patch('gegevens.Gegevens.wijzig')
 @freeze_time("2025-05-17 21:45:12")
-def test_checkzonnesterkte_laat(mock_adddb, mock_leesdb, mock_schakeluit, mock_schakelaan, mock_haalzonnesterkte,
+def test_checkzonnesterkte_laat(mock_wijzig, mock_leesdb, mock_schakeluit, mock_schakelaan, mock_haalzonnesterkte,
                                 mock_haaluitdb):
   thuis.checkzonnesterkte()
 
@@ -417,24 +424,21 @@ def test_checkzonnesterkte_laat(mock_adddb, mock_leesdb, mock_schakeluit, mock_s
   assert mock_haalzonnesterkte.call_count == 1
   assert mock_schakelaan.call_count == 0
   assert mock_schakeluit.call_count == 0
-  assert mock_leesdb.call_count == 5
-  assert mock_adddb.call_count == 1
+  assert mock_leesdb.call_count == 1
+  assert mock_wijzig.call_count == 1
 
 
 @patch('thuis.haalzonnesterkteuitdb', return_value=600)
 @patch('thuis.haalzonnesterkte', return_value=400)
 @patch('thuis.schakellampenaan')
 @patch('thuis.schakellampenuit')
-@patch('pysondb.db.JsonDatabase.getByQuery',
-       side_effect=[[{'env': 'zonsterktelampen', 'value': 400, 'id': 9712382}],
-                    [{'env': 'zonsterktelampenuit', 'value': 400, 'id': 9712382}],
-                    [{'env': 'starttijd', 'value': 9, 'id': 13287633}],
-                    [],
-                    [],
-                    ])
-@patch('pysondb.db.JsonDatabase.add')
+@patch('gegevens.Gegevens.snapshot',
+       return_value={'zonsterktelampen': 400,
+                     'zonsterktelampenuit': 400,
+                     'starttijd': 9})
+@patch('gegevens.Gegevens.wijzig')
 @freeze_time("2025-05-17 23:45:12")
-def test_checkzonnesterkte_laat_default(mock_adddb, mock_leesdb, mock_schakeluit, mock_schakelaan,
+def test_checkzonnesterkte_laat_default(mock_wijzig, mock_leesdb, mock_schakeluit, mock_schakelaan,
                                         mock_haalzonnesterkte, mock_haaluitdb):
   thuis.checkzonnesterkte()
 
@@ -442,18 +446,16 @@ def test_checkzonnesterkte_laat_default(mock_adddb, mock_leesdb, mock_schakeluit
   assert mock_haalzonnesterkte.call_count == 1
   assert mock_schakelaan.call_count == 0
   assert mock_schakeluit.call_count == 0
-  assert mock_leesdb.call_count == 5
-  assert mock_adddb.call_count == 1
+  assert mock_leesdb.call_count == 1
+  assert mock_wijzig.call_count == 1
 
 
 @patch('thuis.verstuurberichtmonitoring')
 @patch('thuis.zetlampaan')
-@patch('pysondb.db.JsonDatabase.getByQuery',
-       side_effect=[
-         [{'env': 'lampen', 'value': [{"id": "dummyid1", "naam": "Lampnaam1", "volgorde": 11, "automatisch": True},
-                                      {"id": "dummyid2", "naam": "Lampnaam2", "volgorde": 22, "automatisch": False}],
-           'id': 92734098234}],
-       ])
+@patch('gegevens.Gegevens.lees',
+       side_effect=[[{'id': 'dummyid1', 'naam': 'Lampnaam1', 'volgorde': 11, 'automatisch': True},
+                     {'id': 'dummyid2', 'naam': 'Lampnaam2', 'volgorde': 22, 'automatisch': False}],
+                    ])
 def test_schakellampenaan(mock_db, mock_lampaan, mock_bericht):
   thuis.schakellampenaan(654, 321)
 
@@ -464,12 +466,10 @@ def test_schakellampenaan(mock_db, mock_lampaan, mock_bericht):
 
 @patch('thuis.verstuurberichtmonitoring')
 @patch('thuis.zetlampaan')
-@patch('pysondb.db.JsonDatabase.getByQuery',
-       side_effect=[
-         [{'env': 'lampen', 'value': [{"id": "dummyid1", "naam": "Lampnaam1", "volgorde": 11, "automatisch": False},
-                                      {"id": "dummyid2", "naam": "Lampnaam2", "volgorde": 22, "automatisch": False}],
-           'id': 92734098234}],
-       ])
+@patch('gegevens.Gegevens.lees',
+       side_effect=[[{'id': 'dummyid1', 'naam': 'Lampnaam1', 'volgorde': 11, 'automatisch': False},
+                     {'id': 'dummyid2', 'naam': 'Lampnaam2', 'volgorde': 22, 'automatisch': False}],
+                    ])
 def test_schakellampenaan_minder(mock_db, mock_lampaan, mock_bericht):
   thuis.schakellampenaan(654, 321)
 
@@ -480,12 +480,10 @@ def test_schakellampenaan_minder(mock_db, mock_lampaan, mock_bericht):
 
 @patch('thuis.verstuurberichtmonitoring')
 @patch('thuis.zetlampuit')
-@patch('pysondb.db.JsonDatabase.getByQuery',
-       side_effect=[
-         [{'env': 'lampen', 'value': [{"id": "dummyid1", "naam": "Lampnaam1", "volgorde": 11, "automatisch": True},
-                                      {"id": "dummyid2", "naam": "Lampnaam2", "volgorde": 22, "automatisch": False}],
-           'id': 92734098234}],
-       ])
+@patch('gegevens.Gegevens.lees',
+       side_effect=[[{'id': 'dummyid1', 'naam': 'Lampnaam1', 'volgorde': 11, 'automatisch': True},
+                     {'id': 'dummyid2', 'naam': 'Lampnaam2', 'volgorde': 22, 'automatisch': False}],
+                    ])
 def test_schakellampenuit(mock_db, mock_lampuit, mock_bericht):
   thuis.schakellampenuit(123, 456)
 
@@ -496,12 +494,10 @@ def test_schakellampenuit(mock_db, mock_lampuit, mock_bericht):
 
 @patch('thuis.verstuurberichtmonitoring')
 @patch('thuis.zetlampuit')
-@patch('pysondb.db.JsonDatabase.getByQuery',
-       side_effect=[
-         [{'env': 'lampen', 'value': [{"id": "dummyid1", "naam": "Lampnaam1", "volgorde": 11, "automatisch": True},
-                                      {"id": "dummyid2", "naam": "Lampnaam2", "volgorde": 22, "automatisch": True}],
-           'id': 92734098234}],
-       ])
+@patch('gegevens.Gegevens.lees',
+       side_effect=[[{'id': 'dummyid1', 'naam': 'Lampnaam1', 'volgorde': 11, 'automatisch': True},
+                     {'id': 'dummyid2', 'naam': 'Lampnaam2', 'volgorde': 22, 'automatisch': True}],
+                    ])
 def test_schakellampenuit_meer(mock_db, mock_lampuit, mock_bericht):
   thuis.schakellampenuit(123, 456)
 
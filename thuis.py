@@ -1,41 +1,118 @@
 """ Besturing van apparatuur thuis """
 import _thread
-import colorsys
-import json
 import os
+import signal
+import sys
+import threading
+from concurrent.futures import Future
 from datetime import datetime
-from time import sleep
+from functools import partial
+from time import sleep, time
+from typing import Any, Callable, Mapping
 
 import requests
 import schedule
 import waitress
-from cachetools import cached, TTLCache
+from cachetools import cached, LRUCache, TTLCache
 from flask import Flask, render_template, request, redirect
 from requests import ReadTimeout, JSONDecodeError
 
 from gegevens import Gegevens
-from hue import Hue
-from somfy import Somfy
+from gelijktijdig import haalbinnentijd
+from historie import Tijdreeks
+from hue import Hue, LampActie
+from kleur import bepaalhexrgbvanxylijst, bepaalxyvanrgb, Gamut, leesgamut
+from lampstatus import LampStatus
+from somfy import leesstand, LICHTSTERKTE, SCHERMSTAND, Somfy, SomfyPod
+from verwachting import Verwachting
 
 app = Flask(__name__,
             static_url_path='/static',
             template_folder='templates')
-envdb = Gegevens('envdb.json')
-zondb = Gegevens('zonnesterkte.json')
+opslag = os.environ.get('THUIS_OPSLAG', 'json')
+# De map met de bestanden van de gegevens, in docker als volume gekoppeld
+datamap = os.environ.get('THUIS_DATA', '.')
+envdb = Gegevens(os.path.join(datamap, 'envdb.json'), opslag)
+# De zonnesterkte wordt elke 2 minuten gemeten, bewaar die hoogstens elke 20 minuten
+zondb = Gegevens(os.path.join(datamap, 'zonnesterkte.json'),
+                 os.environ.get('THUIS_OPSLAG_ZON', opslag),
+                 uitgesteld=('zonnesterkte',), interval=1200)
+# Per periode de lengte en het interval van de samenvatting in seconden
+historieperiodes = {'dag': (86400, 600),
+                    'week': (7 * 86400, 3600),
+                    'maand': (31 * 86400, 4 * 3600)}
 weercache = TTLCache(maxsize=1, ttl=900)
 zonnesterktecache = TTLCache(maxsize=1, ttl=60)
 monitoringcache = TTLCache(maxsize=1, ttl=86400)
+huecache = LRUCache(maxsize=2)
+somfycache = LRUCache(maxsize=2)
+# Het aantal lampen dat tegelijk een opdracht krijgt
+lampengelijktijdig = int(os.environ.get('THUIS_LAMPEN_GELIJKTIJDIG', '4'))
+# Seconden dat de schermenpagina samen wacht op de standen van de schermen en de wind
+schermenwachttijd = float(os.environ.get('THUIS_SCHERMEN_WACHTTIJD', '3'))
 
 
-def gethue() -> Hue | None:
+@cached(cache={}, lock=threading.Lock())
+def getzonhistorie() -> Tijdreeks:
+  """ De historie van de zonnesterkte, bij het eerste gebruik geopend of aangemaakt
+  Returns: Tijdreeks: De historie uit THUIS_HISTORIE, standaard in de datamap
+  """
+  return Tijdreeks(os.environ.get('THUIS_HISTORIE', os.path.join(datamap, 'zonnesterkte.historie')))
+
+
+@cached(cache=huecache, lock=threading.Lock())
+def maakhue(hueip: str, hueuser: str) -> Hue:
+  """ Maak een verbinding met de hue, eenmalig per bridge en gebruiker
+  :param hueip: Het IP-adres van de Hue bridge
+  :param hueuser: De geautoriseerde gebruiker
+  :returns: object naar hue
+  """
+  return Hue(hueip, hueuser, lampengelijktijdig)
+
+
+def gethue(instellingen: Mapping[str, Any] | None = None) -> Hue | None:
   """ Maak een verbinding met de hue
+  :param instellingen: De al gelezen instellingen, anders worden ze gelezen
   :returns: object naar hue
   """
-  hueip = envdb.lees('hueip')
-  hueuser = envdb.lees('hueuser')
+  if instellingen is None:
+    instellingen = envdb.snapshot()
+  hueip = instellingen.get('hueip')
+  hueuser = instellingen.get('hueuser')
   if not hueip or not hueuser:
     return None
-  return Hue(hueip, hueuser)
+  return maakhue(hueip, hueuser)
+
+
+@cached(cache=somfycache, lock=threading.Lock())
+def maaksomfy(pod: str, token: str) -> SomfyPod:
+  """ Maak een verbinding met het somfy kastje, eenmalig per pod en token
+  :param pod: De pod-identificatie
+  :param token: Een geldig token
+  :returns: object naar het kastje
+  """
+  return SomfyPod(pod, token)
+
+
+def getsomfy(instellingen: Mapping[str, Any] | None = None) -> SomfyPod | None:
+  """ Maak een verbinding met het somfy kastje
+  :param instellingen: De al gelezen instellingen, anders worden ze gelezen
+  :returns: object naar het kastje of None als pod of token ontbreekt
+  """
+  if instellingen is None:
+    instellingen = envdb.snapshot()
+  pod = instellingen.get('pod')
+  token = instellingen.get('token')
+  if not pod or not token:
+    return None
+  return maaksomfy(pod, token)
+
+
+# Status van de lampen uit de eventstream, bijgehouden zodra de thread gestart is
+lampstatus = LampStatus(gethue)
+# Verwachte toestand na een opdracht; schermen hebben tijd nodig om te bewegen
+lampverwachting = Verwachting(duur=10)
+schermverwachting = Verwachting(duur=60)
 
 
 def haalinstellingenentoon():
@@ -43,16 +120,11 @@ def haalinstellingenentoon():
       Wanneer er gegevens missen, redirect naar hoofdpagina
   Returns: Template: De instellingen-pagina of een redirect
   """
-  pod = envdb.lees('pod')
-  jsessionid = envdb.lees('jsessionid')
-  hueip = envdb.lees('hueip')
-  hueuser = envdb.lees('hueuser')
-  userid = envdb.lees('userid')
-  password = envdb.lees('password')
-  zonsterktelampenaan = envdb.leesint('zonsterktelampen', 400)
-  zonsterktelampenuit = envdb.leesint('zonsterktelampenuit', 600)
-  starttijd = envdb.leesint('starttijd', 9)
-  eindtijd = envdb.leesint('eindtijd', 23)
+  instellingen = envdb.snapshot()
+  pod = instellingen.get('pod')
+  jsessionid = instellingen.get('jsessionid')
+  userid = instellingen.get('userid')
+  password = instellingen.get('password')
   if not jsessionid and userid and password:
     jsessionid = Somfy.login(userid, password)
     envdb.wijzig('jsessionid', jsessionid)
@@ -72,97 +144,107 @@ def haalinstellingenentoon():
                      })
   return render_template('instellingen.html',
                          tokens=tokens,
-                         hueip=hueip,
-                         hueuser=hueuser,
+                         hueip=instellingen.get('hueip'),
+                         hueuser=instellingen.get('hueuser'),
                          pod=pod,
                          userid=userid,
                          password=password,
                          jsessionid=jsessionid,
-                         gridbreedte=envdb.lees('gridbreedte'),
-                         gridhoogte=envdb.lees('gridhoogte'),
-                         zonsterktelampenaan=zonsterktelampenaan,
-                         zonsterktelampenuit=zonsterktelampenuit,
-                         starttijd=starttijd,
-                         eindtijd=eindtijd,
+                         gridbreedte=instellingen.get('gridbreedte'),
+                         gridhoogte=instellingen.get('gridhoogte'),
+                         zonsterktelampenaan=instellingen.get('zonsterktelampen') or 400,
+                         zonsterktelampenuit=instellingen.get('zonsterktelampenuit') or 600,
+                         starttijd=instellingen.get('starttijd') or 9,
+                         eindtijd=instellingen.get('eindtijd') or 23,
                          )
 
 
-def haalschermen(pod: str, token: str) -> list:
-  """ Ophalen van de schermen en in de db zetten
-  Args: pod (str): De pod-identificatie
-        token (str): Een geldig token
-  Returns: list: Lijst met gevonden schermen
+def haalsetup(somfy: SomfyPod) -> dict:
+  """ Ophalen van de setup van het kastje
+      Bij een andere setupversie worden de schermen en zonnesensors in de db herschreven
+  Args: somfy (SomfyPod): Het kastje
+  Returns: dict: Per deviceURL het apparaat, of de fout van het kastje
   """
-  schermlijst = Somfy.haalschermen(pod, token)
-  envdb.schrijf('schermen', schermlijst)
-  return schermlijst
-
-
-def haalzonnesensors(pod: str, token: str) -> list:
-  """ Ophalen van de zonnesensors en in de db zetten
-  Args: pod (str): De pod-identificatie
-        token (str): Een geldig token
-  Returns: list: Lijst met gevonden zonnesensors
-  """
-  sensorlijst = Somfy.haalzonnesensors(pod, token)
-  envdb.schrijf('sensors', sensorlijst)
-  return sensorlijst
+  versie = somfy.setupversie
+  setup = somfy.haalsetup()
+  if somfy.setupversie != versie:
+    with envdb.transactie():
+      envdb.schrijf('schermen', somfy.haalschermen())
+      envdb.schrijf('sensors', somfy.haalzonnesensors())
+  return setup
 
 
 def haalschermenentoon():
   """ Haal de status van de schermen toon deze
+      De schermen en hun standen komen uit een setup van het kastje, die
+      gelijktijdig met de windsnelheid wordt opgehaald. Wat niet binnen
+      schermenwachttijd binnen is wordt als onbekend getoond.
       Wanneer er gegevens missen, redirect naar hoofdpagina
   Returns: Template: De schermen-pagina of een redirect
   """
-  pod = envdb.lees('pod')
-  token = envdb.lees('token')
-  if not pod or not token:
+  instellingen = envdb.snapshot()
+  somfy = getsomfy(instellingen)
+  if somfy is None:
     return redirect('/thuis')
-  envschermen = envdb.lees('schermen')
-  if not envschermen:
-    envschermen = haalschermen(pod, token)
-  schermen = []
-  for scherm in envschermen:
-    schermstate = Somfy.haalschermstatus(pod, token, scherm['device'])
+  envschermen = instellingen.get('schermen') or []
+  schermstates = bekendeschermstates(envschermen)
+  opdrachten = {'windsnelheid': haalwindsnelheid}
+  if not envschermen or None in schermstates.values():
+    opdrachten['setup'] = partial(haalsetup, somfy)
+  opgehaald = haalbinnentijd(opdrachten, schermenwachttijd)
+  setup = opgehaald.get('setup')
+  if setup is not None and setup.get('error', None) is None:
+    envschermen = somfy.haalschermen()
+  standen = {scherm['device']: None if setup is None else
+             leesstand(setup, scherm['device'], SCHERMSTAND)
+             for scherm in envschermen if schermstates.get(scherm['device']) is None}
+  return toonschermen(envschermen, schermstates, standen, opgehaald['windsnelheid'])
+
+
+def toonschermen(envschermen: list, schermstates: dict, opgehaald: dict, windbft: int | None):
+  """ Bewaar de opgehaalde standen en toon de schermen
+      Wanneer het kastje een fout geeft, redirect naar hoofdpagina
+  Args: envschermen (list): De schermen uit de db
+        schermstates (dict): Per scherm de bekende stand
+        opgehaald (dict): Per opgehaald scherm de stand, None als die onbekend is
+        windbft (int): De windsnelheid in Beaufort, None als die onbekend is
+  Returns: Template: De schermen-pagina of een redirect
+  """
+  for device, schermstate in opgehaald.items():
     if isinstance(schermstate, dict) and not schermstate.get('error', None) is None:
       return redirect('/thuis')
-    schermen.append({'label': scherm['label'],
-                     'device': scherm['device'],
-                     'percentage': schermstate['value']
-                     })
-  windbft = haalwindsnelheid()
-  return render_template('schermen.html', schermen=schermen, windbft=windbft)
+    if schermstate is not None:
+      schermverwachting.bewaar(device, schermstate)
+  return render_template('schermen.html',
+                         schermen=maakschermen(envschermen, {**schermstates, **opgehaald}),
+                         windbft=windbft)
 
 
-def bepaalxyvanrgb(kleurwaarde: str) -> tuple[float, float, float]:
-  """ Bepaal de xy waarde vanuit rgb
-  Args: kleurwaarde (str): De kleur in RGB hexadecimaal formaat
-  Returns: tuple: h-waarde, s-waarde en brightness als decimale getallen
+def bekendeschermstates(envschermen: list) -> dict:
+  """ De standen van de schermen die niet opgehaald hoeven te worden
+      Direct na een opdracht zijn de kort geleden opgehaalde standen goed genoeg
+  Args: envschermen (list): De schermen uit de db
+  Returns: dict: Per scherm de bekende stand of None als die opgehaald moet worden
   """
-  rood = float(int(kleurwaarde[1:3], 16)) / 255.0
-  groen = float(int(kleurwaarde[3:5], 16)) / 255.0
-  blauw = float(int(kleurwaarde[5:7], 16)) / 255.0
-  hwaarde, swaarde, vwaarde = colorsys.rgb_to_hsv(rood, groen, blauw)
-  hwaarde = round(hwaarde, 2)
-  swaarde = round(swaarde, 2)
-  brightness = round(vwaarde * 100, 2)
-  return hwaarde, swaarde, brightness
+  uitcache = schermverwachting.verwachtvoor(scherm['device'] for scherm in envschermen)
+  return {scherm['device']: schermverwachting.bekend(scherm['device']) if uitcache else None
+          for scherm in envschermen}
 
 
-def bepaalhexrgbvanxy(xwaarde: float, ywaarde: float, dimwaarde: int) -> str:
-  """ Bepaal de rgb waarde vanuit de x/y/dim
-  Args: xwaarde (float): De x-coördinaat van de kleur
-        ywaarde (float): De y-coördinaat van de kleur
-        dimwaarde (int): De helderheid als percentage
-  Returns: str: De kleur in RGB hexadecimaal formaat
+def maakschermen(envschermen: list, schermstates: dict) -> list:
+  """ Maak de schermen voor de pagina
+  Args: envschermen (list): De schermen uit de db
+        schermstates (dict): Per scherm de opgehaalde stand, None als die onbekend is
+  Returns: list: De schermen met label, device en percentage, None als dat onbekend is
   """
-  vwaarde = float(dimwaarde / 100)
-  rood, groen, blauw = colorsys.hsv_to_rgb(xwaarde, ywaarde, vwaarde)
-  rwaarde = int(rood * 255.0)
-  gwaarde = int(groen * 255.0)
-  bwaarde = int(blauw * 255.0)
-  retvalue = f'#{rwaarde:02x}{gwaarde:02x}{bwaarde:02x}'
-  return retvalue
+  schermen = []
+  for scherm in envschermen:
+    schermstate = schermverwachting.pasaan(scherm['device'], schermstates[scherm['device']] or {})
+    schermen.append({'label': scherm['label'],
+                     'device': scherm['device'],
+                     'percentage': schermstate.get('value')
+                     })
+  return schermen
 
 
 def zetlampenindb(lampen: list) -> None:
@@ -170,53 +252,75 @@ def zetlampenindb(lampen: list) -> None:
   Args: lampen (list): Lijst met lampen om op te slaan
   """
   dblampen = []
-  gridbreedte = envdb.lees('gridbreedte')
-  if not gridbreedte:
-    gridbreedte = 3
-    envdb.schrijf('gridbreedte', gridbreedte)
-  gridhoogte = envdb.lees('gridhoogte')
-  if not gridhoogte:
-    gridhoogte = 4
-    envdb.schrijf('gridhoogte', gridhoogte)
-  volgordex = 1
-  volgordey = 1
-  for lamp in lampen:
-    lampenv = {'id': lamp.get('id'),
-               'naam': lamp.get('naam'),
-               'volgorde': volgordey * 10 + volgordex}
-    volgordex += 1
-    if volgordex > gridbreedte:
-      volgordex = 1
-      volgordey += 1
-    dblampen.append(lampenv)
-  envdb.schrijf('lampen', dblampen)
-
-
-def haallampen() -> list:
+  with envdb.transactie():
+    gridbreedte = envdb.lees('gridbreedte')
+    if not gridbreedte:
+      gridbreedte = 3
+      envdb.schrijf('gridbreedte', gridbreedte)
+    gridhoogte = envdb.lees('gridhoogte')
+    if not gridhoogte:
+      gridhoogte = 4
+      envdb.schrijf('gridhoogte', gridhoogte)
+    volgordex = 1
+    volgordey = 1
+    for lamp in lampen:
+      lampenv = {'id': lamp.get('id'),
+                 'naam': lamp.get('naam'),
+                 'volgorde': volgordey * 10 + volgordex}
+      volgordex += 1
+      if volgordex > gridbreedte:
+        volgordex = 1
+        volgordey += 1
+      dblampen.append(lampenv)
+    envdb.schrijf('lampen', dblampen)
+
+
+def haallampdata(bridge: Hue) -> dict:
+  """ Haal de status van alle lampen zoals de bridge die op 'light' geeft
+      Uit de eventstream als die gevolgd wordt. Anders, direct na een opdracht
+      voor een van de lampen, de kort geleden opgehaalde status. Anders van de bridge.
+  Args: bridge (Hue): De bridge
+  Returns: dict: 'errors' en 'data' met de lampen
+  """
+  lampdata = lampstatus.lampdata()
+  if lampdata is not None:
+    return lampdata
+  lampdata = lampverwachting.bekend('light')
+  if lampdata is not None and \
+      lampverwachting.verwachtvoor(lamp.get('id') for lamp in lampdata['data']):
+    return lampdata
+  lampdata = bridge.haalgegevens('light')
+  if not lampdata.get('errors'):
+    lampverwachting.bewaar('light', lampdata)
+  return lampdata
+
+
+def haallampen(instellingen: Mapping[str, Any] | None = None) -> list:
   """ Haal de status van de lampen
+      De status komt uit lampstatus als die actueel is, anders van de bridge.
       Wanneer er gegevens missen, geef een lege lijst terug
+  Args: instellingen (Mapping): De al gelezen instellingen, anders worden ze gelezen
   Returns: Template: De lampen-pagina of een redirect
   """
-  bridge = gethue()
+  if instellingen is None:
+    instellingen = envdb.snapshot()
+  bridge = gethue(instellingen)
   if bridge is None:
     return []
-  dblampen = envdb.lees('lampen')
+  dblampen = instellingen.get('lampen')
   lampen = []
-  lampdata = bridge.haalgegevens('light')
+  lampdata = haallampdata(bridge)
 
   if len(lampdata.get('errors', [])) != 0:
     return []
 
   for lamp in lampdata.get('data', {}):
+    lamp = lampverwachting.pasaan(lamp.get('id'), lamp)
     lampmetadata = lamp.get('metadata')
     dimwaarde = 100
     if lamp.get('dimming', None) is not None:
       dimwaarde = lamp.get('dimming').get('brightness')
     color = lamp.get('color', None)
-    rgbwaarde = '#000000'
-    if color is not None:
-      xywaarde = color.get('xy')
-      rgbwaarde = bepaalhexrgbvanxy(xywaarde.get('x'), xywaarde.get('y'), dimwaarde)
     if lamp.get('on').get('on'):
       status = 'Aan'
     else:
@@ -227,8 +331,14 @@ def haallampen() -> list:
                    'dimable': lamp.get('dimming', None) is not None,
                    'dimwaarde': dimwaarde,
                    'color': color,
-                   'rgbwaarde': rgbwaarde,
+                   'rgbwaarde': '#000000',
                    'status': status})
+  # De kleuren van alle lampen in een keer, lampen met dezelfde kleur worden eenmaal berekend
+  kleurlampen = [lamp for lamp in lampen if lamp['color'] is not None]
+  rgbwaarden = bepaalhexrgbvanxylijst((lamp['color']['xy']['x'], lamp['color']['xy']['y'],
+                                       lamp['dimwaarde']) for lamp in kleurlampen)
+  for lamp, rgbwaarde in zip(kleurlampen, rgbwaarden):
+    lamp['rgbwaarde'] = rgbwaarde
   if not dblampen:
     zetlampenindb(sorted(lampen, key=lambda x: x['naam']))
     dblampen = envdb.lees('lampen')
@@ -240,35 +350,83 @@ def haallampen() -> list:
   return lampen
 
 
-def verplaatsscherm(device: str, percentage: int) -> None:
+def zoekgroeplicht(resource: dict) -> str | None:
+  """ Zoek de grouped_light van een room, zone of bridge_home
+  Args: resource (dict): De resource van de bridge
+  Returns: str: Het ID van de grouped_light of None
+  """
+  for service in resource.get('services', []):
+    if service.get('rtype') == 'grouped_light':
+      return service.get('rid')
+  return None
+
+
+def haalgroepen(instellingen: Mapping[str, Any] | None = None) -> dict:
+  """ Haal de groepen lampen van de bridge
+      De groepen worden eenmalig opgehaald en in de gegevens bewaard.
+      Elke groep wordt met een grouped_light in een opdracht geschakeld.
+  Args: instellingen (Mapping): De al gelezen instellingen, anders worden ze gelezen
+  Returns: dict: 'huis' met de grouped_light van alle lampen en 'ruimtes' met
+                 per room en zone het ID van de grouped_light, de naam en de soort,
+                 leeg wanneer de bridge niet bereikbaar is of een fout geeft
+  """
+  if instellingen is None:
+    instellingen = envdb.snapshot()
+  groepen = instellingen.get('groepen')
+  if groepen is not None:
+    return groepen
+  bridge = gethue(instellingen)
+  if bridge is None:
+    return {}
+  try:
+    antwoorden = {soort: bridge.haalgegevens(soort) for soort in ['bridge_home', 'room', 'zone']}
+  except requests.RequestException as e:
+    print(f'Ophalen van de groepen mislukt: {e}')
+    return {}
+  fouten = [fout for antwoord in antwoorden.values() for fout in antwoord.get('errors') or []]
+  if fouten:
+    print(f'Ophalen van de groepen mislukt: {fouten}')
+    return {}
+  huizen = antwoorden['bridge_home'].get('data', [])
+  ruimtes = []
+  for soort in ['room', 'zone']:
+    for resource in antwoorden[soort].get('data', []):
+      groepid = zoekgroeplicht(resource)
+      if groepid:
+        ruimtes.append({'id': groepid,
+                        'naam': resource.get('metadata', {}).get('name'),
+                        'soort': soort})
+  groepen = {'huis': zoekgroeplicht(huizen[0]) if huizen else None,
+             'ruimtes': sorted(ruimtes, key=lambda x: x['naam'] or '')}
+  envdb.wijzig('groepen', groepen)
+  return groepen
+
+
+def verplaatsscherm(device: str, percentage: int, somfy: SomfyPod | None = None) -> None:
   """ Verplaats een scherm
+  De verwachte stand wordt getoond tot het scherm die bereikt heeft.
   Args: device (str): De device-URL van het scherm
         percentage (int): Het gewenste openingspercentage
+        somfy (SomfyPod): Het kastje, anders volgens de instellingen
   """
-  token = envdb.lees('token')
-  pod = envdb.lees('pod')
-  data = json.dumps({
-    "label": "verplaats scherm",
-    "actions": [
-      {"commands": [
-        {"name": "setClosure",
-         "parameters": [percentage]
-         }],
-        "deviceURL": device
-      }
-    ]
-  })
-  Somfy.stuurgegevens(token=token, pod=pod, path='exec/apply', data=data)
+  somfy = somfy or getsomfy()
+  if somfy is None:
+    return
+  antwoord = somfy.verplaats(device, percentage)
+  if not (isinstance(antwoord, dict) and antwoord.get('error')):
+    schermverwachting.verwacht(device, {'value': percentage})
 
 
 def verplaatsalleschermen(percentage: int) -> None:
   """ Verplaats alle schermen naar zelfde percentage
   Args: percentage (int): Het gewenste openingspercentage
   """
-  schermen = envdb.lees('schermen')
-  for scherm in schermen:
-    deviceid = scherm.get('device')
-    verplaatsscherm(deviceid, percentage)
+  instellingen = envdb.snapshot()
+  somfy = getsomfy(instellingen)
+  if somfy is None:
+    return
+  for scherm in instellingen.get('schermen') or []:
+    verplaatsscherm(scherm.get('device'), percentage, somfy)
 
 
 def sluitalles() -> None:
@@ -290,78 +448,162 @@ def verversschermen() -> None:
   Verwijdert de schermen uit de database zodat ze opnieuw worden opgehaald
   """
   envdb.verwijder('schermen')
+  somfy = getsomfy()
+  if somfy is not None:
+    somfy.vergeet()
 
 
-def doeactieoplamp(lampid: str, actie: dict) -> None:
+def doeactieoplamp(lampid: str, actie: LampActie) -> Future:
   """ voer een actie uit op een lamp
+  De actie gaat via de wachtrij van de bridge, zodat deze functie direct terugkeert.
+  De verwachte toestand wordt getoond tot de bridge die bevestigt.
   Args: lampid (str): Het ID van de lamp
-        actie (dict): De uit te voeren actie
+        actie (LampActie): De uit te voeren actie, in een verzoek verstuurd
+  Returns: Future: Klaar wanneer de actie verstuurd is
   """
   bridge = gethue()
-  path = f'light/{lampid}'
-  bridge.stuurgegevens(path, actie)
+  lampverwachting.verwacht(lampid, actie.data)
+  toekomst = bridge.plaatsactie(lampid, actie)
+
+  def mislukt(klaar: Future) -> None:
+    if klaar.exception() is not None:
+      lampverwachting.vergeet(lampid)
+
+  toekomst.add_done_callback(mislukt)
+  return toekomst
 
 
-def zetlampaanuit(lampid: str, status: bool) -> None:
+def zetlampaanuit(lampid: str, status: bool) -> Future:
   """ zet een lamp aan of uit
   Args: lampid (str): De ID van de lamp
         status (bool): True voor aan, False voor uit
+  Returns: Future: Klaar wanneer de actie verstuurd is
   """
-  actie = {'on': {'on': status}}
-  doeactieoplamp(lampid, actie)
+  return doeactieoplamp(lampid, LampActie().aan(status))
 
 
-def zetlampaan(lampid: str) -> None:
+def zetlampaan(lampid: str) -> Future:
   """ zet een lamp aan
   Args: lampid (str): De ID van de lamp
+  Returns: Future: Klaar wanneer de actie verstuurd is
   """
-  zetlampaanuit(lampid, True)
+  return zetlampaanuit(lampid, True)
 
 
-def zetlampuit(lampid: str) -> None:
+def zetlampuit(lampid: str) -> Future:
   """ zet een lamp uit
   Args: lampid (str): De ID van de lamp
+  Returns: Future: Klaar wanneer de actie verstuurd is
   """
-  zetlampaanuit(lampid, False)
+  return zetlampaanuit(lampid, False)
 
 
-def dimlamp(lampid: str, dimwaarde: float) -> None:
-  """ dim een lamp
+def dimlamp(lampid: str, dimwaarde: float) -> Future:
+  """ zet een lamp aan en dim deze
   Args: lampid (str): De ID van de lamp
         dimwaarde (float): De gewenste helderheid als percentage
+  Returns: Future: Klaar wanneer de actie verstuurd is
   """
-  zetlampaan(lampid)
-  actie = {'dimming': {'brightness': dimwaarde}}
-  doeactieoplamp(lampid, actie)
+  return doeactieoplamp(lampid, LampActie().aan().dim(dimwaarde))
 
 
-def kleurlamp(lampid: str, kleurwaarde: str) -> None:
-  """ verander de kleur van een lamp
+def haalgamut(lampid: str) -> Gamut | None:
+  """ Het kleurbereik van een lamp uit de bekende status van de lampen
+  Args: lampid (str): De ID van de lamp
+  Returns: Gamut: Het kleurbereik of None als de lamp of het kleurbereik niet bekend is
+  """
+  lampdata = lampstatus.lampdata() or lampverwachting.bekend('light') or {}
+  for lamp in lampdata.get('data', []):
+    if lamp.get('id') == lampid:
+      return leesgamut(lamp.get('color') or {})
+  return None
+
+
+def kleurlamp(lampid: str, kleurwaarde: str) -> Future:
+  """ zet een lamp aan en verander de kleur en helderheid
   Args: lampid (str): De ID van de lamp
         kleurwaarde (str): De gewenste kleur in RGB hexadecimaal formaat
+  Returns: Future: Klaar wanneer de actie verstuurd is
+  """
+  xwaarde, ywaarde, brightness = bepaalxyvanrgb(kleurwaarde, haalgamut(lampid))
+  return doeactieoplamp(lampid, LampActie().aan().dim(brightness).kleur(xwaarde, ywaarde))
+
+
+def doeactieopgroep(groepid: str, actie: LampActie) -> Future:
+  """ voer een actie in een keer uit op alle lampen van een groep
+  De actie gaat via de wachtrij van de bridge, zodat deze functie direct terugkeert.
+  Args: groepid (str): Het ID van de grouped_light
+        actie (LampActie): De uit te voeren actie
+  Returns: Future: Klaar wanneer de actie verstuurd is
+  """
+  bridge = gethue()
+  return bridge.plaatsactie(groepid, actie, 'grouped_light')
+
+
+def zetgroepaanuit(groepid: str, status: bool) -> Future:
+  """ zet een groep lampen aan of uit
+  Args: groepid (str): Het ID van de grouped_light
+        status (bool): True voor aan, False voor uit
+  Returns: Future: Klaar wanneer de actie verstuurd is
   """
-  xwaarde, ywaarde, brightness = bepaalxyvanrgb(kleurwaarde)
-  dimlamp(lampid, brightness)
-  actie = {'color': {'xy': {'x': xwaarde, 'y': ywaarde}}}
-  doeactieoplamp(lampid, actie)
+  return doeactieopgroep(groepid, LampActie().aan(status))
 
 
-def allelampenuit() -> None:
+def dimgroep(groepid: str, dimwaarde: float) -> Future:
+  """ zet een groep lampen aan en dim deze
+  Args: groepid (str): Het ID van de grouped_light
+        dimwaarde (float): De gewenste helderheid als percentage
+  Returns: Future: Klaar wanneer de actie verstuurd is
+  """
+  return doeactieopgroep(groepid, LampActie().aan().dim(dimwaarde))
+
+
+def voeruitoplampen(lampids: list[str],
+                    opdracht: Callable[[str], Future | None]) -> dict[str, Exception | None]:
+  """ Voer een opdracht gelijktijdig uit op meerdere lampen
+  Alle opdrachten worden eerst in de wachtrij van de bridge geplaatst, die er
+  hoogstens lampengelijktijdig tegelijk verstuurt. Daarna wordt op de Futures
+  gewacht. Fouten worden gemeld maar houden de andere lampen niet tegen.
+  Args: lampids (list): De ID's van de lampen
+        opdracht (Callable): De opdracht met het ID van een lamp als argument
+  Returns: dict: Per lamp None of de opgetreden fout
+  """
+  taken: dict[str, Future | Exception | None] = {}
+  for lampid in lampids:
+    try:
+      taken[lampid] = opdracht(lampid)
+    except Exception as e:  # pylint: disable=broad-exception-caught
+      taken[lampid] = e
+  resultaten = {lampid: taak.exception() if isinstance(taak, Future) else taak
+                for lampid, taak in taken.items()}
+  for lampid, fout in resultaten.items():
+    if fout is not None:
+      print(f'Opdracht voor lamp {lampid} mislukt: {fout}')
+  return resultaten
+
+
+def allelampenuit() -> dict[str, Exception | None]:
   """ Alle lampen uit
-  Zet alle bekende lampen uit
+  Zet alle lampen met de grouped_light van het huis in een opdracht uit.
+  Zonder die groep, of als dat mislukt, worden alle bekende lampen gelijktijdig uitgezet.
+  Returns: dict: Per lamp of groep None of de opgetreden fout
   """
-  lampen = envdb.lees('lampen')
-  for lamp in lampen:
-    lampid = lamp.get('id')
-    zetlampuit(lampid)
+  huis = haalgroepen().get('huis')
+  if huis:
+    resultaten = voeruitoplampen([huis], lambda groepid: zetgroepaanuit(groepid, False))
+    if resultaten[huis] is None:
+      return resultaten
+  lampen = envdb.lees('lampen') or []
+  return voeruitoplampen([lamp.get('id') for lamp in lampen], zetlampuit)
 
 
 def ververslampen() -> None:
   """ Ververs de opgeslagen lampen 
 
-  Verwijdert de lampen uit de database zodat ze opnieuw worden opgehaald
+  Verwijdert de lampen en groepen uit de database zodat ze opnieuw worden opgehaald
   """
   envdb.verwijder('lampen')
+  envdb.verwijder('groepen')
 
 
 @cached(cache=weercache)
@@ -426,9 +668,9 @@ def schakellampenaan(vorigesterkte: int, zonnesterkte: int):
         zonnesterkte (int): De huidige zonnesterkte
   """
   verstuurberichtmonitoring(f'Zonnesterkte van {vorigesterkte} naar {zonnesterkte}, lampen aan!')
-  for lamp in envdb.lees('lampen'):
-    if lamp.get('automatisch', False):
-      zetlampaan(lamp.get('id'))
+  lampids = [lamp.get('id') for lamp in envdb.lees('lampen') or []
+             if lamp.get('automatisch', False)]
+  voeruitoplampen(lampids, zetlampaan)
 
 
 def schakellampenuit(vorigesterkte: int, zonnesterkte: int):
@@ -437,9 +679,9 @@ def schakellampenuit(vorigesterkte: int, zonnesterkte: int):
         zonnesterkte (int): De huidige zonnesterkte
   """
   verstuurberichtmonitoring(f'Zonnesterkte van {vorigesterkte} naar {zonnesterkte}, lampen uit!')
-  for lamp in envdb.lees('lampen'):
-    if lamp.get('automatisch', False):
-      zetlampuit(lamp.get('id'))
+  lampids = [lamp.get('id') for lamp in envdb.lees('lampen') or []
+             if lamp.get('automatisch', False)]
+  voeruitoplampen(lampids, zetlampuit)
 
 
 def checkzonnesterkte() -> None:
@@ -448,16 +690,19 @@ def checkzonnesterkte() -> None:
   """
   vorigesterkte = haalzonnesterkteuitdb()
   zonnesterkte = haalzonnesterkte()
-  zonsterktelampenaan = envdb.leesint('zonsterktelampen', 400)
-  zonsterktelampenuit = envdb.leesint('zonsterktelampenuit', 600)
-  starttijd = envdb.leesint('starttijd', 9)
-  eindtijd = envdb.leesint('eindtijd', 23)
+  instellingen = envdb.snapshot()
+  zonsterktelampenaan = instellingen.get('zonsterktelampen') or 400
+  zonsterktelampenuit = instellingen.get('zonsterktelampenuit') or 600
+  starttijd = instellingen.get('starttijd') or 9
+  eindtijd = instellingen.get('eindtijd') or 23
   tijd = datetime.now()
   if zonnesterkte <= zonsterktelampenaan < vorigesterkte and starttijd <= tijd.hour < eindtijd:
     schakellampenaan(vorigesterkte, zonnesterkte)
   if vorigesterkte < zonsterktelampenuit <= zonnesterkte and starttijd <= tijd.hour < eindtijd:
     schakellampenuit(vorigesterkte, zonnesterkte)
   zondb.wijzig('zonnesterkte', zonnesterkte)
+  if zonnesterkte >= 0:
+    getzonhistorie().voegtoe(int(time()), zonnesterkte)
 
 
 @cached(cache=zonnesterktecache)
@@ -465,35 +710,60 @@ def haalzonnesterkte() -> int:
   """ Haal de zonnesterkte op
   Returns: int: De gemeten zonnesterkte of een negatieve waarde bij een fout
   """
-  token = envdb.lees('token')
-  pod = envdb.lees('pod')
-  if not token or not pod:
+  instellingen = envdb.snapshot()
+  somfy = getsomfy(instellingen)
+  if somfy is None:
     return -1
-  sensors = envdb.lees('sensors')
-  if not sensors:
-    sensors = haalzonnesensors(pod, token)
-  for sensor in sensors:
-    sensorwaarde = Somfy.haalsensorstatus(pod, token, sensor['device'])
-    if isinstance(sensorwaarde, dict) and not sensorwaarde.get('error', None) is None:
-      return -2
-    return sensorwaarde.get('value', -3)
+  setup = haalsetup(somfy)
+  if not setup.get('error', None) is None:
+    return zonnesterktevan(setup)
+  for sensor in somfy.haalzonnesensors():
+    return zonnesterktevan(leesstand(setup, sensor['device'], LICHTSTERKTE) or {})
   return -4
 
 
+def zonnesterktevan(sensorwaarde: dict) -> int:
+  """ Bepaal de zonnesterkte uit de status van een sensor
+  Args: sensorwaarde (dict): De status van de sensor
+  Returns: int: De gemeten zonnesterkte of een negatieve waarde bij een fout
+  """
+  if isinstance(sensorwaarde, dict) and not sensorwaarde.get('error', None) is None:
+    return -2
+  return sensorwaarde.get('value', -3)
+
+
 @app.route('/thuis', methods=['GET'])
 def thuispagina():
   """ Toon de hoofdpagina
   Returns: Template: De hoofdpagina met knoppen voor lampen en schermen.
   """
-  lampen = haallampen()
+  instellingen = envdb.snapshot()
+  lampen = haallampen(instellingen)
   return render_template('hoofdpagina.html',
                          lampen=sorted(lampen, key=lambda x: x['naam']),
-                         gridbreedte=envdb.lees('gridbreedte'),
-                         gridhoogte=envdb.lees('gridhoogte'),
+                         gridbreedte=instellingen.get('gridbreedte') or 3,
+                         gridhoogte=instellingen.get('gridhoogte') or 4,
                          zonnesterkte=haalzonnesterkte(),
                          )
 
 
+@app.route('/thuis/zonnesterkte/historie', methods=['GET'])
+def zonnesterktehistoriepagina():
+  """ Geef de historie van de zonnesterkte samengevat per interval
+  Returns: dict: De periode, het interval en per interval het gemiddelde, minimum en maximum
+  """
+  periode = request.args.get('periode', 'dag')
+  if periode not in historieperiodes:
+    return {'error': f'onbekende periode {periode}'}, 400
+  lengte, interval = historieperiodes[periode]
+  tot = int(time()) + 1
+  van = (tot - lengte) // interval * interval
+  return {'periode': periode,
+          'interval': interval,
+          'punten': getzonhistorie().samenvatting(van, tot, interval),
+          }
+
+
 @app.route('/thuis/instellingen', methods=['GET'])
 def instellingenpagina():
   """ Toon de pagina met alle instellingen
@@ -519,14 +789,15 @@ def instellingenactiepagina():
     envdb.wijzig('token', token)
     sleep(1)
   elif actie == 'updateautolampen':
-    zonsterkteaan = request.form.get('zonsterkteaan', '')
-    envdb.wijzig('zonsterktelampen', int(zonsterkteaan))
-    zonsterkteuit = request.form.get('zonsterkteuit', '')
-    envdb.wijzig('zonsterktelampenuit', int(zonsterkteuit))
-    starttijd = request.form.get('starttijd', '')
-    envdb.wijzig('starttijd', int(starttijd))
-    eindtijd = request.form.get('eindtijd', '')
-    envdb.wijzig('eindtijd', int(eindtijd))
+    with envdb.transactie():
+      zonsterkteaan = request.form.get('zonsterkteaan', '')
+      envdb.wijzig('zonsterktelampen', int(zonsterkteaan))
+      zonsterkteuit = request.form.get('zonsterkteuit', '')
+      envdb.wijzig('zonsterktelampenuit', int(zonsterkteuit))
+      starttijd = request.form.get('starttijd', '')
+      envdb.wijzig('starttijd', int(starttijd))
+      eindtijd = request.form.get('eindtijd', '')
+      envdb.wijzig('eindtijd', int(eindtijd))
   elif actie == 'updatepod':
     pod = request.form['pod']
     envdb.wijzig('pod', pod)
@@ -535,11 +806,12 @@ def instellingenactiepagina():
     userid = request.form['userid']
     password = request.form['password']
     bewaargegevens = request.form['savelogin']
-    if bewaargegevens == 'on':
-      envdb.wijzig('userid', userid)
-      envdb.wijzig('password', password)
     jsessionid = Somfy.login(userid, password)
-    envdb.wijzig('jsessionid', jsessionid)
+    with envdb.transactie():
+      if bewaargegevens == 'on':
+        envdb.wijzig('userid', userid)
+        envdb.wijzig('password', password)
+      envdb.wijzig('jsessionid', jsessionid)
   elif actie == 'updatehueuser':
     hueuser = request.form['hueuser']
     envdb.wijzig('hueuser', hueuser)
@@ -547,8 +819,9 @@ def instellingenactiepagina():
     hueip = request.form['hueip']
     envdb.wijzig('hueip', hueip)
   elif actie == 'updategrid':
-    envdb.wijzig('gridbreedte', int(request.form['gridbreedte']))
-    envdb.wijzig('gridhoogte', int(request.form['gridhoogte']))
+    with envdb.transactie():
+      envdb.wijzig('gridbreedte', int(request.form['gridbreedte']))
+      envdb.wijzig('gridhoogte', int(request.form['gridhoogte']))
   return redirect('/thuis/instellingen')
 
 
@@ -565,13 +838,15 @@ def lampenpagina():
   """ Toon de pagina met de lampen
   Returns: Template: De lampenpagina
   """
-  lampen = haallampen()
+  instellingen = envdb.snapshot()
+  lampen = haallampen(instellingen)
   if not lampen:
     return redirect('/thuis')
   return render_template('lampen.html',
                          lampen=sorted(lampen, key=lambda x: x['naam']),
-                         gridbreedte=envdb.lees('gridbreedte'),
-                         gridhoogte=envdb.lees('gridhoogte'),
+                         ruimtes=haalgroepen(instellingen).get('ruimtes', []),
+                         gridbreedte=instellingen.get('gridbreedte') or 3,
+                         gridhoogte=instellingen.get('gridhoogte') or 4,
                          zonnesterkte=haalzonnesterkte()
                          )
 
@@ -581,14 +856,15 @@ def lampengridpagina():
   """ Toon de pagina met de lampengrid
   Returns: Template: De lampengrid configuratiepagina
   """
-  lampen = envdb.lees('lampen')
+  instellingen = envdb.snapshot()
+  lampen = instellingen.get('lampen')
   for lamp in lampen:
     if not lamp.get('automatisch'):
       lamp['checked'] = False
   return render_template('lampengrid.html',
                          lampen=sorted(lampen, key=lambda x: x['naam']),
-                         gridbreedte=envdb.lees('gridbreedte'),
-                         gridhoogte=envdb.lees('gridhoogte'),
+                         gridbreedte=instellingen.get('gridbreedte') or 3,
+                         gridhoogte=instellingen.get('gridhoogte') or 4,
                          )
 
 
@@ -617,7 +893,7 @@ def schermenactiepagina():
 
 @app.route('/thuis/lampen', methods=['POST'])
 def lampenactiepagina():
-  """ Verwerkt acties voor lampen (aan/uit/dim/kleur)
+  """ Verwerkt acties voor lampen (aan/uit/dim/kleur) en groepen (aan/uit/dim)
   Returns: Redirect: Terug naar de lampenpagina
   """
   actie = request.form['actie']
@@ -635,6 +911,12 @@ def lampenactiepagina():
     lampid = request.form['lampid']
     kleurwaarde = request.form['kleurwaarde']
     kleurlamp(lampid, kleurwaarde)
+  elif actie == 'groepaan':
+    zetgroepaanuit(request.form['groepid'], True)
+  elif actie == 'groepuit':
+    zetgroepaanuit(request.form['groepid'], False)
+  elif actie == 'groepdim':
+    dimgroep(request.form['groepid'], float(request.form['dimwaarde']))
   elif actie == 'allesuit':
     allelampenuit()
   elif actie == 'ververs':
@@ -677,8 +959,12 @@ def startwebserver() -> None:
 
 
 if __name__ == '__main__':
+  # Stop netjes bij docker stop zodat uitgestelde gegevens bewaard worden
+  signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
   # Start webserver
   _thread.start_new_thread(startwebserver, ())
+  # Volg de status van de lampen zodat pagina's de bridge niet hoeven te vragen
+  lampstatus.start()
 
   checkwindsnelheid()
   # Elke kwartier check windsnelheid
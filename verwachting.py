@@ -0,0 +1,116 @@
+""" Verwachte toestand van apparaten na een opdracht """
+import copy
+import threading
+from typing import Iterable
+
+from cachetools import TTLCache
+
+from lampstatus import voegsamen
+
+
+def bevat(toestand: dict, velden: dict) -> bool:
+  """
+    Controleer of een toestand de verwachte velden al heeft
+    Args: toestand (dict): De toestand van het apparaat
+          velden (dict): De verwachte velden
+    Returns: bool: True als alle velden dezelfde waarde hebben
+  """
+  for sleutel, waarde in velden.items():
+    if isinstance(waarde, dict) and isinstance(toestand.get(sleutel), dict):
+      if not bevat(toestand[sleutel], waarde):
+        return False
+    elif toestand.get(sleutel) != waarde:
+      return False
+  return True
+
+
+class Verwachting:
+  """
+    Verwachte toestand per apparaat na een opdracht, tot die bevestigd of verlopen is
+    Daarnaast wordt de laatst opgehaalde toestand kort bewaard. Direct na een
+    opdracht kan een pagina dan getoond worden zonder de apparaten te vragen.
+  """
+
+  def __init__(self, duur: float, maxsize: int = 256):
+    """
+      Maken van een lege verwachting
+      Args: duur (float): Seconden dat een verwachting en een opgehaalde toestand geldig zijn
+            maxsize (int): Het maximale aantal apparaten
+    """
+    self._verwacht: TTLCache = TTLCache(maxsize=maxsize, ttl=duur)
+    self._bekend: TTLCache = TTLCache(maxsize=maxsize, ttl=duur)
+    self._slot = threading.Lock()
+
+  def verwacht(self, sleutel: str, velden: dict) -> None:
+    """
+      Leg de verwachte toestand na een opdracht vast
+      Args: sleutel (str): Het apparaat
+            velden (dict): De velden die de opdracht verandert
+    """
+    with self._slot:
+      verwacht = copy.deepcopy(self._verwacht.get(sleutel, {}))
+      voegsamen(verwacht, velden)
+      self._verwacht[sleutel] = verwacht
+
+  def vergeet(self, sleutel: str) -> None:
+    """
+      Vergeet de verwachting voor een apparaat, bijvoorbeeld na een mislukte opdracht
+      Args: sleutel (str): Het apparaat
+    """
+    with self._slot:
+      self._verwacht.pop(sleutel, None)
+
+  def verwachtvoor(self, sleutels: Iterable[str]) -> bool:
+    """
+      Controleer of er voor een van de apparaten een verwachting is
+      Args: sleutels (Iterable): De apparaten
+      Returns: bool: True bij een of meer verwachtingen
+    """
+    with self._slot:
+      return any(sleutel in self._verwacht for sleutel in sleutels)
+
+  def bewaar(self, sleutel: str, toestand) -> None:
+    """
+      Bewaar een opgehaalde toestand
+      Args: sleutel (str): Het apparaat of de verzameling apparaten
+            toestand: De opgehaalde toestand
+    """
+    with self._slot:
+      self._bekend[sleutel] = copy.deepcopy(toestand)
+
+  def bekend(self, sleutel: str):
+    """
+      De laatst opgehaalde toestand, als die nog geldig is
+      Args: sleutel (str): Het apparaat of de verzameling apparaten
+      Returns: Een kopie van de toestand of None
+    """
+    with self._slot:
+      return copy.deepcopy(self._bekend.get(sleutel))
+
+  def pasaan(self, sleutel: str, toestand: dict) -> dict:
+    """
+      Pas de verwachting toe op een toestand
+      Heeft de toestand de verwachte velden al, dan is de opdracht bevestigd
+      en vervalt de verwachting.
+      Args: sleutel (str): Het apparaat
+            toestand (dict): De toestand van het apparaat
+      Returns: dict: De toestand met de verwachte velden
+    """
+    with self._slot:
+      verwacht = self._verwacht.get(sleutel)
+      if verwacht is None:
+        return toestand
+      if bevat(toestand, verwacht):
+        del self._verwacht[sleutel]
+        return toestand
+      toestand = copy.deepcopy(toestand)
+      voegsamen(toestand, verwacht)
+      return toestand
+
+  def wis(self) -> None:
+    """
+      Vergeet alle verwachtingen en opgehaalde toestanden
+    """
+    with self._slot:
+      self._verwacht.clear()
+      self._bekend.clear()
@@ -0,0 +1,157 @@
+""" Wachtrij voor opdrachten aan een apparaat met een maximum aantal per seconde """
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Callable
+
+import requests
+
+# Seconden wachten en aantal pogingen wanneer het apparaat 429 Too Many Requests geeft
+HERHAALTIJD = 1.0
+POGINGEN = 3
+
+
+class Emmer:
+  """
+    Token bucket: gemiddeld snelheid opdrachten per seconde met pieken tot grootte
+  """
+
+  def __init__(self, snelheid: float, grootte: int):
+    """
+      Maken van een volle emmer
+      Args: snelheid (float): Het aantal tokens dat per seconde bijkomt
+            grootte (int): Het maximale aantal tokens in de emmer
+    """
+    self.snelheid = snelheid
+    self.grootte = grootte
+    self._tokens = float(grootte)
+    self._tijd = time.monotonic()
+    self._slot = threading.Lock()
+
+  def _vul(self) -> None:
+    """
+      Voeg de tokens toe die sinds de vorige keer zijn bijgekomen, onder het slot
+    """
+    nu = time.monotonic()
+    self._tokens = min(self.grootte, self._tokens + (nu - self._tijd) * self.snelheid)
+    self._tijd = nu
+
+  def beschikbaar(self) -> float:
+    """
+      Het aantal tokens dat nu zonder wachten genomen kan worden
+      Returns: float: Het aantal tokens, negatief als er al op tokens gewacht wordt
+    """
+    with self._slot:
+      self._vul()
+      return self._tokens
+
+  def neem(self) -> None:
+    """
+      Neem een token, wacht zo nodig tot er een bijgekomen is
+    """
+    with self._slot:
+      self._vul()
+      self._tokens -= 1
+      wachttijd = -self._tokens / self.snelheid if self._tokens < 0 else 0
+    if wachttijd:
+      time.sleep(wachttijd)
+
+
+class OpdrachtWachtrij:
+  """
+    Wachtrij die opdrachten op de achtergrond verstuurt, beperkt door een Emmer
+    Een opdracht voor een pad dat nog in de wachtrij staat wordt samengevoegd met
+    de wachtende opdracht: nieuwere waarden vervangen oudere, zodat bij snel
+    dimmen alleen de laatste waarde verstuurd wordt. Opdrachten voor hetzelfde pad
+    worden nooit gelijktijdig verstuurd.
+  """
+
+  def __init__(self, verstuur: Callable[[str, dict], dict], emmer: Emmer, gelijktijdig: int = 4):
+    """
+      Maken van de wachtrij, de threads starten bij de eerste opdracht
+      Args: verstuur (Callable): Verstuurt de gegevens voor een pad
+            emmer (Emmer): De beperking van het aantal opdrachten per seconde
+            gelijktijdig (int): Het aantal opdrachten dat tegelijk onderweg mag zijn
+    """
+    self.verstuur = verstuur
+    self.emmer = emmer
+    self.gelijktijdig = gelijktijdig
+    self._wachtend: OrderedDict[str, tuple[dict, Future]] = OrderedDict()
+    self._bezig: set[str] = set()
+    self._conditie = threading.Condition()
+    self._gestart = False
+
+  def plaats(self, pad: str, gegevens: dict) -> Future:
+    """
+      Plaats een opdracht in de wachtrij
+      Args: pad (str): Het pad van de resource
+            gegevens (dict): De te versturen gegevens
+      Returns: Future: Klaar wanneer de (samengevoegde) opdracht verstuurd is
+    """
+    with self._conditie:
+      if not self._gestart:
+        for nummer in range(self.gelijktijdig):
+          threading.Thread(target=self._verwerk, name=f'wachtrij-{nummer}', daemon=True).start()
+        self._gestart = True
+      if pad in self._wachtend:
+        wachtend, toekomst = self._wachtend[pad]
+        wachtend.update(gegevens)
+        return toekomst
+      toekomst = Future()
+      self._wachtend[pad] = (dict(gegevens), toekomst)
+      self._conditie.notify()
+      return toekomst
+
+  def wachtend(self) -> int:
+    """
+      Het aantal opdrachten dat nog verstuurd moet worden
+      Returns: int: Het aantal opdrachten, samengevoegde opdrachten tellen als een
+    """
+    with self._conditie:
+      return len(self._wachtend)
+
+  def _volgende(self) -> str | None:
+    """
+      Het oudste pad in de wachtrij dat nu niet verstuurd wordt
+      Returns: str: Het pad of None
+    """
+    return next((pad for pad in self._wachtend if pad not in self._bezig), None)
+
+  def _verwerk(self) -> None:
+    """
+      Verstuur opdrachten uit de wachtrij, zolang het proces loopt
+    """
+    while True:
+      with self._conditie:
+        while (pad := self._volgende()) is None:
+          self._conditie.wait()
+        gegevens, toekomst = self._wachtend.pop(pad)
+        self._bezig.add(pad)
+      try:
+        toekomst.set_result(self._verstuur(pad, gegevens))
+      except Exception as e:  # pylint: disable=broad-exception-caught
+        # Elke fout gaat naar wie op de opdracht wacht, de thread moet doorgaan
+        toekomst.set_exception(e)
+      finally:
+        with self._conditie:
+          self._bezig.discard(pad)
+          self._conditie.notify_all()
+
+  def _verstuur(self, pad: str, gegevens: dict) -> dict:
+    """
+      Verstuur een opdracht en probeer het opnieuw bij 429 Too Many Requests
+      Args: pad (str): Het pad van de resource
+            gegevens (dict): De te versturen gegevens
+      Returns: dict: Het antwoord van het apparaat
+    """
+    poging = 1
+    while True:
+      self.emmer.neem()
+      try:
+        return self.verstuur(pad, gegevens)
+      except requests.HTTPError as e:
+        if e.response is None or e.response.status_code != 429 or poging >= POGINGEN:
+          raise
+      poging += 1
+      time.sleep(HERHAALTIJD)